@@ -1,96 +1,635 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException, Request
+from fastapi import APIRouter, File, UploadFile, HTTPException, Request, Response, Header
+from fastapi.responses import JSONResponse
+import asyncio
+import hmac
 import time
-from app.core.preprocessing import decode_image, validate_image
+from typing import Any, Dict, List, Optional
+from app.core.preprocessing import decode_and_validate
 from app.core.postprocessing import PostProcessor
+from app.core.batching import MicroBatcher
+from app.core.executor import InferenceExecutor
+from app.core.admission import AdmissionController
+from app.core.deadline import DeadlineTracker
+from app.core.pipeline import DecodePipeline, PreparedFrame
+from app.core.cache import ResultCache
+from app.core.dedup import NearDuplicateDetector
+from app.core.autotune import configure_threads
+from app.core.warmup import ModelWarmup, warmup_batch_sizes
+from app.core.upload import (
+    read_body_limited, RAW_IMAGE_CONTENT_TYPES, MULTIPART_OVERHEAD, UploadLimiter
+)
+from app.models.backends import resolve_backend
 from app.models.mobilenet_classifier import MobileNetClassifier
-from app.schemas.prediction import PredictionResponse, ESPResponse
+from app.models.model_manager import ModelManager, ReloadInProgressError
+from app.serving import installed_classifier
+from app.schemas.prediction import (
+    PredictionResponse, ESPResponse, BatchItemResult, BatchPredictionResponse
+)
 from app.config import settings
 from app.utils.logger import logger, LoggerContext, prediction_logger
+from app.utils.profiling import startup_profiler
 
 router = APIRouter()
 
-classifier = MobileNetClassifier()
-classifier.load_model(settings.MODEL_PATH)
+# Threads/batch por worker (tuning guardado o default) ANTES de cargar el modelo
+with startup_profiler.phase("configure_threads"):
+    thread_config = configure_threads()
+# SERVING_LAYOUT=prefork: el modelo está en otros procesos (ver app/serving)
+classifier = installed_classifier()
+if classifier is None:
+    classifier = MobileNetClassifier()
+    # Solo se importa el framework del motor elegido (torch, tensorflow, ...)
+    with startup_profiler.phase("import_backend"):
+        resolve_backend(settings.MODEL_PATH, settings.MODEL_BACKEND)
+    with startup_profiler.phase("load_model"):
+        classifier.load_model(settings.MODEL_PATH)
 post_processor = PostProcessor()
+executor = InferenceExecutor(
+    kind=settings.EXECUTOR_KIND,
+    max_workers=settings.EXECUTOR_POOL_SIZE,
+    queue_depth=settings.EXECUTOR_QUEUE_DEPTH
+)
+result_cache = ResultCache(
+    max_entries=settings.RESULT_CACHE_SIZE,
+    ttl_seconds=settings.RESULT_CACHE_TTL
+)
+duplicate_detector = NearDuplicateDetector(
+    max_distance=settings.DEDUP_MAX_DISTANCE,
+    history_size=settings.DEDUP_HISTORY_SIZE,
+    max_age_seconds=settings.DEDUP_MAX_AGE
+)
+# DECODE_WORKERS > 0: decode + preprocesamiento en procesos aparte, que dejan
+# el tensor en un anillo de memoria compartida; el batcher junta PreparedFrames
+decode_pipeline = None
+if settings.DECODE_WORKERS > 0:
+    decode_pipeline = DecodePipeline(
+        classifier,
+        workers=settings.DECODE_WORKERS,
+        ring_size=settings.DECODE_RING_SIZE or 2 * (settings.MAX_BATCH_SIZE + settings.DECODE_WORKERS),
+        queue_depth=settings.EXECUTOR_QUEUE_DEPTH
+    )
+batcher = MicroBatcher(
+    decode_pipeline or classifier,
+    max_batch_size=settings.MAX_BATCH_SIZE,
+    max_wait_ms=settings.BATCH_MAX_WAIT_MS,
+    executor=executor
+)
+# Warm-up en segundo plano al arrancar (app/main.py); /ready espera a que termine
+model_warmup = ModelWarmup(
+    classifier,
+    batch_sizes=warmup_batch_sizes(
+        settings.MAX_BATCH_SIZE, settings.MAX_BATCH_FILES, settings.WARMUP_BATCH_SIZES
+    ),
+    iterations=settings.WARMUP_ITERATIONS,
+    enabled=settings.WARMUP_ENABLED
+)
+# Recarga en caliente (POST /admin/reload o MODEL_WATCH_INTERVAL)
+model_manager = ModelManager(classifier, model_warmup)
+
+admission = None
+if settings.ADMISSION_ENABLED:
+    admission = AdmissionController(
+        max_in_flight=settings.ADMISSION_MAX_IN_FLIGHT
+        or 2 * max(settings.MAX_BATCH_SIZE, settings.EXECUTOR_POOL_SIZE),
+        queue_budget_ms=settings.ADMISSION_QUEUE_BUDGET_MS,
+        max_queue=settings.ADMISSION_MAX_QUEUE
+    )
+deadline_tracker = DeadlineTracker(
+    header=settings.DEADLINE_HEADER,
+    default_ms=settings.DEADLINE_DEFAULT_MS,
+    path_defaults={"/predict/esp": settings.DEADLINE_ESP_MS} if settings.DEADLINE_ESP_MS else None
+)
+# Límite del body por ruta (lo aplica BodySizeLimitMiddleware en app/main.py)
+_body_limit = settings.MAX_REQUEST_BODY_SIZE or settings.MAX_FILE_SIZE + MULTIPART_OVERHEAD
+upload_limiter = UploadLimiter(
+    default_limit=_body_limit,
+    path_limits={
+        "/predict/batch": settings.MAX_REQUEST_BODY_SIZE
+        or settings.MAX_FILE_SIZE * settings.MAX_BATCH_FILES + MULTIPART_OVERHEAD
+    }
+)
+
+
+def _result_fingerprint():
+    """Lo que invalida resultados cacheados: modelo cargado y umbral de confianza"""
+    return (classifier.model_id, settings.CONFIDENCE_THRESHOLD)
+
+
+def _device_id(request: Request) -> str:
+    """Dispositivo que envía el frame: header configurable o IP del cliente"""
+    device_id = request.headers.get(settings.DEDUP_DEVICE_HEADER)
+    if device_id:
+        return device_id
+    return request.client.host if request.client else "unknown"
+
+
+def _deadline(request: Request):
+    """Deadline fijado por DeadlineMiddleware (None si el request no tiene)"""
+    return getattr(request.state, "deadline", None)
+
+
+def _check_deadline(deadline, stage: str):
+    """504 si el deadline ya venció: el trabajo de `stage` en adelante se descarta"""
+    if deadline is not None:
+        deadline.check(stage)
+
+
+async def _decode(contents):
+    """
+    Decode + validación fuera del event loop
+    
+    Returns:
+        (imagen, shape): la imagen es un PreparedFrame si hay pipeline de
+        decode (liberar con `_release` al terminar); shape es el tamaño del
+        archivo subido, aunque se haya decodificado reducido
+    """
+    if decode_pipeline is not None:
+        frame = await decode_pipeline.submit(contents, with_hash=settings.DEDUP_ENABLED)
+        return frame, frame.shape
+    return await executor.run(decode_and_validate, contents)
+
+
+def _release(image):
+    """Devuelve la entrada del anillo de un PreparedFrame"""
+    if isinstance(image, PreparedFrame):
+        decode_pipeline.release(image)
+
+
+async def _classify_image(image, device_id: str, deadline=None) -> Dict[str, Any]:
+    """
+    Predicción cruda de una imagen ya decodificada (o PreparedFrame)
+    
+    Frames casi idénticos a uno reciente del mismo dispositivo reutilizan su
+    predicción; el resto va al modelo (micro-batching o directo). Con el
+    deadline vencido no se toca el modelo (tampoco si vence en la cola del
+    micro-batcher).
+    """
+    _check_deadline(deadline, "inference")
+    image_hash = None
+    if settings.DEDUP_ENABLED:
+        if isinstance(image, PreparedFrame):
+            # Calculado en el proceso de decode: su costo va igual a /stats
+            image_hash = image.image_hash
+            duplicate_detector.record_hash_time(image.hash_time)
+        else:
+            image_hash = await executor.run_in_thread(duplicate_detector.compute_hash, image)
+        previous = duplicate_detector.lookup(device_id, image_hash, classifier.model_id)
+        if previous is not None:
+            return previous
+    
+    if settings.BATCHING_ENABLED:
+        raw_prediction = await batcher.submit(image, deadline)
+    elif isinstance(image, PreparedFrame):
+        raw_prediction = (await executor.run_in_thread(decode_pipeline.classify_batch, [image]))[0]
+    else:
+        raw_prediction = await executor.run_in_thread(classifier.predict, image)
+    
+    if image_hash is not None:
+        duplicate_detector.remember(device_id, image_hash, raw_prediction, classifier.model_id)
+    return raw_prediction
+
+
+def _finalize(raw_prediction: Dict[str, Any]) -> Dict[str, Any]:
+    """Postprocesamiento + reglas de negocio"""
+    processed_result = post_processor.process_prediction(raw_prediction)
+    return post_processor.apply_business_rules(processed_result)
+
+
+def _log_prediction(request_id: str, final_result: Dict[str, Any], processing_time: float, image_shape):
+    """Registra la predicción en predictions.jsonl"""
+    prediction_logger.log_prediction(
+        request_id=request_id,
+        class_name=final_result['class_name'],
+        confidence=final_result['confidence'],
+        code=final_result['code'],
+        processing_time=processing_time,
+        image_size=image_shape[:2],
+        is_confident=final_result['is_confident'],
+        alternatives=final_result['alternative_classes']
+    )
+
+
+async def _predict_contents(request_id: str, device_id: str, contents, log, deadline=None) -> Dict[str, Any]:
+    """
+    Pipeline completo para una imagen ya leída:
+    decode -> modelo -> postprocesamiento -> log de predicción
+    
+    El deadline se revisa antes de cada etapa cara: vencido = 504 sin seguir.
+    """
+    start_time = time.time()
+    
+    if len(contents) > settings.MAX_FILE_SIZE:
+        log.warning(f"Archivo muy grande: {len(contents)} bytes")
+        raise HTTPException(status_code=413, detail="Archivo muy grande")
+    
+    _check_deadline(deadline, "decode")
+    
+    log.debug(f"Tamaño del archivo: {len(contents)} bytes")
+    
+    # Mismo archivo ya clasificado: saltar decode + modelo
+    cache_key = None
+    if settings.RESULT_CACHE_ENABLED:
+        cache_key = result_cache.key_for(contents)
+        cached = result_cache.get(cache_key, _result_fingerprint())
+        if cached is not None:
+            final_result, image_shape = cached
+            processing_time = time.time() - start_time
+            log.info(
+                f"Clasificación (cache): {final_result['class_name']} | "
+                f"Código: {final_result['code']} | "
+                f"Tiempo: {processing_time:.3f}s"
+            )
+            _check_deadline(deadline, "logging")
+            if settings.LOG_PREDICTIONS:
+                await executor.run_in_thread(
+                    _log_prediction, request_id, final_result, processing_time, image_shape
+                )
+            return final_result
+    
+    # Preprocesamiento (fuera del event loop)
+    image, image_shape = await _decode(contents)
+    log.debug(f"Imagen decodificada: {image_shape}")
+    
+    # Predicción del modelo
+    try:
+        raw_prediction = await _classify_image(image, device_id, deadline)
+    finally:
+        _release(image)
+    log.info(
+        f"Predicción cruda: {raw_prediction['class_name']} "
+        f"({raw_prediction['confidence']:.2%})"
+    )
+    
+    # Postprocesamiento
+    final_result = _finalize(raw_prediction)
+    if cache_key is not None:
+        result_cache.put(cache_key, (final_result, image_shape[:2]), _result_fingerprint())
+    
+    # Calcular tiempo de procesamiento
+    processing_time = time.time() - start_time
+    log.info(
+        f"Clasificación exitosa: {final_result['class_name']} | "
+        f"Código: {final_result['code']} | "
+        f"Tiempo: {processing_time:.3f}s"
+    )
+    
+    # El cliente ya no espera la respuesta: ni log ni serialización
+    _check_deadline(deadline, "logging")
+    
+    # Loggear predicción para análisis
+    if settings.LOG_PREDICTIONS:
+        await executor.run_in_thread(
+            _log_prediction, request_id, final_result, processing_time, image_shape
+        )
+    
+    return final_result
+
 
 @router.post("/predict", response_model=PredictionResponse)
 async def predict(request: Request, file: UploadFile = File(...)):
     """Endpoint completo con toda la información"""
     
     request_id = getattr(request.state, 'request_id', 'N/A')
-    start_time = time.time()
     
     # Usar context manager para logging con request_id
     with LoggerContext(logger, request_id) as log:
         try:
             log.info(f"Recibiendo imagen: {file.filename}")
-            
-            # Validar tamaño
             contents = await file.read()
-            if len(contents) > settings.MAX_FILE_SIZE:
-                log.warning(f"Archivo muy grande: {len(contents)} bytes")
-                raise HTTPException(status_code=413, detail="Archivo muy grande")
-            
-            log.debug(f"Tamaño del archivo: {len(contents)} bytes")
+            return await _predict_contents(
+                request_id, _device_id(request), contents, log, _deadline(request)
+            )
             
-            # Preprocesamiento
-            image = decode_image(contents)
-            validate_image(image)
-            log.debug(f"Imagen decodificada: {image.shape}")
+        except HTTPException:
+            raise
+        except Exception as e:
+            log.error(f"Error en predicción: {str(e)}", exc_info=True)
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error procesando imagen: {str(e)}"
+            )
+
+
+@router.post("/predict/raw", response_model=PredictionResponse)
+async def predict_raw(request: Request):
+    """
+    Igual que /predict pero la imagen viaja como body crudo (sin multipart)
+    
+    Content-Type: application/octet-stream, image/jpeg o image/png.
+    El tamaño máximo se controla mientras llega el body.
+    """
+    
+    request_id = getattr(request.state, 'request_id', 'N/A')
+    
+    with LoggerContext(logger, request_id) as log:
+        content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        if content_type not in RAW_IMAGE_CONTENT_TYPES:
+            log.warning(f"Content-Type no soportado: {content_type or 'ninguno'}")
+            raise HTTPException(
+                status_code=415,
+                detail=f"Content-Type no soportado: {content_type or 'ninguno'}"
+            )
+        
+        try:
+            log.info(f"Recibiendo imagen cruda ({content_type})")
+            contents = await read_body_limited(request, settings.MAX_FILE_SIZE)
+            return await _predict_contents(
+                request_id, _device_id(request), contents, log, _deadline(request)
+            )
             
-            # Predicción del modelo
-            raw_prediction = classifier.predict(image)
-            log.info(
-                f"Predicción cruda: {raw_prediction['class_name']} "
-                f"({raw_prediction['confidence']:.2%})"
+        except HTTPException:
+            raise
+        except Exception as e:
+            log.error(f"Error en predicción: {str(e)}", exc_info=True)
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error procesando imagen: {str(e)}"
+            )
+
+
+@router.post("/predict/esp", response_model=ESPResponse)
+async def predict_esp(request: Request, file: UploadFile = File(...), raw: bool = False):
+    """
+    Endpoint ligero para ESP32: solo el código de clasificación
+    
+    Omite alternativas, descripciones, reglas de negocio y logs por request.
+    Con `?raw=true` responde el código como texto plano de un byte (ej: `1`).
+    """
+    
+    contents = await file.read()
+    if len(contents) > settings.MAX_FILE_SIZE:
+        raise HTTPException(status_code=413, detail="Archivo muy grande")
+    
+    deadline = _deadline(request)
+    _check_deadline(deadline, "decode")
+    
+    cache_key = None
+    code = None
+    if settings.RESULT_CACHE_ENABLED:
+        cache_key = result_cache.key_for(contents, variant="esp")
+        code = result_cache.get(cache_key, _result_fingerprint())
+    
+    if code is None:
+        try:
+            image, _ = await _decode(contents)
+            try:
+                raw_prediction = await _classify_image(image, _device_id(request), deadline)
+            finally:
+                _release(image)
+        except HTTPException:
+            raise
+        except Exception as e:
+            request_id = getattr(request.state, 'request_id', 'N/A')
+            logger.error(f"[{request_id}] Error en predicción ESP: {str(e)}", exc_info=True)
+            raise HTTPException(status_code=500, detail="Error procesando imagen")
+        
+        code = post_processor.resolve_code(raw_prediction)
+        if cache_key is not None:
+            result_cache.put(cache_key, code, _result_fingerprint())
+    
+    # Respuesta armada a mano: evita la validación/serialización de pydantic
+    if raw:
+        return Response(content=str(code), media_type="text/plain")
+    return Response(content=f'{{"code":{code}}}', media_type="application/json")
+
+
+@router.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_batch(request: Request, files: List[UploadFile] = File(...)):
+    """
+    Clasifica varias imágenes en un solo request y un solo forward del modelo
+    
+    Los errores por imagen (archivo corrupto, muy pequeño, muy grande) se
+    reportan en su item sin hacer fallar el batch completo.
+    """
+    
+    request_id = getattr(request.state, 'request_id', 'N/A')
+    start_time = time.time()
+    
+    with LoggerContext(logger, request_id) as log:
+        if len(files) > settings.MAX_BATCH_FILES:
+            log.warning(f"Batch muy grande: {len(files)} archivos")
+            raise HTTPException(
+                status_code=413,
+                detail=f"Máximo {settings.MAX_BATCH_FILES} imágenes por request"
             )
+        
+        log.info(f"Recibiendo batch de {len(files)} imágenes")
+        results = [
+            BatchItemResult(index=i, filename=file.filename)
+            for i, file in enumerate(files)
+        ]
+        
+        try:
+            contents = [await file.read() for file in files]
+            deadline = _deadline(request)
+            _check_deadline(deadline, "decode")
+            
+            # Decode en paralelo (solo los que respetan el tamaño máximo y no están en cache)
+            fingerprint = _result_fingerprint()
+            cache_keys = {}
+            pending = {}
+            for i, data in enumerate(contents):
+                if len(data) > settings.MAX_FILE_SIZE:
+                    results[i].status_code = 413
+                    results[i].error = "Archivo muy grande"
+                    continue
+                if settings.RESULT_CACHE_ENABLED:
+                    cache_keys[i] = result_cache.key_for(data)
+                    cached = result_cache.get(cache_keys[i], fingerprint)
+                    if cached is not None:
+                        results[i].prediction = PredictionResponse(**cached[0])
+                        continue
+                pending[i] = executor.run(decode_and_validate, data)
             
-            # Postprocesamiento
-            processed_result = post_processor.process_prediction(raw_prediction)
-            final_result = post_processor.apply_business_rules(processed_result)
+            decoded = await asyncio.gather(*pending.values(), return_exceptions=True)
+            
+            images = {}
+            shapes = {}
+            for i, outcome in zip(pending.keys(), decoded):
+                if isinstance(outcome, HTTPException):
+                    results[i].status_code = outcome.status_code
+                    results[i].error = outcome.detail
+                elif isinstance(outcome, Exception):
+                    results[i].status_code = 500
+                    results[i].error = f"Error procesando imagen: {str(outcome)}"
+                else:
+                    images[i], shapes[i] = outcome
+            
+            # Un solo forward para todas las imágenes válidas
+            if images:
+                _check_deadline(deadline, "inference")
+                raw_predictions = await executor.run_in_thread(
+                    classifier.classify_batch, list(images.values())
+                )
+                
+                processing_time = time.time() - start_time
+                final_results = {}
+                for i, raw_prediction in zip(images.keys(), raw_predictions):
+                    final_results[i] = _finalize(raw_prediction)
+                    results[i].prediction = PredictionResponse(**final_results[i])
+                    if i in cache_keys:
+                        result_cache.put(
+                            cache_keys[i],
+                            (final_results[i], shapes[i]),
+                            fingerprint
+                        )
+                
+                _check_deadline(deadline, "logging")
+                if settings.LOG_PREDICTIONS:
+                    def _log_batch():
+                        for i, final_result in final_results.items():
+                            _log_prediction(
+                                f"{request_id}-{i}", final_result,
+                                processing_time, shapes[i]
+                            )
+                    await executor.run_in_thread(_log_batch)
             
-            # Calcular tiempo de procesamiento
             processing_time = time.time() - start_time
             log.info(
-                f"Clasificación exitosa: {final_result['class_name']} | "
-                f"Código: {final_result['code']} | "
+                f"Batch procesado: {len(images)}/{len(files)} imágenes inferidas | "
                 f"Tiempo: {processing_time:.3f}s"
             )
             
-            # Loggear predicción para análisis
-            if settings.LOG_PREDICTIONS:
-                prediction_logger.log_prediction(
-                    request_id=request_id,
-                    class_name=final_result['class_name'],
-                    confidence=final_result['confidence'],
-                    code=final_result['code'],
-                    processing_time=processing_time,
-                    image_size=image.shape[:2],
-                    is_confident=final_result['is_confident'],
-                    alternatives=final_result['alternative_classes']
-                )
-            
-            return final_result
+            return BatchPredictionResponse(results=results, processing_time=processing_time)
             
         except HTTPException:
             raise
         except Exception as e:
-            log.error(f"Error en predicción: {str(e)}", exc_info=True)
+            log.error(f"Error en predicción batch: {str(e)}", exc_info=True)
             raise HTTPException(
                 status_code=500,
-                detail=f"Error procesando imagen: {str(e)}"
+                detail=f"Error procesando batch: {str(e)}"
             )
 
 
 @router.get("/health")
 async def health_check():
-    """Health check con info de logging"""
+    """Health check con info de logging (liveness: no espera al warm-up)"""
     return {
         "status": "healthy",
         "model_loaded": classifier.model is not None,
+        "ready": model_warmup.ready,
         "logging": {
             "level": settings.LOG_LEVEL,
             "file_logging": settings.ENABLE_FILE_LOGGING,
             "predictions_logged": settings.LOG_PREDICTIONS
         }
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/ready")
+async def readiness_check():
+    """
+    Readiness para el load balancer: 503 hasta que el modelo esté cargado
+    y precalentado en todos los tamaños de batch
+    """
+    return JSONResponse(
+        status_code=200 if model_warmup.ready else 503,
+        content=model_warmup.stats()
+    )
+
+
+@router.get("/stats")
+async def stats():
+    """Métricas de rendimiento (tamaños de batch logrados, etc.)"""
+    return {
+        "batching": {
+            "enabled": settings.BATCHING_ENABLED,
+            **batcher.stats()
+        },
+        "executor": executor.stats(),
+        "admission": admission.stats() if admission is not None else {"enabled": False},
+        "deadlines": deadline_tracker.stats(_inference_ms_per_item()),
+        "result_cache": {
+            "enabled": settings.RESULT_CACHE_ENABLED,
+            **result_cache.stats()
+        },
+        "near_duplicates": _dedup_stats(),
+        "model": model_manager.stats(),
+        "uploads": upload_limiter.stats(),
+        "serving": _serving_stats(),
+        "pipeline": decode_pipeline.stats() if decode_pipeline is not None else {"enabled": False},
+        "startup": startup_profiler.report()
+    }
+
+
+@router.post("/admin/reload")
+async def admin_reload(
+    model_path: Optional[str] = None,
+    x_admin_token: Optional[str] = Header(default=None)
+):
+    """
+    Recarga el modelo sin reiniciar: carga + warm-up en segundo plano y
+    swap atómico; las requests en curso terminan con el modelo anterior
+    
+    Requiere ADMIN_TOKEN en .env y el header X-Admin-Token.
+    
+    Solo recarga el worker que recibe el request: con WORKERS > 1 no hay
+    forma de avisarle a los demás, así que `model_path` se rechaza (400) y
+    sin él se exige MODEL_WATCH_INTERVAL > 0; los otros workers ven el
+    cambio de MODEL_PATH y recargan solos. Sin watcher, reiniciar.
+    
+    Args:
+        model_path: checkpoint nuevo (default: volver a leer MODEL_PATH)
+    """
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Endpoints de admin deshabilitados (ADMIN_TOKEN)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Token de admin inválido")
+    
+    if settings.WORKERS > 1:
+        if model_path:
+            raise HTTPException(
+                status_code=400,
+                detail="Con WORKERS > 1 model_path solo cambiaría un worker: reemplazar MODEL_PATH "
+                       "(mv) y dejar que MODEL_WATCH_INTERVAL lo recargue en todos"
+            )
+        if settings.MODEL_WATCH_INTERVAL <= 0:
+            raise HTTPException(
+                status_code=400,
+                detail="Con WORKERS > 1 la recarga solo llegaría a un worker: "
+                       "usar MODEL_WATCH_INTERVAL > 0 o reiniciar"
+            )
+    
+    try:
+        result = await executor.run_in_thread(model_manager.reload, model_path)
+        if settings.WORKERS > 1:
+            result = {
+                **result,
+                "note": f"Los otros {settings.WORKERS - 1} workers recargan al detectar el cambio "
+                        f"de MODEL_PATH (cada {settings.MODEL_WATCH_INTERVAL}s)",
+            }
+        return result
+    except ReloadInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except (FileNotFoundError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error recargando modelo: {str(e)}")
+
+
+def _serving_stats() -> Dict[str, Any]:
+    """Layout de serving: procesos, memoria por proceso y colas (prefork / daemon)"""
+    if hasattr(classifier, "stats"):
+        return classifier.stats()
+    return {"layout": "workers", "workers": settings.WORKERS}
+
+
+def _inference_ms_per_item() -> float:
+    """Costo medio del modelo por imagen (batches del micro-batcher)"""
+    batching = batcher.stats()
+    if not batching["avg_batch_size"]:
+        return 0.0
+    return batching["avg_batch_time_ms"] / batching["avg_batch_size"]
+
+
+def _dedup_stats() -> Dict[str, Any]:
+    """Stats de dHash + estimación de cuánto modelo se ahorró vs. cuánto costó el hash"""
+    dedup = duplicate_detector.stats()
+    return {
+        "enabled": settings.DEDUP_ENABLED,
+        **dedup,
+        "estimated_saved_ms": round(dedup["skips"] * _inference_ms_per_item(), 2),
+    }
@@ -8,13 +8,74 @@ class Settings(BaseSettings):
     
     Variables que se PUEDEN cambiar en .env:
     - MODEL_PATH: Ruta al modelo entrenado
+    - MODEL_BACKEND: auto/pytorch/tensorflow/onnx/tflite/numpy (auto = por extensión)
     - CONFIDENCE_THRESHOLD: Umbral de confianza (0.0-1.0)
+    - TORCH_SERVING_MODE: eager/torchscript/int8 (solo modelos .pth/.pt)
+    - TORCH_CHANNELS_LAST: true/false (layout channels-last en torchscript)
+    - TORCH_COMPILED_CACHE_DIR: Carpeta para artefactos compilados
+    - TORCH_MMAP_WEIGHTS: true/false (mapear los pesos desde el archivo, compartidos entre workers; sin efecto con MODEL_WATCH_INTERVAL > 0)
+    - QUANT_CALIBRATION_DIR: Imágenes para calibrar el modelo INT8
+    - QUANT_VALIDATION_DIR: Imágenes held-out para validar INT8 vs float
+    - QUANT_MIN_AGREEMENT: Coincidencia top-1 mínima para activar INT8
+    - QUANT_CALIBRATION_SAMPLES: Máximo de imágenes de calibración
+    - QUANT_BACKEND: x86/fbgemm (servidores) o qnnpack (ARM)
+    - TFLITE_NUM_THREADS: Threads del intérprete TFLite (0 = automático)
+    - ONNX_INTRA_OP_THREADS: Threads intra-op de ONNX Runtime (0 = automático)
+    - ONNX_INTER_OP_THREADS: Threads inter-op de ONNX Runtime (0 = automático)
+    - ONNX_GRAPH_OPTIMIZATION: disable/basic/extended/all
     - MAX_FILE_SIZE: Tamaño máximo en bytes
+    - MAX_REQUEST_BODY_SIZE: Límite del body a nivel ASGI (0 = automático según MAX_FILE_SIZE)
+    - REDUCED_DECODE_ENABLED: true/false (decode JPEG reducido 1/2-1/8 según el header)
     - LOG_LEVEL: DEBUG, INFO, WARNING, ERROR, CRITICAL
     - LOG_DIR: Directorio para logs
     - ENABLE_FILE_LOGGING: true/false
     - ENABLE_CONSOLE_LOGGING: true/false
     - LOG_PREDICTIONS: true/false
+    - BATCHING_ENABLED: true/false (micro-batching de /predict)
+    - MAX_BATCH_SIZE: Máximo de imágenes por forward del modelo
+    - BATCH_MAX_WAIT_MS: Espera máxima para completar un batch (ms)
+    - MAX_BATCH_FILES: Máximo de archivos por request en /predict/batch
+    - RESULT_CACHE_ENABLED: true/false (cache por hash del archivo)
+    - RESULT_CACHE_SIZE: Máximo de entradas del cache
+    - RESULT_CACHE_TTL: Segundos que vive cada entrada
+    - DEDUP_ENABLED: true/false (reutilizar frames casi idénticos por dispositivo; opt-in, cambia resultados)
+    - DEDUP_MAX_DISTANCE: Distancia de Hamming máxima entre dHashes (0-64)
+    - DEDUP_HISTORY_SIZE: Hashes recientes que se guardan por dispositivo
+    - DEDUP_MAX_AGE: Segundos que una clasificación se puede reutilizar
+    - DEDUP_DEVICE_HEADER: Header que identifica al dispositivo
+    - WORKERS: Workers de uvicorn (run.py --workers lo pisa)
+    - INFERENCE_THREADS: Threads intra-op por worker (0 = tuning guardado o cores / WORKERS)
+    - INFERENCE_INTEROP_THREADS: Threads inter-op por worker (0 = automático)
+    - AUTOTUNE_ON_STARTUP: true/false (run.py mide y guarda si no hay tuning válido)
+    - AUTOTUNE_FILE: JSON con la configuración elegida
+    - AUTOTUNE_DURATION: Segundos de medición por combinación
+    - AUTOTUNE_P99_BUDGET_MS: p99 máximo aceptado al elegir la configuración
+    - WARMUP_ENABLED: true/false (batches falsos al arrancar antes de /ready)
+    - WARMUP_ITERATIONS: Batches falsos por cada tamaño de batch
+    - WARMUP_BATCH_SIZES: Tamaños separados por coma (vacío = 1..MAX_BATCH_SIZE y MAX_BATCH_FILES)
+    - MODEL_WATCH_INTERVAL: Segundos entre chequeos de MODEL_PATH para recargar (0 = no vigilar)
+    - ADMIN_TOKEN: Token para POST /admin/reload (vacío = deshabilitado)
+    - SERVING_LAYOUT: workers/prefork/daemon (prefork = modelo cargado una vez y workers de inferencia con fork,
+      daemon = un proceso de inferencia compartido por los workers vía socket Unix)
+    - INFERENCE_WORKERS: Procesos de inferencia en SERVING_LAYOUT=prefork
+    - SHM_SLOTS: Batches en memoria compartida entre front-ends e inferencia (0 = automático)
+    - INFERENCE_TIMEOUT: Segundos máximos esperando un slot o la respuesta de inferencia
+    - INFERENCE_SOCKET: Socket Unix del daemon de inferencia (SERVING_LAYOUT=daemon)
+    - DAEMON_MAX_BATCH_SIZE: Máximo de imágenes por forward del daemon (juntando todos los workers)
+    - DAEMON_BATCH_WAIT_MS: Ventana del daemon para juntar requests de distintos workers (ms)
+    - STARTUP_PROFILE: true/false (loguear tiempo y RSS por fase del arranque)
+    - EXECUTOR_KIND: thread/process (pool para decode y validación)
+    - EXECUTOR_POOL_SIZE: Workers del pool de inferencia
+    - EXECUTOR_QUEUE_DEPTH: Tareas en espera antes de responder 503
+    - DECODE_WORKERS: Procesos de decode + preprocesamiento por worker (0 = en el executor)
+    - DECODE_RING_SIZE: Entradas del anillo de memoria compartida del pipeline de decode (0 = automático)
+    - ADMISSION_ENABLED: true/false (control de admisión: 503 + Retry-After bajo sobrecarga)
+    - ADMISSION_MAX_IN_FLIGHT: Requests de predicción en curso por worker (0 = automático)
+    - ADMISSION_QUEUE_BUDGET_MS: Espera máxima en la cola de admisión antes de responder 503
+    - ADMISSION_MAX_QUEUE: Requests en la cola de admisión antes de responder 503
+    - DEADLINE_HEADER: Header con los ms que el cliente espera la respuesta (ej: X-Deadline-Ms)
+    - DEADLINE_DEFAULT_MS: Deadline de /predict, /predict/raw y /predict/batch sin header (0 = sin deadline)
+    - DEADLINE_ESP_MS: Deadline de /predict/esp sin header (0 = DEADLINE_DEFAULT_MS)
     - PORT: Puerto del servidor (requiere restart)
     - HOST: Host del servidor (requiere restart)
     - UID: ID del usuario (informativo, para build args)
@@ -29,9 +90,37 @@ class Settings(BaseSettings):
     
     # Configuración del modelo
     MODEL_PATH: str = "models/mobilenetv2_waste_pytorch_best.pth"
+    MODEL_BACKEND: str = "auto"  # Motor de inferencia (ver app/models/backends)
     IMG_SIZE: Tuple[int, int] = (224, 224)
     CONFIDENCE_THRESHOLD: float = 0.7
     MAX_FILE_SIZE: int = 5_000_000  # 5MB
+    # Body completo (413 antes de leerlo); 0 = MAX_FILE_SIZE + margen multipart,
+    # x MAX_BATCH_FILES en /predict/batch
+    MAX_REQUEST_BODY_SIZE: int = 0
+    REDUCED_DECODE_ENABLED: bool = True  # JPEG grandes: IMREAD_REDUCED_COLOR_2/4/8
+    
+    # Serving PyTorch (solo aplica a modelos .pth/.pt)
+    # eager: módulo normal | torchscript: Conv-BN folding + trace + freeze
+    # int8: cuantizado (backbone estático + cabezal dinámico), solo CPU
+    TORCH_SERVING_MODE: str = "eager"
+    TORCH_CHANNELS_LAST: bool = True
+    TORCH_COMPILED_CACHE_DIR: str = "models/.compiled"
+    TORCH_MMAP_WEIGHTS: bool = True
+    
+    # Cuantización INT8 (TORCH_SERVING_MODE=int8)
+    QUANT_CALIBRATION_DIR: str = ""
+    QUANT_VALIDATION_DIR: str = ""
+    QUANT_MIN_AGREEMENT: float = 0.98
+    QUANT_CALIBRATION_SAMPLES: int = 200
+    QUANT_BACKEND: str = "x86"
+    
+    # TFLite (solo aplica a modelos .tflite)
+    TFLITE_NUM_THREADS: int = 0
+    
+    # ONNX Runtime (solo aplica a modelos .onnx)
+    ONNX_INTRA_OP_THREADS: int = 0
+    ONNX_INTER_OP_THREADS: int = 0
+    ONNX_GRAPH_OPTIMIZATION: str = "all"
     
     # Clases del modelo (no son campos de config, son constantes)
     # ⚠️ Estas NO se pueden cambiar desde .env
@@ -45,6 +134,77 @@ class Settings(BaseSettings):
     ENABLE_CONSOLE_LOGGING: bool = True
     LOG_PREDICTIONS: bool = True  # Para análisis posterior
     
+    # Micro-batching: junta requests concurrentes en un solo forward
+    BATCHING_ENABLED: bool = True
+    MAX_BATCH_SIZE: int = 8
+    BATCH_MAX_WAIT_MS: float = 5.0
+    MAX_BATCH_FILES: int = 32  # /predict/batch
+    
+    # Cache de resultados por hash del archivo (reintentos de cámaras fijas)
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_SIZE: int = 1024
+    RESULT_CACHE_TTL: float = 60.0
+    
+    # Supresión de frames casi idénticos (dHash por dispositivo). Opt-in: un objeto
+    # nuevo sobre un fondo fijo puede heredar la clase del frame anterior
+    DEDUP_ENABLED: bool = False
+    DEDUP_MAX_DISTANCE: int = 4
+    DEDUP_HISTORY_SIZE: int = 8
+    DEDUP_MAX_AGE: float = 10.0
+    DEDUP_DEVICE_HEADER: str = "X-Device-ID"
+    
+    # Threads por worker (evita oversubscription con varios workers)
+    WORKERS: int = 1
+    INFERENCE_THREADS: int = 0
+    INFERENCE_INTEROP_THREADS: int = 0
+    
+    # Auto-tuning de workers/threads/batch (ver app/core/autotune.py)
+    AUTOTUNE_ON_STARTUP: bool = False
+    AUTOTUNE_FILE: str = "models/.autotune.json"
+    AUTOTUNE_DURATION: float = 3.0
+    AUTOTUNE_P99_BUDGET_MS: float = 250.0
+    
+    # Warm-up al arrancar: /ready da 503 hasta que termine
+    WARMUP_ENABLED: bool = True
+    WARMUP_ITERATIONS: int = 2
+    WARMUP_BATCH_SIZES: str = ""
+    
+    # Recarga en caliente del modelo (ver app/models/model_manager.py)
+    MODEL_WATCH_INTERVAL: float = 0.0
+    ADMIN_TOKEN: str = ""
+    
+    # Layout de serving (ver app/serving): workers = un modelo por worker de uvicorn
+    SERVING_LAYOUT: str = "workers"
+    INFERENCE_WORKERS: int = 2
+    SHM_SLOTS: int = 0
+    INFERENCE_TIMEOUT: float = 30.0
+    INFERENCE_SOCKET: str = "/tmp/waste-classifier-inference.sock"
+    DAEMON_MAX_BATCH_SIZE: int = 32
+    DAEMON_BATCH_WAIT_MS: float = 2.0
+    
+    # Perfil de arranque (siempre en /stats; con true también la tabla en el log)
+    STARTUP_PROFILE: bool = False
+    
+    # Executor: saca decode/inferencia/log del event loop
+    EXECUTOR_KIND: str = "thread"  # "thread" o "process"
+    EXECUTOR_POOL_SIZE: int = 4
+    EXECUTOR_QUEUE_DEPTH: int = 64
+    
+    # Pipeline de decode (app/core/pipeline.py): procesos que dejan el tensor listo en memoria compartida
+    DECODE_WORKERS: int = 0
+    DECODE_RING_SIZE: int = 0
+    
+    # Control de admisión (app/core/admission.py): en curso acotado + cola con presupuesto de latencia
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_MAX_IN_FLIGHT: int = 0  # 0 = 2 x max(MAX_BATCH_SIZE, EXECUTOR_POOL_SIZE)
+    ADMISSION_QUEUE_BUDGET_MS: float = 1000.0
+    ADMISSION_MAX_QUEUE: int = 256
+    
+    # Deadlines por request (app/core/deadline.py): lo vencido se descarta antes del modelo
+    DEADLINE_HEADER: str = "X-Deadline-Ms"
+    DEADLINE_DEFAULT_MS: float = 0.0
+    DEADLINE_ESP_MS: float = 0.0
+    
     # Configuración del servidor
     PORT: int = 8000
     HOST: str = "0.0.0.0"
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import math
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+OVERLOADED_DETAIL = "Servidor saturado, reintente"
+
+# Límites superiores (ms) de los buckets del histograma de espera en cola
+QUEUE_WAIT_BUCKETS_MS = (0, 10, 50, 100, 250, 500, 1000, 2500)
+
+
+class OverloadedError(HTTPException):
+    """503 con Retry-After (segundos enteros, como pide HTTP)"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=503,
+            detail=OVERLOADED_DETAIL,
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+class AdmissionController:
+    """
+    Control de admisión de las rutas de predicción
+
+    Hasta `max_in_flight` requests se procesan a la vez; el resto espera en
+    una cola FIFO. Al llegar, la espera se estima con el tiempo de servicio
+    medio (EWMA de los últimos requests):
+
+        espera ≈ (posición en la cola + 1) x servicio / max_in_flight
+
+    Si supera `queue_budget_ms` (o la cola ya tiene `max_queue` requests) se
+    responde 503 en el acto, con un Retry-After de lo que tardaría en
+    vaciarse la cola actual: mejor que unos pocos clientes reintenten que
+    todos esperen hasta su timeout. Un request que igual pasa el presupuesto
+    esperando (la estimación se quedó corta) sale con 503 al cumplirse.
+
+    Un solo event loop por worker: no necesita locks.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        queue_budget_ms: float = 1000.0,
+        max_queue: int = 256,
+        smoothing: float = 0.2
+    ):
+        self.max_in_flight = max(1, max_in_flight)
+        self.queue_budget = max(0.0, queue_budget_ms) / 1000.0
+        self.max_queue = max(0, max_queue)
+        self.smoothing = smoothing
+
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Sin mediciones todavía: se admite hasta llenar la cola
+        self._service_time: Optional[float] = None
+
+        self._admitted = 0
+        self._shed: Counter = Counter()
+        self._queue_wait_histogram: Counter = Counter()
+        self._total_queue_wait = 0.0
+        self._max_queue_wait = 0.0
+
+    def estimated_wait(self, position: int) -> float:
+        """Segundos hasta que se libere un lugar para el request en `position` de la cola"""
+        if self._service_time is None:
+            return 0.0
+        return (position + 1) * self._service_time / self.max_in_flight
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self.estimated_wait(len(self._waiters))))
+
+    def _reject(self, reason: str) -> OverloadedError:
+        self._shed[reason] += 1
+        retry_after = self._retry_after()
+        # Debug: en una avalancha serían cientos de líneas por segundo (los totales van a /stats)
+        logger.debug(
+            f"Request rechazado ({reason}): {self._in_flight} en curso, "
+            f"{len(self._waiters)} en cola, Retry-After {retry_after}s"
+        )
+        return OverloadedError(retry_after)
+
+    async def acquire(self):
+        """
+        Espera un lugar para procesar el request
+
+        Raises:
+            OverloadedError: la espera estimada (o la real) supera el presupuesto
+        """
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+            self._admit(0.0)
+            return
+
+        position = len(self._waiters)
+        if position >= self.max_queue:
+            raise self._reject("queue_full")
+        if self.estimated_wait(position) > self.queue_budget:
+            raise self._reject("over_budget")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        start = time.perf_counter()
+        try:
+            # release() le pasa el lugar directo (el contador no baja en el medio)
+            await asyncio.wait_for(future, self.queue_budget)
+        except asyncio.TimeoutError:
+            self._discard(future)
+            raise self._reject("timeout")
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(None)  # El lugar ya era de este request
+            else:
+                self._discard(future)
+            raise
+        self._admit(time.perf_counter() - start)
+
+    def _discard(self, future: asyncio.Future):
+        # release() puede haberlo sacado ya de la cola (y salteado por cancelado)
+        try:
+            self._waiters.remove(future)
+        except ValueError:
+            pass
+
+    def release(self, service_time: Optional[float]):
+        """Libera el lugar (service_time: segundos que estuvo en curso, para la estimación)"""
+        if service_time is not None:
+            if self._service_time is None:
+                self._service_time = service_time
+            else:
+                self._service_time += self.smoothing * (service_time - self._service_time)
+
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self._in_flight -= 1
+
+    def _admit(self, waited: float):
+        self._admitted += 1
+        self._total_queue_wait += waited
+        self._max_queue_wait = max(self._max_queue_wait, waited)
+        waited_ms = waited * 1000
+        for bound in QUEUE_WAIT_BUCKETS_MS:
+            if waited_ms <= bound:
+                self._queue_wait_histogram[str(bound)] += 1
+                break
+        else:
+            self._queue_wait_histogram["+Inf"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        shed = sum(self._shed.values())
+        offered = self._admitted + shed
+        histogram = {str(bound): 0 for bound in QUEUE_WAIT_BUCKETS_MS}
+        histogram["+Inf"] = 0
+        histogram.update(self._queue_wait_histogram)
+        return {
+            "max_in_flight": self.max_in_flight,
+            "queue_budget_ms": self.queue_budget * 1000,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queued": len(self._waiters),
+            "admitted": self._admitted,
+            "shed": shed,
+            "shed_by_reason": {
+                reason: self._shed[reason] for reason in ("over_budget", "queue_full", "timeout")
+            },
+            "shed_rate": round(shed / offered, 4) if offered else 0.0,
+            "avg_service_ms": round(self._service_time * 1000, 2) if self._service_time else 0.0,
+            "estimated_wait_ms": round(self.estimated_wait(len(self._waiters)) * 1000, 2),
+            "avg_queue_wait_ms": round(self._total_queue_wait / self._admitted * 1000, 2) if self._admitted else 0.0,
+            "max_queue_wait_ms": round(self._max_queue_wait * 1000, 2),
+            "queue_wait_ms_histogram": histogram,
+        }
+
+
+class AdmissionMiddleware:
+    """
+    Middleware ASGI que pasa las rutas de predicción por el AdmissionController
+
+    Va antes de leer el body: un request rechazado no ocupa decode, memoria
+    ni modelo. El tiempo de servicio se mide hasta que termina la respuesta.
+    """
+
+    def __init__(self, app, controller: AdmissionController, path_prefixes: Tuple[str, ...] = ("/predict",)):
+        self.app = app
+        self.controller = controller
+        self.path_prefixes = path_prefixes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.controller.acquire()
+        except OverloadedError as e:
+            await JSONResponse({"detail": e.detail}, status_code=503, headers=e.headers)(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(time.perf_counter() - start)
@@ -0,0 +1,301 @@
+"""
+Auto-tuning de threads / workers / batch para el motor activo
+
+Sin configuración, cada worker de uvicorn deja que torch / OpenCV / ONNX
+Runtime usen todos los cores: con --workers N hay N x cores threads peleando
+y la latencia de cola explota. Este módulo:
+
+- run_autotune(): mide combinaciones (workers, threads por worker, batch)
+  con entradas sintéticas 224x224, cada worker en su propio proceso, y elige
+  la de mayor throughput con p99 dentro del presupuesto
+- save_tuning() / load_tuning(): persiste el resultado en JSON, atado al
+  modelo, motor y cantidad de cores de la máquina
+- configure_threads(): al arrancar cada worker aplica la configuración
+  guardada (o un default sin oversubscription) antes de cargar el modelo
+"""
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Segundos que tiene cada proceso de benchmark para cargar el modelo
+LOAD_TIMEOUT = 300
+
+
+def tuning_fingerprint() -> Dict[str, Any]:
+    """Lo que invalida un tuning guardado: modelo, motor, modo y cores"""
+    from app.models.backends import resolve_backend_name
+
+    return {
+        "model_path": str(Path(settings.MODEL_PATH).resolve()),
+        "backend": resolve_backend_name(settings.MODEL_PATH, settings.MODEL_BACKEND),
+        "torch_serving_mode": settings.TORCH_SERVING_MODE,
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def load_tuning(path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Configuración guardada, o None si no existe o es de otro modelo/máquina"""
+    path = Path(path or settings.AUTOTUNE_FILE)
+    if not path.exists():
+        return None
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, ValueError) as e:
+        logger.warning(f"Tuning ilegible ({path}): {e}")
+        return None
+
+    if data.get("fingerprint") != tuning_fingerprint():
+        logger.info(f"Tuning en {path} es de otro modelo/máquina, se ignora")
+        return None
+    return data
+
+
+def save_tuning(result: Dict[str, Any], path: Optional[str] = None) -> Path:
+    path = Path(path or settings.AUTOTUNE_FILE)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"fingerprint": tuning_fingerprint(), **result}, indent=2))
+    return path
+
+
+def configure_threads(workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Fija threads (y batch) del proceso antes de cargar el modelo
+
+    Prioridad: valores explícitos en .env > tuning guardado > default
+    (cores / workers, sin oversubscription). El tuning solo se aplica si se
+    midió con la misma cantidad de workers: sus threads por worker con otro
+    --workers sobresuscriben (o desperdician) cores.
+
+    Returns:
+        configuración aplicada
+    """
+    import cv2
+
+    workers = workers or settings.WORKERS
+    tuning = load_tuning()
+    if tuning and tuning["best"]["workers"] != workers:
+        logger.info(
+            f"Tuning medido con {tuning['best']['workers']} workers y hay {workers}: "
+            f"se usa el default (cores / workers)"
+        )
+        tuning = None
+    chosen = tuning["best"] if tuning else {
+        "intra_op_threads": max(1, (os.cpu_count() or 1) // max(1, workers)),
+        "inter_op_threads": 1,
+    }
+
+    explicit = settings.model_fields_set
+    if "INFERENCE_THREADS" not in explicit and not settings.INFERENCE_THREADS:
+        settings.INFERENCE_THREADS = chosen["intra_op_threads"]
+    if "INFERENCE_INTEROP_THREADS" not in explicit and not settings.INFERENCE_INTEROP_THREADS:
+        settings.INFERENCE_INTEROP_THREADS = chosen["inter_op_threads"]
+    if tuning and "MAX_BATCH_SIZE" not in explicit:
+        settings.MAX_BATCH_SIZE = chosen["batch_size"]
+
+    # OpenCV: el decode/resize corre en varios threads del executor a la vez
+    cv2.setNumThreads(settings.INFERENCE_THREADS)
+
+    applied = {
+        "source": "tuning" if tuning else "default",
+        "workers": workers,
+        "intra_op_threads": settings.INFERENCE_THREADS,
+        "inter_op_threads": settings.INFERENCE_INTEROP_THREADS,
+        "max_batch_size": settings.MAX_BATCH_SIZE,
+    }
+    logger.info(
+        f"Threads ({applied['source']}): intra-op {applied['intra_op_threads']}, "
+        f"inter-op {applied['inter_op_threads']}, batch {applied['max_batch_size']}"
+    )
+    return applied
+
+
+def tuned_workers() -> Optional[int]:
+    """Workers del tuning guardado (para run.py), o None"""
+    tuning = load_tuning()
+    return tuning["best"]["workers"] if tuning else None
+
+
+def select_workers(requested: Optional[int] = None) -> int:
+    """
+    Workers de uvicorn: --workers > tuning guardado > WORKERS
+
+    Lo fija en settings (con un solo worker la app corre en el proceso de
+    run.py, que ya cargó settings) y en el entorno (los workers hijos leen
+    .env de nuevo): configure_threads y /admin/reload leen ese valor.
+    """
+    workers = requested or tuned_workers() or settings.WORKERS
+    settings.WORKERS = workers
+    os.environ["WORKERS"] = str(workers)
+    return workers
+
+
+def candidate_configs(
+    cpu_count: int,
+    workers: Optional[List[int]] = None,
+    batch_sizes: Optional[List[int]] = None
+) -> List[Dict[str, int]]:
+    """
+    Combinaciones a medir: workers en potencias de 2 hasta los cores, con
+    todos los cores repartidos (cores / workers threads) o 1 thread por worker
+    """
+    if workers is None:
+        workers = sorted({w for w in (1, 2, 4, 8, 16, 32, cpu_count) if w <= cpu_count})
+    batch_sizes = batch_sizes or [1, 4, 8]
+
+    configs = []
+    for w in workers:
+        for threads in sorted({max(1, cpu_count // w), 1}, reverse=True):
+            for batch_size in batch_sizes:
+                configs.append({
+                    "workers": w,
+                    "intra_op_threads": threads,
+                    "inter_op_threads": 1,
+                    "batch_size": batch_size,
+                })
+    return configs
+
+
+def _benchmark_worker(config, duration, barrier, results):
+    """Un worker de un candidato: carga el modelo, espera a los demás y mide"""
+    settings.INFERENCE_THREADS = config["intra_op_threads"]
+    settings.INFERENCE_INTEROP_THREADS = config["inter_op_threads"]
+    import cv2
+    cv2.setNumThreads(config["intra_op_threads"])
+
+    from app.models.mobilenet_classifier import MobileNetClassifier
+
+    classifier = MobileNetClassifier()
+    classifier.load_model(settings.MODEL_PATH)
+
+    height, width = settings.IMG_SIZE
+    rng = np.random.default_rng(os.getpid())
+    images = [
+        rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        for _ in range(config["batch_size"])
+    ]
+    for _ in range(3):
+        classifier.predict_batch(images)
+
+    try:
+        barrier.wait(timeout=LOAD_TIMEOUT)
+    except threading.BrokenBarrierError:
+        return  # Otro worker no llegó (falló al cargar): measure_config lo reporta
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        classifier.predict_batch(images)
+        latencies.append(time.perf_counter() - start)
+    results.put(latencies)
+
+
+def measure_config(config: Dict[str, int], duration: float = 3.0) -> Dict[str, Any]:
+    """
+    Corre `workers` procesos en paralelo y mide throughput (imágenes/s) y
+    p50/p99 (ms) de cada predict_batch; la latencia de una imagen es la de su batch
+
+    Raises:
+        RuntimeError: algún worker murió o no terminó a tiempo
+    """
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(config["workers"])
+    results = context.Queue()
+    # daemon: si el proceso principal sale, no quedan benchmarks colgados
+    processes = [
+        context.Process(target=_benchmark_worker, args=(config, duration, barrier, results), daemon=True)
+        for _ in range(config["workers"])
+    ]
+    try:
+        for process in processes:
+            process.start()
+
+        per_worker = []
+        # Margen para cargar el modelo en cada proceso
+        give_up = time.monotonic() + duration + LOAD_TIMEOUT
+        while len(per_worker) < len(processes):
+            try:
+                per_worker.append(results.get(timeout=1.0))
+                continue
+            except queue.Empty:
+                pass
+            failed = [p.exitcode for p in processes if p.exitcode not in (None, 0)]
+            if failed:
+                raise RuntimeError(f"Worker de benchmark murió (exit {failed[0]}) con {config}")
+            if time.monotonic() > give_up:
+                raise RuntimeError(f"Workers de benchmark sin resultados con {config}")
+        latencies = [latency for worker in per_worker for latency in worker]
+    finally:
+        for process in processes:
+            if process.pid is None:
+                continue  # Falló el start() de uno anterior
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        **config,
+        "throughput": round(len(latencies) * config["batch_size"] / duration, 1),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 2),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 2),
+    }
+
+
+def pick_best(measurements: List[Dict[str, Any]], p99_budget_ms: float) -> Dict[str, Any]:
+    """Mayor throughput con p99 <= presupuesto; si ninguno entra, el de menor p99"""
+    within = [m for m in measurements if m["p99_ms"] <= p99_budget_ms]
+    if within:
+        return max(within, key=lambda m: m["throughput"])
+    return min(measurements, key=lambda m: m["p99_ms"])
+
+
+def run_autotune(
+    duration: Optional[float] = None,
+    p99_budget_ms: Optional[float] = None,
+    workers: Optional[List[int]] = None,
+    batch_sizes: Optional[List[int]] = None
+) -> Dict[str, Any]:
+    """
+    Mide todos los candidatos para el modelo/motor de settings y elige el mejor
+
+    Returns:
+        {"best": {...}, "measurements": [...], "p99_budget_ms": ..., "tuned_at": ...}
+    """
+    duration = duration or settings.AUTOTUNE_DURATION
+    p99_budget_ms = p99_budget_ms or settings.AUTOTUNE_P99_BUDGET_MS
+    configs = candidate_configs(os.cpu_count() or 1, workers, batch_sizes)
+
+    logger.info(f"Auto-tuning: {len(configs)} configuraciones x {duration}s")
+    measurements = []
+    for config in configs:
+        result = measure_config(config, duration)
+        measurements.append(result)
+        logger.info(
+            f"  workers={result['workers']} threads={result['intra_op_threads']} "
+            f"batch={result['batch_size']}: {result['throughput']} img/s, "
+            f"p99 {result['p99_ms']}ms"
+        )
+
+    best = pick_best(measurements, p99_budget_ms)
+    logger.info(
+        f"Mejor: workers={best['workers']} threads={best['intra_op_threads']} "
+        f"batch={best['batch_size']} ({best['throughput']} img/s, p99 {best['p99_ms']}ms)"
+    )
+    return {
+        "best": best,
+        "measurements": measurements,
+        "p99_budget_ms": p99_budget_ms,
+        "tuned_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Agrupa requests concurrentes de /predict en un solo forward del modelo
+
+    Cada request deja su imagen en una cola y espera un Future. Un worker
+    asíncrono junta hasta `max_batch_size` imágenes o hasta que pasen
+    `max_wait_ms` desde la primera, ejecuta `classifier.classify_batch` una
+    vez y reparte los resultados a cada request.
+    """
+
+    def __init__(
+        self,
+        classifier,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 5.0,
+        executor=None
+    ):
+        self.classifier = classifier
+        # InferenceExecutor opcional; sin él se usa el executor por defecto del loop
+        self.executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        # Métricas para ajustar batch size / espera bajo carga real
+        self._batch_sizes: Counter = Counter()
+        self._total_items = 0
+        self._total_batches = 0
+        self._total_inference_time = 0.0
+        self._expired = 0
+
+    def _ensure_worker(self):
+        """Arranca el worker en el event loop actual (lazy)"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, image: np.ndarray, deadline=None) -> Dict[str, Any]:
+        """
+        Encola una imagen y espera su predicción
+
+        Args:
+            deadline: Deadline del request (app/core/deadline.py); si al
+                armar el batch ya no llega a tiempo, la imagen no entra
+
+        Returns:
+            dict con el mismo formato que classifier.predict
+
+        Raises:
+            DeadlineExceeded: el deadline venció antes de la inferencia
+        """
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image, future, deadline))
+        return await future
+
+    async def _collect(self) -> List[Tuple[np.ndarray, asyncio.Future, Any]]:
+        """Espera el primer item y junta más hasta llenar el batch o agotar la espera"""
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # Sin espera: tomar lo que ya esté en cola
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        """Loop principal del worker"""
+        while True:
+            batch = await self._collect()
+            # Descartar requests cuyo cliente ya se fue (Future cancelado) o
+            # cuyo deadline vence antes de que termine el forward (según el
+            # tiempo medio de un batch): no ocupan lugar en el batch
+            expected = self._total_inference_time / self._total_batches if self._total_batches else 0.0
+            live = []
+            for image, future, deadline in batch:
+                if future.done():
+                    continue
+                if deadline is not None and deadline.remaining() < expected:
+                    future.set_exception(deadline.expire("inference"))
+                    self._expired += 1
+                    continue
+                live.append((image, future))
+            batch = live
+            if not batch:
+                continue
+
+            images = [image for image, _ in batch]
+            start = time.perf_counter()
+            try:
+                results = await self._classify(images)
+            except Exception as e:
+                logger.error(f"Error en batch de {len(images)} imágenes: {str(e)}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            elapsed = time.perf_counter() - start
+            self._record(len(images), elapsed)
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def _classify(self, images: List[np.ndarray]) -> List[Dict[str, Any]]:
+        if self.executor is not None:
+            return await self.executor.run_in_thread(self.classifier.classify_batch, images)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.classifier.classify_batch, images)
+
+    def _record(self, batch_size: int, elapsed: float):
+        """Registra el tamaño de batch logrado"""
+        self._batch_sizes[batch_size] += 1
+        self._total_items += batch_size
+        self._total_batches += 1
+        self._total_inference_time += elapsed
+        logger.debug(f"Batch ejecutado: {batch_size} imágenes en {elapsed * 1000:.1f}ms")
+
+    def stats(self) -> Dict[str, Any]:
+        """Tamaños de batch logrados (para /stats)"""
+        avg_size = self._total_items / self._total_batches if self._total_batches else 0.0
+        avg_time = self._total_inference_time / self._total_batches if self._total_batches else 0.0
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self._total_batches,
+            "items": self._total_items,
+            "avg_batch_size": round(avg_size, 2),
+            "avg_batch_time_ms": round(avg_time * 1000, 2),
+            "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "expired": self._expired,
+        }
+
+    async def stop(self):
+        """Detiene el worker (shutdown)"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
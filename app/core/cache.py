@@ -0,0 +1,90 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class ResultCache:
+    """
+    Cache LRU + TTL de resultados ya postprocesados, por hash del archivo
+
+    Las cámaras fijas reenvían el mismo frame en reintentos/reconexiones; con
+    un hit se evita decode + inferencia. Cada entrada se guarda junto con un
+    `fingerprint` (versión del modelo + umbral de confianza): si cambia, el
+    cache completo se invalida en el siguiente acceso.
+
+    Solo se usa desde el event loop, por eso no lleva lock.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 60.0):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl_seconds
+
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._fingerprint: Optional[Hashable] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key_for(data, variant: str = "") -> bytes:
+        """Hash rápido (blake2b 128 bits) de los bytes subidos"""
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        return digest + variant.encode() if variant else digest
+
+    def _check_fingerprint(self, fingerprint: Hashable):
+        if fingerprint != self._fingerprint:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self._fingerprint = fingerprint
+
+    def get(self, key: bytes, fingerprint: Hashable) -> Optional[Any]:
+        """Retorna el valor cacheado o None (miss / expirado / invalidado)"""
+        self._check_fingerprint(fingerprint)
+
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: bytes, value: Any, fingerprint: Hashable):
+        self._check_fingerprint(fingerprint)
+
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
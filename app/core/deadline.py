@@ -0,0 +1,127 @@
+import math
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+
+EXPIRED_DETAIL = "Deadline vencido, request descartado"
+
+# Etapas donde se revisa el deadline (en orden)
+STAGES = ("decode", "inference", "logging")
+
+
+class DeadlineExceeded(HTTPException):
+    """504 para trabajo que ya no le sirve al cliente (sin stack trace ni log de error)"""
+
+    def __init__(self):
+        super().__init__(status_code=504, detail=EXPIRED_DETAIL)
+
+
+class Deadline:
+    """Momento (time.monotonic) a partir del cual el resultado ya no sirve"""
+
+    __slots__ = ("expires_at", "tracker")
+
+    def __init__(self, expires_at: float, tracker: "DeadlineTracker"):
+        self.expires_at = expires_at
+        self.tracker = tracker
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def expire(self, stage: str) -> DeadlineExceeded:
+        """Cuenta el descarte en `stage` y retorna el 504 a levantar"""
+        self.tracker.expired(stage)
+        return DeadlineExceeded()
+
+    def check(self, stage: str):
+        """
+        Raises:
+            DeadlineExceeded: si el deadline ya pasó (antes de `stage`)
+        """
+        if self.expired:
+            raise self.expire(stage)
+
+
+class DeadlineTracker:
+    """
+    Deadline por request + contabilidad de lo descartado
+
+    El cliente manda cuánto está dispuesto a esperar en un header (ms desde
+    que llega el request: los relojes de los ESP32 no están sincronizados);
+    sin header se usa el default de la ruta (0 = sin deadline). Se revisa
+    antes del decode, antes de la inferencia (también dentro del
+    micro-batcher, donde más espera un frame) y antes del log de predicción.
+    """
+
+    def __init__(self, header: str, default_ms: float = 0.0, path_defaults: Optional[Dict[str, float]] = None):
+        self.header = header.lower().encode("latin-1")
+        self.header_name = header
+        self.default_ms = default_ms
+        self.path_defaults = dict(path_defaults or {})
+
+        self.with_deadline = 0
+        self.from_header = 0
+        self._expired: Counter = Counter()
+
+    def deadline_for(self, path: str, headers, arrived: float) -> Optional[Deadline]:
+        """Deadline del request (headers ASGI: lista de (nombre, valor) en bytes)"""
+        budget_ms = self.path_defaults.get(path, self.default_ms)
+        for name, value in headers:
+            if name == self.header:
+                try:
+                    parsed = float(value)
+                except ValueError:
+                    break  # Header inválido: default de la ruta
+                # nan/inf pasarían el "<= 0" y darían un deadline que nunca vence
+                if math.isfinite(parsed):
+                    budget_ms = parsed
+                    self.from_header += 1
+                break
+
+        if budget_ms <= 0:
+            return None
+        self.with_deadline += 1
+        return Deadline(arrived + budget_ms / 1000.0, self)
+
+    def expired(self, stage: str):
+        self._expired[stage] += 1
+
+    def stats(self, inference_ms_per_item: float = 0.0) -> Dict[str, Any]:
+        """`inference_ms_per_item`: costo medio del modelo por imagen, para estimar lo ahorrado"""
+        skipped_inference = self._expired["decode"] + self._expired["inference"]
+        return {
+            "header": self.header_name,
+            "default_ms": self.default_ms,
+            "path_defaults_ms": self.path_defaults,
+            "requests_with_deadline": self.with_deadline,
+            "from_header": self.from_header,
+            "expired": {stage: self._expired[stage] for stage in STAGES},
+            "expired_total": sum(self._expired.values()),
+            "skipped_inferences": skipped_inference,
+            "estimated_saved_ms": round(skipped_inference * inference_ms_per_item, 2),
+        }
+
+
+class DeadlineMiddleware:
+    """
+    Middleware ASGI que fija el deadline de cada request al llegar
+
+    Va por fuera del control de admisión: la espera en su cola cuenta. El
+    deadline queda en `request.state.deadline` (None si no tiene).
+    """
+
+    def __init__(self, app, tracker: DeadlineTracker):
+        self.app = app
+        self.tracker = tracker
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith("/predict"):
+            deadline = self.tracker.deadline_for(scope["path"], scope["headers"], time.monotonic())
+            scope.setdefault("state", {})["deadline"] = deadline
+        await self.app(scope, receive, send)
@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Hashable, Optional
+
+import cv2
+import numpy as np
+
+
+def dhash(image: np.ndarray, hash_size: int = 8) -> int:
+    """
+    Difference hash de 64 bits sobre una miniatura en escala de grises
+
+    Compara cada pixel con su vecino derecho en una imagen de
+    (hash_size + 1) x hash_size; frames casi iguales dan hashes a pocos bits
+    de distancia.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class NearDuplicateDetector:
+    """
+    Reutiliza la clasificación de frames casi idénticos del mismo dispositivo
+
+    Por cada dispositivo se guarda un anillo con los últimos hashes y su
+    predicción cruda. Si el frame nuevo está a <= `max_distance` bits de
+    alguno (y no es más viejo que `max_age`), se reutiliza esa predicción y
+    se salta el modelo.
+    """
+
+    def __init__(
+        self,
+        max_distance: int = 4,
+        history_size: int = 8,
+        max_age_seconds: float = 10.0,
+        max_devices: int = 1024
+    ):
+        self.max_distance = max_distance
+        self.history_size = max(1, history_size)
+        self.max_age = max_age_seconds
+        self.max_devices = max(1, max_devices)
+
+        self._devices: "OrderedDict[str, deque]" = OrderedDict()
+        self._fingerprint: Optional[Hashable] = None
+        # compute_hash corre en threads del executor
+        self._lock = threading.Lock()
+
+        self.checks = 0
+        self.skips = 0
+        self._hash_time = 0.0
+        self._hashes = 0
+
+    def compute_hash(self, image: np.ndarray) -> int:
+        """dHash de la imagen, midiendo su costo"""
+        start = time.perf_counter()
+        value = dhash(image)
+        self.record_hash_time(time.perf_counter() - start)
+        return value
+
+    def record_hash_time(self, seconds: float):
+        """Costo de un hash calculado afuera (ej: en los procesos de decode)"""
+        with self._lock:
+            self._hash_time += seconds
+            self._hashes += 1
+
+    def _check_fingerprint(self, fingerprint: Hashable):
+        if fingerprint != self._fingerprint:
+            self._devices.clear()
+            self._fingerprint = fingerprint
+
+    def lookup(self, device_id: str, image_hash: int, fingerprint: Hashable) -> Optional[Any]:
+        """Predicción reutilizable para este frame, o None"""
+        with self._lock:
+            self._check_fingerprint(fingerprint)
+            self.checks += 1
+
+            ring = self._devices.get(device_id)
+            if not ring:
+                return None
+
+            now = time.monotonic()
+            for stored_hash, value, stored_at in reversed(ring):
+                if now - stored_at > self.max_age:
+                    continue
+                if (stored_hash ^ image_hash).bit_count() <= self.max_distance:
+                    self.skips += 1
+                    return value
+            return None
+
+    def remember(self, device_id: str, image_hash: int, value: Any, fingerprint: Hashable):
+        with self._lock:
+            self._check_fingerprint(fingerprint)
+
+            ring = self._devices.get(device_id)
+            if ring is None:
+                ring = deque(maxlen=self.history_size)
+                self._devices[device_id] = ring
+            self._devices.move_to_end(device_id)
+            ring.append((image_hash, value, time.monotonic()))
+
+            while len(self._devices) > self.max_devices:
+                self._devices.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            avg_hash_us = self._hash_time / self._hashes * 1e6 if self._hashes else 0.0
+            return {
+                "max_distance": self.max_distance,
+                "devices": len(self._devices),
+                "checks": self.checks,
+                "skips": self.skips,
+                "skip_rate": round(self.skips / self.checks, 4) if self.checks else 0.0,
+                "avg_hash_us": round(avg_hash_us, 1),
+                "total_hash_ms": round(self._hash_time * 1000, 2),
+            }
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceExecutor:
+    """
+    Pool acotado para sacar del event loop las etapas que usan CPU
+
+    - run(): etapas sin estado (decode, validación). Corren en el pool
+      configurado: threads o procesos.
+    - run_in_thread(): todo lo que toca objetos de este proceso (el modelo
+      cargado, archivos de log). Siempre corre en threads.
+
+    Si hay más de `max_workers + queue_depth` tareas pendientes se rechaza
+    la nueva con 503 en vez de acumular trabajo sin límite.
+    """
+
+    def __init__(self, kind: str = "thread", max_workers: int = 4, queue_depth: int = 64):
+        kind = kind.lower()
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Tipo de executor no soportado: {kind}")
+
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.queue_depth = max(0, queue_depth)
+
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._rejected = 0
+        self._completed = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.queue_depth
+
+    def _get_thread_pool(self) -> ThreadPoolExecutor:
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="inference"
+            )
+        return self._thread_pool
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._process_pool
+
+    async def _submit(self, pool: Executor, fn: Callable, *args, **kwargs) -> Any:
+        if self._pending >= self.capacity:
+            self._rejected += 1
+            logger.warning(f"Executor saturado ({self._pending} tareas pendientes)")
+            raise HTTPException(status_code=503, detail="Servidor saturado, reintente")
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(pool, partial(fn, *args, **kwargs))
+        finally:
+            self._pending -= 1
+            self._completed += 1
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Ejecuta una etapa sin estado (fn y args deben ser picklables en modo process)"""
+        pool = self._get_process_pool() if self.kind == "process" else self._get_thread_pool()
+        return await self._submit(pool, fn, *args, **kwargs)
+
+    async def run_in_thread(self, fn: Callable, *args, **kwargs) -> Any:
+        """Ejecuta en un thread (para el modelo compartido y escrituras de log)"""
+        return await self._submit(self._get_thread_pool(), fn, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "pool_size": self.max_workers,
+            "queue_depth": self.queue_depth,
+            "pending": self._pending,
+            "completed": self._completed,
+            "rejected": self._rejected,
+        }
+
+    def shutdown(self):
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
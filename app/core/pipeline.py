@@ -0,0 +1,477 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+from app.serving.shm import SharedTensorSlots
+
+logger = logging.getLogger(__name__)
+
+
+class _BusyMeter:
+    """Segundos ocupados: total y fracción de los últimos `window` segundos"""
+
+    def __init__(self, window: float = 10.0):
+        self.window = window
+        self.total = 0.0
+        self._started = time.monotonic()
+        self._buckets: deque = deque()  # [segundo, ocupado]
+
+    def add(self, seconds: float):
+        self.total += seconds
+        second = int(time.monotonic())
+        if self._buckets and self._buckets[-1][0] == second:
+            self._buckets[-1][1] += seconds
+        else:
+            self._buckets.append([second, seconds])
+        self._trim()
+
+    def _trim(self):
+        oldest = time.monotonic() - self.window
+        while self._buckets and self._buckets[0][0] < oldest:
+            self._buckets.popleft()
+
+    def utilization(self) -> float:
+        self._trim()
+        elapsed = min(self.window, time.monotonic() - self._started)
+        busy = sum(seconds for _, seconds in self._buckets)
+        return round(min(1.0, busy / elapsed), 3) if elapsed > 0 else 0.0
+
+
+class PreparedFrame:
+    """
+    Imagen ya decodificada y preprocesada, esperando en una entrada del anillo
+
+    `shape`: (alto, ancho) del archivo subido (no del decode reducido);
+    `hash_time`: segundos que llevó calcular `image_hash` en el proceso de decode;
+    `readers`: batches que están leyendo la entrada; `released`: la request
+    ya la devolvió (ver DecodePipeline.release).
+    """
+
+    __slots__ = ("ring", "entry", "shape", "image_hash", "hash_time", "readers", "released")
+
+    def __init__(self, ring: SharedTensorSlots, entry: int, shape: Tuple[int, int], image_hash: Optional[int]):
+        self.ring = ring
+        self.entry = entry
+        self.shape = shape
+        self.image_hash = image_hash
+        self.hash_time = 0.0
+        self.readers = 0
+        self.released = False
+
+
+def _decode_worker(index: int, tasks, results, ring_spec, preprocessor):
+    """
+    Proceso de decode: bytes -> decode_and_validate -> preprocessor.fill en el anillo
+
+    Mensajes: ("decode", task_id, entry, contents, with_hash), ("ring", spec),
+    ("preprocessor", objeto) o None para terminar. Responde
+    (task_id, shape, hash, segundos del hash, error, segundos ocupado).
+    """
+    import cv2
+
+    from app.core.dedup import dhash
+    from app.core.preprocessing import decode_and_validate
+
+    # Ctrl+C llega a todo el grupo: el proceso de la API coordina el apagado
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Un core por proceso: el paralelismo viene de tener varios
+    cv2.setNumThreads(1)
+    # Creado con spawn por el dueño del anillo: comparten resource tracker
+    ring = SharedTensorSlots.attach(ring_spec, untrack=False) if ring_spec else None
+
+    while True:
+        message = tasks.get()
+        if message is None:
+            break
+        kind = message[0]
+        if kind == "ring":
+            if ring is not None:
+                try:
+                    ring.close()
+                except BufferError:
+                    pass
+            ring = SharedTensorSlots.attach(message[1], untrack=False)
+            continue
+        if kind == "preprocessor":
+            preprocessor = message[1]
+            continue
+
+        _, task_id, entry, contents, with_hash = message
+        start = time.perf_counter()
+        try:
+            image, original_shape = decode_and_validate(contents)
+            preprocessor.fill(image, ring.inputs(0)[entry])
+            image_hash, hash_time = None, 0.0
+            if with_hash:
+                hash_start = time.perf_counter()
+                image_hash = dhash(image)
+                hash_time = time.perf_counter() - hash_start
+            results.put((task_id, original_shape, image_hash, hash_time, None, time.perf_counter() - start))
+        except Exception as e:
+            # Los HTTPException (400 de validación) viajan tal cual; el resto como mensaje
+            error = e if isinstance(e, HTTPException) else RuntimeError(str(e))
+            results.put((task_id, None, None, 0.0, error, time.perf_counter() - start))
+
+
+class DecodePipeline:
+    """
+    Decode + preprocesamiento en un pool de procesos, inferencia en este
+
+    Cada request toma una entrada libre de un anillo de memoria compartida
+    (SharedTensorSlots) y le pasa los bytes al proceso de decode menos
+    cargado, que escribe ahí el tensor float32 listo para el modelo. El
+    micro-batcher junta PreparedFrames y `classify_batch` arma el batch con
+    sus entradas (una vista si son consecutivas) y ejecuta solo `infer`:
+    mientras el modelo corre, los procesos ya decodifican lo siguiente y
+    ninguna de las dos etapas toma el GIL de la otra.
+
+    La entrada vuelve al anillo cuando termina la request (`release`), o
+    cuando termina su batch si la request se canceló durante el forward. Si
+    no hay entradas libres la request espera (backpressure); con más de
+    `queue_depth` esperando responde 503, igual que InferenceExecutor.
+
+    El preprocesador es el del motor activo: si cambia el modelo se manda
+    el nuevo a cada proceso (y un anillo nuevo si cambia la forma).
+    """
+
+    def __init__(self, classifier, workers: int = 2, ring_size: int = 16, queue_depth: int = 64):
+        self.classifier = classifier
+        self.num_workers = max(1, workers)
+        self.ring_size = max(1, ring_size)
+        self.queue_depth = max(0, queue_depth)
+
+        self._context = multiprocessing.get_context("spawn")
+        self._results = None
+        self._queues: List[Any] = []
+        self._processes: List[Any] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._collector: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+        self._ring: Optional[SharedTensorSlots] = None
+        self._preprocessor = None
+        self._free: Optional[asyncio.Queue] = None
+        # readers/released de los frames: los toca el thread de inferencia y el event loop
+        self._frames_lock = threading.Lock()
+        self._deferred_releases = 0
+        # task_id -> (proceso, future, frame sin hash/forma todavía, enviado)
+        self._tasks: Dict[int, Tuple[int, asyncio.Future, PreparedFrame, float]] = {}
+        self._ids = itertools.count()
+        self._in_flight = [0] * self.num_workers
+
+        self._waiting = 0
+        self._rejected = 0
+        self._errors = 0
+        self._restarts = 0
+        self._decoded = 0
+        self._decode_time = 0.0
+        self._queue_time = 0.0
+        self._busy = [_BusyMeter() for _ in range(self.num_workers)]
+        self._tasks_done = [0] * self.num_workers
+        self._inference_busy = _BusyMeter()
+        self._inference_batches = 0
+        self._inference_items = 0
+        self._gather_time = 0.0
+
+    def start(self):
+        """Arranca los procesos (desde el event loop, en el startup de la app)"""
+        self._loop = asyncio.get_running_loop()
+        self._free = asyncio.Queue()
+        self._results = self._context.Queue()
+        self._queues = [None] * self.num_workers
+        self._processes = [None] * self.num_workers
+        for index in range(self.num_workers):
+            self._start_worker(index)
+        self._collector = threading.Thread(target=self._collect, name="decode-results", daemon=True)
+        self._collector.start()
+        logger.info(f"Pipeline de decode: {self.num_workers} procesos, anillo de {self.ring_size} entradas")
+
+    def _start_worker(self, index: int):
+        self._queues[index] = self._context.Queue()
+        process = self._context.Process(
+            target=_decode_worker,
+            args=(
+                index, self._queues[index], self._results,
+                self._ring.spec() if self._ring else None, self._preprocessor,
+            ),
+            name=f"decode-{index}",
+            daemon=True,
+        )
+        process.start()
+        self._processes[index] = process
+
+    def _sync_preprocessor(self):
+        """Manda a los procesos el preprocesador del motor activo si cambió (ej: recarga)"""
+        preprocessor = self.classifier.preprocessor
+        if preprocessor is None:
+            raise RuntimeError("Modelo no cargado")
+        if preprocessor is self._preprocessor:
+            return
+
+        sample_shape = tuple(preprocessor.sample_shape)
+        if self._ring is None or self._ring.sample_shape != sample_shape:
+            previous = self._ring
+            self._ring = SharedTensorSlots(1, self.ring_size, sample_shape, 1)
+            # Misma cola (puede haber requests esperando): todas las entradas del anillo nuevo libres
+            while not self._free.empty():
+                self._free.get_nowait()
+            for entry in range(self.ring_size):
+                self._free.put_nowait(entry)
+            for tasks in self._queues:
+                tasks.put(("ring", self._ring.spec()))
+            if previous is not None:
+                # Los frames en curso mantienen el mapeo hasta terminar
+                previous.unlink()
+        for tasks in self._queues:
+            tasks.put(("preprocessor", preprocessor))
+        self._preprocessor = preprocessor
+
+    async def submit(self, contents: bytes, with_hash: bool = False) -> PreparedFrame:
+        """
+        Decodifica y preprocesa en un proceso del pool
+
+        Returns:
+            PreparedFrame (liberar con `release` al terminar la request)
+        """
+        if self._waiting >= self.queue_depth:
+            self._rejected += 1
+            logger.warning(f"Pipeline de decode saturado ({self._waiting} requests esperando)")
+            raise HTTPException(status_code=503, detail="Servidor saturado, reintente")
+
+        self._sync_preprocessor()
+        self._waiting += 1
+        try:
+            entry = await self._free.get()
+        finally:
+            self._waiting -= 1
+
+        worker = min(range(self.num_workers), key=self._in_flight.__getitem__)
+        task_id = next(self._ids)
+        future = self._loop.create_future()
+        frame = PreparedFrame(self._ring, entry, (0, 0), None)
+        self._tasks[task_id] = (worker, future, frame, time.perf_counter())
+        self._in_flight[worker] += 1
+        self._queues[worker].put(("decode", task_id, entry, contents, with_hash))
+        # Si la request se cancela, la entrada vuelve al anillo cuando el proceso termine (_resolve)
+        return await future
+
+    def release(self, frame: PreparedFrame):
+        """
+        Devuelve la entrada al anillo (las de un anillo reemplazado se descartan)
+
+        Si un batch todavía la está leyendo (la request se canceló mientras
+        corría el forward) vuelve cuando ese batch termina: antes, un decode
+        nuevo podría pisarla a mitad de `infer`.
+        """
+        with self._frames_lock:
+            if frame.released:
+                return
+            frame.released = True
+            if frame.readers:
+                self._deferred_releases += 1
+                return
+        self._free_entries([frame])
+
+    def _free_entries(self, frames: List[PreparedFrame]):
+        for frame in frames:
+            if frame.ring is self._ring:
+                self._free.put_nowait(frame.entry)
+
+    def _collect(self):
+        """Thread que recibe los resultados y vigila los procesos"""
+        last_check = time.monotonic()
+        while not self._stopped.is_set():
+            try:
+                message = self._results.get(timeout=1.0)
+            except queue.Empty:
+                message = None
+            except (EOFError, OSError):
+                break
+            if message is not None:
+                self._call_in_loop(self._resolve, *message)
+            if time.monotonic() - last_check >= 1.0:
+                last_check = time.monotonic()
+                self._call_in_loop(self._check_workers)
+
+    def _call_in_loop(self, callback, *args):
+        """Agenda `callback` en el event loop desde otro thread (no-op si ya se apagó)"""
+        if self._stopped.is_set():
+            return
+        try:
+            self._loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass  # Loop cerrado entre el chequeo y la llamada
+
+    def _resolve(self, task_id: int, shape, image_hash, hash_time: float, error, busy: float):
+        task = self._tasks.pop(task_id, None)
+        if task is None:
+            return
+        worker, future, frame, sent = task
+        self._in_flight[worker] -= 1
+        self._busy[worker].add(busy)
+        self._tasks_done[worker] += 1
+
+        if error is not None or future.done():
+            self.release(frame)
+            if error is not None:
+                self._errors += 1
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        frame.shape = tuple(shape)
+        frame.image_hash = image_hash
+        frame.hash_time = hash_time
+        self._decoded += 1
+        self._decode_time += busy
+        self._queue_time += max(0.0, time.perf_counter() - sent - busy)
+        future.set_result(frame)
+
+    def _check_workers(self):
+        """Un proceso de decode que muere se reemplaza; sus tareas fallan"""
+        if self._stopped.is_set():
+            return
+        for index, process in enumerate(self._processes):
+            if process.is_alive():
+                continue
+            logger.error(f"Proceso de decode {index} terminó (exit {process.exitcode}), se reemplaza")
+            for task_id, (worker, future, frame, _) in list(self._tasks.items()):
+                if worker != index:
+                    continue
+                del self._tasks[task_id]
+                self.release(frame)
+                self._errors += 1
+                if not future.done():
+                    future.set_exception(RuntimeError(f"proceso de decode terminó (exit {process.exitcode})"))
+            self._in_flight[index] = 0
+            self._restarts += 1
+            self._start_worker(index)
+
+    def classify_batch(self, frames: List[PreparedFrame]) -> List[dict]:
+        """
+        Forward sobre frames ya preprocesados (interfaz de MicroBatcher, corre en un thread)
+
+        Entradas consecutivas del anillo se pasan como vista; si no, se copian
+        a un batch contiguo. Mientras corre, las entradas no vuelven al anillo
+        aunque su request termine (ver `release`).
+        """
+        ring = frames[0].ring
+        if any(frame.ring is not ring for frame in frames):
+            raise RuntimeError("Frames de anillos distintos en un batch (cambió el modelo)")
+
+        # Los ya devueltos (request cancelada antes del batch) no se retienen: su resultado se descarta
+        with self._frames_lock:
+            pinned = [frame for frame in frames if not frame.released]
+            for frame in pinned:
+                frame.readers += 1
+        try:
+            return self._infer_frames(ring, frames)
+        finally:
+            with self._frames_lock:
+                done = []
+                for frame in pinned:
+                    frame.readers -= 1
+                    if frame.released and not frame.readers:
+                        done.append(frame)
+            if done:
+                self._call_in_loop(self._free_entries, done)
+
+    def _infer_frames(self, ring: SharedTensorSlots, frames: List[PreparedFrame]) -> List[dict]:
+        start = time.perf_counter()
+        samples = ring.inputs(0)
+        entries = [frame.entry for frame in frames]
+        first = entries[0]
+        if entries == list(range(first, first + len(entries))):
+            batch = samples[first:first + len(entries)]
+        else:
+            batch = np.take(samples, entries, axis=0)
+        gathered = time.perf_counter()
+
+        probabilities = self.classifier.infer(batch)
+
+        self._inference_batches += 1
+        self._inference_items += len(frames)
+        self._gather_time += gathered - start
+        self._inference_busy.add(time.perf_counter() - start)
+        return [self.classifier.format_prediction(row) for row in probabilities]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Profundidad de cola y utilización de cada etapa (para dimensionar DECODE_WORKERS)
+
+        Utilización = fracción de los últimos 10 s ocupada; `busy_s` es el
+        acumulado desde el arranque.
+        """
+        workers = []
+        for index, process in enumerate(self._processes):
+            workers.append({
+                "pid": process.pid if process else None,
+                "in_flight": self._in_flight[index],
+                "tasks": self._tasks_done[index],
+                "busy_s": round(self._busy[index].total, 3),
+                "utilization": self._busy[index].utilization(),
+            })
+        return {
+            "decode": {
+                "workers": workers,
+                "utilization": round(
+                    sum(worker["utilization"] for worker in workers) / self.num_workers, 3
+                ),
+                "in_flight": sum(self._in_flight),
+                "waiting_for_ring": self._waiting,
+                "decoded": self._decoded,
+                "avg_decode_ms": round(self._decode_time / self._decoded * 1000, 3) if self._decoded else 0.0,
+                "avg_queue_ms": round(self._queue_time / self._decoded * 1000, 3) if self._decoded else 0.0,
+                "errors": self._errors,
+                "rejected": self._rejected,
+                "restarts": self._restarts,
+            },
+            "ring": {
+                "size": self.ring_size,
+                "free": self._free.qsize() if self._ring is not None else self.ring_size,
+                "deferred_releases": self._deferred_releases,
+                "mb": round(self._ring.nbytes / 1024 / 1024, 1) if self._ring else 0.0,
+            },
+            "inference": {
+                "batches": self._inference_batches,
+                "items": self._inference_items,
+                "busy_s": round(self._inference_busy.total, 3),
+                "utilization": self._inference_busy.utilization(),
+                "avg_gather_ms": round(
+                    self._gather_time / self._inference_batches * 1000, 3
+                ) if self._inference_batches else 0.0,
+            },
+        }
+
+    def shutdown(self):
+        self._stopped.set()
+        for tasks in self._queues:
+            if tasks is not None:
+                tasks.put(None)
+        for process in self._processes:
+            if process is None:
+                continue
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        # El collector revisa _stopped cada segundo: que termine antes que el event loop
+        if self._collector is not None:
+            self._collector.join(timeout=2)
+            self._collector = None
+        if self._ring is not None:
+            try:
+                self._ring.close()
+            except BufferError:
+                pass  # Queda una vista viva: el mapeo se libera al salir el proceso
+            self._ring.unlink()
+            self._ring = None
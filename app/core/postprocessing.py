@@ -151,6 +151,28 @@ class PostProcessor:
         
         return alternatives
     
+    @staticmethod
+    def resolve_code(
+        raw_prediction: Dict[str, Any],
+        confidence_threshold: Optional[float] = None
+    ) -> int:
+        """
+        Versión mínima de process_prediction: solo el código para ESP32
+        Sin alternativas, descripciones ni logs (camino rápido)
+        
+        Args:
+            raw_prediction: resultado crudo del modelo
+            confidence_threshold: umbral mínimo (usa config si no se especifica)
+        
+        Returns:
+            código de clasificación (0 = indeterminado)
+        """
+        threshold = confidence_threshold or settings.CONFIDENCE_THRESHOLD
+        
+        if raw_prediction["confidence"] < threshold:
+            return PostProcessor.CLASS_TO_CODE["indeterminado"]
+        return PostProcessor.CLASS_TO_CODE.get(raw_prediction["class_name"], 0)
+    
     @staticmethod
     def generate_esp_response(code: int) -> Dict[str, Any]:
         """
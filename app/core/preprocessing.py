@@ -1,24 +1,272 @@
 import cv2
 import numpy as np
 from fastapi import HTTPException
+from typing import List, Optional, Sequence, Tuple, Union
 
-def decode_image(image_bytes: bytes) -> np.ndarray:
-    """Convierte bytes a imagen numpy"""
+from app.config import settings
+
+# bytes del request: bytes (UploadFile) o bytearray (body crudo, sin copiar)
+ImageBuffer = Union[bytes, bytearray, memoryview]
+
+# Lado mínimo aceptado (en pixeles)
+MIN_IMAGE_SIZE = 50
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Marcadores JPEG Start-Of-Frame (traen alto/ancho); C4, C8 y CC son otra cosa
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# Marcadores sin segmento de longitud
+JPEG_STANDALONE_MARKERS = {0x01, *range(0xD0, 0xD8)}
+
+# Escalas del decode reducido de libjpeg (se elige la mayor posible)
+REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+
+class ImageProcessingError(HTTPException):
+    """
+    HTTPException que se puede serializar con pickle, para que los errores
+    de decode/validación vuelvan intactos desde un ProcessPoolExecutor
+    """
+    
+    def __reduce__(self):
+        return (self.__class__, (self.status_code, self.detail))
+
+
+def _jpeg_size(data: ImageBuffer) -> Optional[Tuple[int, int]]:
+    """(ancho, alto) del primer segmento SOF, saltando APPn/EXIF por su longitud"""
+    i = 2
+    end = len(data)
+    while i + 4 <= end:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # relleno
+            i += 1
+            continue
+        if marker in JPEG_STANDALONE_MARKERS:
+            i += 2
+            continue
+        if marker in (0xD9, 0xDA):  # fin de imagen / datos comprimidos sin SOF
+            return None
+        if marker in JPEG_SOF_MARKERS:
+            if i + 9 > end:
+                return None
+            height = int.from_bytes(data[i + 5:i + 7], "big")
+            width = int.from_bytes(data[i + 7:i + 9], "big")
+            return width, height
+        i += 2 + int.from_bytes(data[i + 2:i + 4], "big")
+    return None
+
+
+def read_image_size(image_bytes: ImageBuffer) -> Optional[Tuple[str, int, int]]:
+    """
+    Formato y tamaño leyendo solo el header (JPEG SOF / PNG IHDR)
+    
+    Returns:
+        ("jpeg" | "png", ancho, alto), o None si el formato no se reconoce
+    """
+    if image_bytes[:2] == b"\xff\xd8":
+        size = _jpeg_size(image_bytes)
+        return ("jpeg", *size) if size else None
+    if image_bytes[:8] == PNG_SIGNATURE and image_bytes[12:16] == b"IHDR":
+        width = int.from_bytes(image_bytes[16:20], "big")
+        height = int.from_bytes(image_bytes[20:24], "big")
+        return "png", width, height
+    return None
+
+
+def reduced_decode_flag(width: int, height: int, target_size: Tuple[int, int]) -> Tuple[int, int]:
+    """
+    Mayor escala de decode reducido (1/2, 1/4, 1/8) que sigue cubriendo target_size
+    
+    Se compara el lado menor contra el mayor del target para que la rotación
+    EXIF no cambie el resultado.
+    
+    Returns:
+        (flag de cv2.imdecode, factor)
+    """
+    needed = max(target_size)
+    for factor, flag in REDUCED_DECODE_FLAGS:
+        # libjpeg redondea hacia arriba
+        if (min(width, height) + factor - 1) // factor >= needed:
+            return flag, factor
+    return cv2.IMREAD_COLOR, 1
+
+
+def decode_image(image_bytes: ImageBuffer, target_size: Optional[Tuple[int, int]] = None) -> np.ndarray:
+    """
+    Convierte bytes a imagen numpy BGR (np.frombuffer no copia el buffer)
+    
+    Se deja en BGR (orden nativo de OpenCV): el cambio a RGB lo hace
+    FusedPreprocessor en la misma pasada que la normalización.
+    
+    Con `target_size`, los JPEG grandes se decodifican a 1/2, 1/4 o 1/8 en el
+    dominio DCT (IMREAD_REDUCED_COLOR_*), sin bajar de target_size.
+    """
+    header = read_image_size(image_bytes) if target_size is not None else None
+    return _decode(image_bytes, header, target_size)
+
+def _decode(image_bytes: ImageBuffer, header, target_size) -> np.ndarray:
     try:
+        flag = cv2.IMREAD_COLOR
+        if header is not None and header[0] == "jpeg" and target_size is not None:
+            flag, _ = reduced_decode_flag(header[1], header[2], target_size)
+        
         nparr = np.frombuffer(image_bytes, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        image = cv2.imdecode(nparr, flag)
         
         if image is None:
             raise ValueError("Imagen corrupta")
             
-        # BGR a RGB
-        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
         return image
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error decodificando imagen: {str(e)}")
+        raise ImageProcessingError(status_code=400, detail=f"Error decodificando imagen: {str(e)}")
+
+def _check_size(width: int, height: int):
+    if height < MIN_IMAGE_SIZE or width < MIN_IMAGE_SIZE:
+        raise ImageProcessingError(status_code=400, detail="Imagen muy pequeña")
+
+def validate_image(image: Union[np.ndarray, ImageBuffer]) -> bool:
+    """
+    Validaciones básicas
+    
+    Acepta la imagen decodificada o los bytes del archivo: con bytes JPEG/PNG
+    se valida desde el header sin decodificar (formatos desconocidos pasan y
+    se validan después del decode).
+    """
+    if isinstance(image, np.ndarray):
+        _check_size(image.shape[1], image.shape[0])
+    else:
+        header = read_image_size(image)
+        if header is not None:
+            _check_size(header[1], header[2])
+    return True
+
+def decode_and_validate(image_bytes: ImageBuffer) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """
+    Header + decode + validación en un solo paso (para correr fuera del event loop)
+    
+    Las imágenes muy chicas se rechazan desde el header, sin decodificar; los
+    JPEG grandes se decodifican reducidos (settings.REDUCED_DECODE_ENABLED).
+    
+    Returns:
+        (imagen, (alto, ancho) del archivo subido): con decode reducido la
+        imagen es más chica que el original; lo que se loguea es el original
+    """
+    header = read_image_size(image_bytes)
+    if header is not None:
+        _check_size(header[1], header[2])
+    
+    target_size = settings.IMG_SIZE if settings.REDUCED_DECODE_ENABLED else None
+    image = _decode(image_bytes, header, target_size)
+    if header is None:
+        validate_image(image)
+        return image, image.shape[:2]
+    
+    _, width, height = header
+    # imdecode aplica la rotación EXIF: misma orientación que la imagen decodificada
+    if (image.shape[0] > image.shape[1]) != (height > width):
+        width, height = height, width
+    return image, (height, width)
 
-def validate_image(image: np.ndarray) -> bool:
-    """Validaciones básicas"""
-    if image.shape[0] < 50 or image.shape[1] < 50:
-        raise HTTPException(status_code=400, detail="Imagen muy pequeña")
-    return True
\ No newline at end of file
+
+class FusedPreprocessor:
+    """
+    Resize + BGR->RGB + normalización en una sola etapa, sobre buffers reutilizables
+    
+    Cada imagen BGR uint8 se redimensiona con OpenCV dentro de un buffer uint8
+    fijo y se escribe normalizada directo en su slot del batch float32
+    preasignado:
+    - NCHW: el cambio de canales y el HWC->CHW son una vista; un solo
+      multiply (x * 1/(255*std)) + add (-mean/std) in-place
+    - NHWC: cvtColor a RGB y multiply/add por canal de OpenCV con dst
+    
+    En régimen estable no hay allocations: el batch solo crece si llega uno
+    más grande. NO es thread-safe (un preprocesador por modelo, usado bajo
+    el lock del clasificador) y `batch()` retorna una vista que se pisa en la
+    próxima llamada.
+    """
+    
+    def __init__(
+        self,
+        input_shape: Tuple[int, int],
+        mean: Sequence[float],
+        std: Sequence[float],
+        layout: str = "nchw"
+    ):
+        """
+        Args:
+            input_shape: (alto, ancho) de entrada del modelo
+            mean, std: normalización RGB en escala [0, 1] (ImageNet, o 0.5/0.5 para [-1, 1])
+            layout: "nchw" (PyTorch/ONNX) o "nhwc" (Keras/TFLite)
+        """
+        if layout not in ("nchw", "nhwc"):
+            raise ValueError(f"Layout no soportado: {layout}")
+        
+        self.height, self.width = input_shape
+        self.layout = layout
+        
+        mean = np.asarray(mean, dtype=np.float32)
+        std = np.asarray(std, dtype=np.float32)
+        scale = 1.0 / (255.0 * std)
+        offset = -mean / std
+        if layout == "nchw":
+            self._scale = scale.reshape(3, 1, 1)
+            self._offset = offset.reshape(3, 1, 1)
+        else:
+            self._scale = tuple(float(v) for v in scale) + (0.0,)
+            self._offset = tuple(float(v) for v in offset) + (0.0,)
+            self._rgb = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        
+        self._resized = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self._batch = np.empty((0, *self.sample_shape), dtype=np.float32)
+    
+    def __getstate__(self):
+        # El batch puede haber crecido a MAX_BATCH_FILES: no viaja en pickle/deepcopy
+        state = self.__dict__.copy()
+        state["_batch"] = np.empty((0, *self.sample_shape), dtype=np.float32)
+        return state
+    
+    @property
+    def sample_shape(self) -> Tuple[int, int, int]:
+        if self.layout == "nchw":
+            return (3, self.height, self.width)
+        return (self.height, self.width, 3)
+    
+    def _resize(self, image: np.ndarray) -> np.ndarray:
+        if image.shape[:2] == (self.height, self.width):
+            return image
+        # INTER_AREA al achicar (equivalente al antialias de PIL usado en entrenamiento)
+        shrinking = image.shape[0] > self.height or image.shape[1] > self.width
+        interpolation = cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR
+        cv2.resize(image, (self.width, self.height), dst=self._resized, interpolation=interpolation)
+        return self._resized
+    
+    def fill(self, image: np.ndarray, out: np.ndarray) -> np.ndarray:
+        """Preprocesa una imagen BGR uint8 dentro de `out` (sample_shape float32)"""
+        if image.dtype != np.uint8:
+            image = (image * 255).astype(np.uint8)
+        resized = self._resize(image)
+        
+        if self.layout == "nchw":
+            np.multiply(resized[..., ::-1].transpose(2, 0, 1), self._scale, out=out, casting="unsafe")
+            np.add(out, self._offset, out=out)
+        else:
+            cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=self._rgb)
+            cv2.multiply(self._rgb, self._scale, dst=out, dtype=cv2.CV_32F)
+            cv2.add(out, self._offset, dst=out)
+        return out
+    
+    def batch(self, images: List[np.ndarray]) -> np.ndarray:
+        """Batch (N, *sample_shape) float32: vista del buffer reutilizado"""
+        count = len(images)
+        if self._batch.shape[0] < count:
+            self._batch = np.empty((count, *self.sample_shape), dtype=np.float32)
+        
+        for i, image in enumerate(images):
+            self.fill(image, self._batch[i])
+        return self._batch[:count]
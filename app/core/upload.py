@@ -0,0 +1,183 @@
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, Request
+from starlette.responses import JSONResponse
+
+# Content-Types aceptados en el endpoint de body crudo
+RAW_IMAGE_CONTENT_TYPES = {"application/octet-stream", "image/jpeg", "image/png"}
+
+# Margen para boundaries y headers de multipart sobre el tamaño del archivo
+MULTIPART_OVERHEAD = 64 * 1024
+
+TOO_LARGE_DETAIL = "Archivo muy grande"
+
+
+class BodyTooLargeError(HTTPException):
+    """413 levantado desde receive(); FastAPI lo deja pasar sin convertirlo en 400"""
+
+    def __init__(self):
+        super().__init__(status_code=413, detail=TOO_LARGE_DETAIL)
+
+
+class UploadLimiter:
+    """
+    Límite de body por ruta + contabilidad de bytes en vuelo
+
+    Lo usa BodySizeLimitMiddleware; `stats()` reporta la memoria que ocupan
+    los bodies de los requests en curso (cota superior: Starlette pasa a
+    disco los archivos multipart de más de 1MB).
+    """
+
+    def __init__(self, default_limit: int, path_limits: Optional[Dict[str, int]] = None):
+        self.default_limit = default_limit
+        self.path_limits = dict(path_limits or {})
+
+        self.in_flight_requests = 0
+        self.in_flight_bytes = 0
+        self.peak_in_flight_bytes = 0
+        self.max_request_bytes = 0
+        self.rejected_content_length = 0
+        self.rejected_streaming = 0
+
+    def limit_for(self, path: str) -> int:
+        return self.path_limits.get(path, self.default_limit)
+
+    def started(self):
+        self.in_flight_requests += 1
+
+    def received(self, size: int):
+        self.in_flight_bytes += size
+        self.peak_in_flight_bytes = max(self.peak_in_flight_bytes, self.in_flight_bytes)
+
+    def finished(self, total: int):
+        self.in_flight_requests -= 1
+        self.in_flight_bytes -= total
+        self.max_request_bytes = max(self.max_request_bytes, total)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit_bytes": self.default_limit,
+            "path_limits_bytes": self.path_limits,
+            "in_flight_requests": self.in_flight_requests,
+            "in_flight_bytes": self.in_flight_bytes,
+            "peak_in_flight_bytes": self.peak_in_flight_bytes,
+            "max_request_bytes": self.max_request_bytes,
+            "rejected_content_length": self.rejected_content_length,
+            "rejected_streaming": self.rejected_streaming,
+        }
+
+
+class BodySizeLimitMiddleware:
+    """
+    Middleware ASGI que corta uploads grandes antes de bufferearlos
+
+    - Content-Length mayor al límite: 413 inmediato, sin leer el body
+    - Body chunked (o Content-Length mentiroso): cuenta bytes a medida que
+      llegan y levanta 413 apenas se cruza el límite
+    """
+
+    def __init__(self, app, limiter: UploadLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limiter.limit_for(scope["path"])
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    break  # lo rechaza el parser de la app
+                if declared > limit:
+                    self.limiter.rejected_content_length += 1
+                    await JSONResponse({"detail": TOO_LARGE_DETAIL}, status_code=413)(scope, receive, send)
+                    return
+                break
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                size = len(message.get("body", b""))
+                received += size
+                self.limiter.received(size)
+                if received > limit:
+                    self.limiter.rejected_streaming += 1
+                    raise BodyTooLargeError()
+            return message
+
+        async def tracked_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        self.limiter.started()
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except BodyTooLargeError:
+            if response_started:
+                raise
+            await JSONResponse({"detail": TOO_LARGE_DETAIL}, status_code=413)(scope, receive, send)
+        finally:
+            self.limiter.finished(received)
+
+
+async def read_body_limited(request: Request, max_size: int) -> bytearray:
+    """
+    Lee el body del request en un único buffer, cortando apenas supera max_size
+
+    Si el cliente manda Content-Length el buffer se reserva una sola vez y cada
+    chunk se copia directo en su posición; el bytearray resultante va tal cual
+    a np.frombuffer en decode_image (sin bytes intermedios).
+
+    Raises:
+        HTTPException 413: si el body supera max_size
+        HTTPException 400: si el body no coincide con Content-Length o está vacío
+    """
+    content_length = request.headers.get("content-length")
+    expected = None
+    if content_length is not None:
+        try:
+            expected = int(content_length)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Content-Length inválido")
+        if expected > max_size:
+            raise HTTPException(status_code=413, detail="Archivo muy grande")
+
+    buffer = bytearray(expected) if expected is not None else bytearray()
+    view = memoryview(buffer) if expected is not None else None
+    received = 0
+
+    async for chunk in request.stream():
+        if not chunk:
+            continue
+        end = received + len(chunk)
+        if end > max_size:
+            raise HTTPException(status_code=413, detail="Archivo muy grande")
+
+        if view is not None:
+            if end > expected:
+                raise HTTPException(status_code=400, detail="Body mayor que Content-Length")
+            view[received:end] = chunk
+        else:
+            buffer += chunk
+        received = end
+
+    if view is not None:
+        view.release()
+        if received != expected:
+            raise HTTPException(status_code=400, detail="Body incompleto")
+
+    if received == 0:
+        raise HTTPException(status_code=400, detail="Body vacío")
+
+    return buffer
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de las imágenes falsas (alto, ancho): una foto chica típica, para
+# que el resize al input del modelo también quede ejercitado
+WARMUP_IMAGE_SHAPE = (480, 640)
+
+
+def warmup_batch_sizes(max_batch_size: int, max_batch_files: int, configured: str = "") -> List[int]:
+    """
+    Tamaños de batch a precalentar
+
+    Sin configuración: todos los que arma el micro-batcher (1..max_batch_size)
+    más el máximo de /predict/batch, que deja los buffers en su tamaño final.
+
+    Args:
+        configured: lista separada por comas (WARMUP_BATCH_SIZES), pisa el default
+    """
+    if configured.strip():
+        sizes = {int(size) for size in configured.split(",") if size.strip()}
+    else:
+        sizes = set(range(1, max(1, max_batch_size) + 1)) | {max(1, max_batch_files)}
+    return sorted(size for size in sizes if size > 0)
+
+
+def warm_up(classifier, batch_sizes: List[int], iterations: int = 2) -> Dict[int, float]:
+    """
+    Ejecuta `iterations` batches falsos por cada tamaño (síncrono)
+
+    Paga de antemano la inicialización lazy de kernels, el crecimiento de
+    allocators y buffers, y el tracing de `predict` en Keras.
+
+    Returns:
+        {batch_size: ms de la última iteración}
+    """
+    height, width = WARMUP_IMAGE_SHAPE
+    rng = np.random.default_rng(0)
+    images = [
+        rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        for _ in range(max(batch_sizes, default=0))
+    ]
+
+    timings = {}
+    for batch_size in batch_sizes:
+        for _ in range(max(1, iterations)):
+            start = time.perf_counter()
+            classifier.predict_batch(images[:batch_size])
+            timings[batch_size] = round((time.perf_counter() - start) * 1000, 2)
+    return timings
+
+
+class ModelWarmup:
+    """
+    Warm-up del modelo al arrancar y estado de readiness para /ready
+
+    `run()` corre en segundo plano (un thread del executor) para que /health
+    responda mientras tanto; `ready` queda en False hasta que termine bien,
+    así el load balancer nunca le manda tráfico a un worker frío.
+    """
+
+    def __init__(self, classifier, batch_sizes: List[int], iterations: int = 2, enabled: bool = True):
+        self.classifier = classifier
+        self.batch_sizes = batch_sizes
+        self.iterations = iterations
+        self.enabled = enabled
+
+        self._ready = False
+        self._running = False
+        self._error: Optional[str] = None
+        self._duration: Optional[float] = None
+        self._timings: Dict[int, float] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self._ready and self.classifier.model is not None
+
+    async def run(self, executor):
+        """Precalienta todos los tamaños de batch y marca el worker como listo"""
+        if not self.enabled:
+            self._ready = True
+            return
+
+        self._running = True
+        start = time.perf_counter()
+        logger.info(
+            f"Warm-up: {self.iterations} iteraciones x batches {self.batch_sizes}"
+        )
+        try:
+            self._timings = await executor.run_in_thread(
+                warm_up, self.classifier, self.batch_sizes, self.iterations
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._error = str(e)
+            logger.error(f"Warm-up falló, el worker no queda listo: {e}", exc_info=True)
+            return
+        finally:
+            self._running = False
+            self._duration = time.perf_counter() - start
+
+        self._ready = True
+        logger.info(f"Warm-up completo en {self._duration:.2f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "running": self._running,
+            "error": self._error,
+            "batch_sizes": self.batch_sizes,
+            "iterations": self.iterations,
+            "duration_s": round(self._duration, 3) if self._duration is not None else None,
+            "last_batch_ms": self._timings,
+        }
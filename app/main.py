@@ -1,10 +1,20 @@
-from fastapi import FastAPI, Request
-from fastapi.middleware.cors import CORSMiddleware
-import time
-import uuid
-from app.api.routes import router
-from app.config import settings
-from app.utils.logger import setup_logger, logger
+from app.utils.profiling import startup_profiler
+
+with startup_profiler.phase("import_app"):
+    from fastapi import FastAPI, Request
+    from fastapi.middleware.cors import CORSMiddleware
+    import asyncio
+    import time
+    import uuid
+    from app.api.routes import (
+        router, batcher, executor, upload_limiter, model_warmup, model_manager, classifier,
+        decode_pipeline, admission, deadline_tracker
+    )
+    from app.core.admission import AdmissionMiddleware
+    from app.core.deadline import DeadlineMiddleware
+    from app.core.upload import BodySizeLimitMiddleware
+    from app.config import settings
+    from app.utils.logger import setup_logger, logger
 
 # Reconfigurar logger con settings
 logger = setup_logger(
@@ -20,6 +30,19 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# ================== LÍMITE DE BODY (413 antes de bufferear) ==================
+# Va por dentro de CORS y del logging: el 413 sale con headers CORS y queda loggeado
+app.add_middleware(BodySizeLimitMiddleware, limiter=upload_limiter)
+
+# ================== CONTROL DE ADMISIÓN (503 + Retry-After) ==================
+# Por fuera del límite de body: un request rechazado no lee nada del body
+if admission is not None:
+    app.add_middleware(AdmissionMiddleware, controller=admission)
+
+# ================== DEADLINE POR REQUEST ==================
+# Por fuera de la admisión: el tiempo en su cola cuenta para el deadline
+app.add_middleware(DeadlineMiddleware, tracker=deadline_tracker)
+
 # ================== CONFIGURAR CORS ==================
 app.add_middleware(
     CORSMiddleware,
@@ -84,11 +107,62 @@ async def startup_event():
     logger.info(f"Log Level: {settings.LOG_LEVEL}")
     logger.info(f"Log Directory: {settings.LOG_DIR}")
     logger.info(f"Modelo: {settings.MODEL_PATH}")
+    if settings.BATCHING_ENABLED:
+        logger.info(
+            f"Micro-batching: hasta {settings.MAX_BATCH_SIZE} imágenes "
+            f"o {settings.BATCH_MAX_WAIT_MS}ms"
+        )
+    logger.info(f"Límite de body: {upload_limiter.default_limit} bytes")
+    logger.info(
+        f"Executor: {settings.EXECUTOR_KIND} x{settings.EXECUTOR_POOL_SIZE} "
+        f"(cola: {settings.EXECUTOR_QUEUE_DEPTH})"
+    )
+    if admission is not None:
+        logger.info(
+            f"Admisión: {admission.max_in_flight} en curso, "
+            f"presupuesto de cola {settings.ADMISSION_QUEUE_BUDGET_MS}ms"
+        )
     logger.info("=" * 50)
+    
+    if decode_pipeline is not None:
+        decode_pipeline.start()
+    
+    # En segundo plano: /health responde ya, /ready cuando termine
+    app.state.warmup_task = asyncio.create_task(_warm_up())
+    app.state.watch_task = None
+    if settings.MODEL_WATCH_INTERVAL > 0:
+        app.state.watch_task = asyncio.create_task(
+            model_manager.watch(executor, settings.MODEL_WATCH_INTERVAL)
+        )
+
+
+async def _warm_up():
+    """Warm-up + cierre del perfil de arranque (tiempo hasta quedar listo)"""
+    start = time.perf_counter()
+    await model_warmup.run(executor)
+    startup_profiler.record("warmup", time.perf_counter() - start)
+    startup_profiler.mark_ready()
+    
+    report = startup_profiler.report()
+    logger.info(
+        f"Arranque: listo en {report['ready_after_s']}s | RSS {report['rss_mb']} MB "
+        f"(pico {report['peak_rss_mb']} MB)"
+    )
+    if settings.STARTUP_PROFILE:
+        logger.info("Perfil de arranque:\n" + startup_profiler.format_table())
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Apagando Waste Classifier API")
+    app.state.warmup_task.cancel()
+    if app.state.watch_task is not None:
+        app.state.watch_task.cancel()
+    await batcher.stop()
+    executor.shutdown()
+    if decode_pipeline is not None:
+        decode_pipeline.shutdown()
+    if hasattr(classifier, "close"):
+        classifier.close()  # Layout daemon: conexión y slots de memoria compartida
 
 app.include_router(router)
 
@@ -0,0 +1,102 @@
+"""
+Registro de motores de inferencia
+
+Cada motor es una subclase de BaseClassifier registrada con un nombre y las
+extensiones de archivo que sabe cargar:
+
+    @register_backend("onnx", suffixes=(".onnx",))
+    class OnnxBackend(BaseClassifier):
+        ...
+
+Los motores incluidos se registran por ruta de módulo (register_backend_path)
+y se importan recién cuando `resolve_backend` los elige: cada worker paga el
+import y la memoria solo del framework que usa (torch, tensorflow, ...).
+
+`resolve_backend` elige el motor por settings.MODEL_BACKEND o, con "auto",
+por la extensión de MODEL_PATH. Agregar un motor no requiere tocar las rutas.
+"""
+import importlib
+from pathlib import Path
+from typing import Callable, Dict, List, Type
+
+from app.models.base_model import BaseClassifier
+
+_BACKENDS: Dict[str, Type[BaseClassifier]] = {}
+# Motores registrados pero todavía sin importar: nombre -> módulo
+_LAZY_BACKENDS: Dict[str, str] = {}
+_SUFFIXES: Dict[str, str] = {}
+
+
+def register_backend(name: str, suffixes=()) -> Callable[[Type[BaseClassifier]], Type[BaseClassifier]]:
+    """Decorador: registra un motor bajo `name` y sus extensiones de archivo"""
+    def decorator(cls: Type[BaseClassifier]) -> Type[BaseClassifier]:
+        _BACKENDS[name] = cls
+        _LAZY_BACKENDS.pop(name, None)
+        cls.framework = name
+        for suffix in suffixes:
+            _SUFFIXES[suffix.lower()] = name
+        return cls
+    return decorator
+
+
+def register_backend_path(name: str, module: str, suffixes=()):
+    """
+    Registra un motor sin importarlo: `module` (ruta con puntos) se importa
+    en el primer resolve_backend que lo elija y debe usar @register_backend(name)
+    """
+    if name not in _BACKENDS:
+        _LAZY_BACKENDS[name] = module
+    for suffix in suffixes:
+        _SUFFIXES[suffix.lower()] = name
+
+
+def available_backends() -> List[str]:
+    return sorted({*_BACKENDS, *_LAZY_BACKENDS})
+
+
+def resolve_backend_name(model_path: str, name: str = "auto") -> str:
+    """
+    Nombre del motor para un modelo, sin importar su framework
+
+    Raises:
+        ValueError: motor o extensión no soportados
+    """
+    name = (name or "auto").lower()
+    if name == "auto":
+        suffix = Path(model_path).suffix.lower()
+        if suffix not in _SUFFIXES:
+            raise ValueError(f"Formato de modelo no soportado: {suffix}")
+        name = _SUFFIXES[suffix]
+
+    if name not in _BACKENDS and name not in _LAZY_BACKENDS:
+        raise ValueError(
+            f"MODEL_BACKEND no soportado: {name} (disponibles: {', '.join(available_backends())})"
+        )
+    return name
+
+
+def resolve_backend(model_path: str, name: str = "auto") -> Type[BaseClassifier]:
+    """
+    Clase del motor para un modelo (importa su módulo si hace falta)
+
+    Args:
+        model_path: ruta al modelo (se usa su extensión si name == "auto")
+        name: nombre registrado o "auto"
+
+    Raises:
+        ValueError: motor o extensión no soportados
+    """
+    name = resolve_backend_name(model_path, name)
+    if name not in _BACKENDS:
+        importlib.import_module(_LAZY_BACKENDS[name])
+        if name not in _BACKENDS:
+            raise ValueError(f"{_LAZY_BACKENDS[name]} no registra el motor {name}")
+    return _BACKENDS[name]
+
+
+# Motores incluidos (se importan al elegirse)
+register_backend_path("pytorch", "app.models.backends.pytorch", suffixes=(".pth", ".pt", ".safetensors"))
+register_backend_path("tensorflow", "app.models.backends.tensorflow", suffixes=(".h5", ".keras"))
+register_backend_path("onnx", "app.models.backends.onnx", suffixes=(".onnx",))
+register_backend_path("tflite", "app.models.backends.tflite", suffixes=(".tflite",))
+register_backend_path("numpy", "app.models.backends.numpy_stub", suffixes=(".npz",))
@@ -0,0 +1,85 @@
+import logging
+from typing import List
+
+import cv2
+import numpy as np
+
+from app.models.backends import register_backend
+from app.models.base_model import BaseClassifier, softmax
+
+logger = logging.getLogger(__name__)
+
+# Miniatura que alimenta al clasificador lineal
+THUMBNAIL_SIZE = (8, 8)
+NUM_FEATURES = THUMBNAIL_SIZE[0] * THUMBNAIL_SIZE[1] * 3
+
+
+class ThumbnailPreprocessor:
+    """Miniatura 8x8 aplanada en [0, 1] (misma interfaz que FusedPreprocessor)"""
+
+    sample_shape = (NUM_FEATURES,)
+
+    def __init__(self):
+        self._batch = np.empty((0, NUM_FEATURES), dtype=np.float32)
+
+    def fill(self, image: np.ndarray, out: np.ndarray) -> np.ndarray:
+        small = cv2.resize(image, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+        np.multiply(small.reshape(-1), 1.0 / 255.0, out=out, casting="unsafe")
+        return out
+
+    def batch(self, images: List[np.ndarray]) -> np.ndarray:
+        if self._batch.shape[0] < len(images):
+            self._batch = np.empty((len(images), NUM_FEATURES), dtype=np.float32)
+        for i, image in enumerate(images):
+            self.fill(image, self._batch[i])
+        return self._batch[:len(images)]
+
+
+@register_backend("numpy", suffixes=(".npz",))
+class NumpyStubBackend(BaseClassifier):
+    """
+    Clasificador lineal sobre una miniatura 8x8 (solo NumPy + OpenCV)
+
+    No es un modelo real: sirve para tests, benchmarks del servidor y nodos
+    sin framework de deep learning. El .npz guarda `weight` (192, C) y `bias` (C,).
+    """
+
+    fork_safe = True
+
+    def __init__(self):
+        super().__init__()
+        self.preprocessor = ThumbnailPreprocessor()
+
+    def load_model(self, model_path: str):
+        try:
+            with np.load(model_path) as data:
+                self.weight = data["weight"].astype(np.float32)
+                self.bias = data["bias"].astype(np.float32)
+        except Exception as e:
+            error_msg = f"Error cargando modelo NumPy: {str(e)}"
+            logger.error(error_msg)
+            raise Exception(error_msg)
+
+        if self.weight.shape[0] != NUM_FEATURES:
+            raise ValueError(f"weight debe tener {NUM_FEATURES} filas, tiene {self.weight.shape[0]}")
+
+        self.model = self.weight
+        self.num_classes = self.weight.shape[1]
+        logger.info(f"Modelo NumPy cargado: {model_path}")
+        logger.info(f"Clases: {self.num_classes}")
+
+    @staticmethod
+    def create(model_path: str, num_classes: int, seed: int = 0):
+        """Escribe un .npz con pesos aleatorios (determinísticos por seed)"""
+        rng = np.random.default_rng(seed)
+        np.savez(
+            model_path,
+            weight=rng.normal(0, 1, (NUM_FEATURES, num_classes)).astype(np.float32),
+            bias=np.zeros(num_classes, dtype=np.float32),
+        )
+
+    def preprocess(self, image: np.ndarray) -> np.ndarray:
+        return self.preprocessor.batch([image]).copy()
+
+    def infer(self, batch: np.ndarray) -> np.ndarray:
+        return softmax(batch @ self.weight + self.bias).astype(np.float32)
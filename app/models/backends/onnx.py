@@ -0,0 +1,84 @@
+import logging
+
+import numpy as np
+
+from app.config import settings
+from app.core.preprocessing import FusedPreprocessor
+from app.models.backends import register_backend
+from app.models.base_model import IMAGENET_MEAN, IMAGENET_STD, BaseClassifier, softmax
+
+logger = logging.getLogger(__name__)
+
+try:
+    import onnxruntime as ort
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+# Niveles de optimización de grafo de ONNX Runtime (settings.ONNX_GRAPH_OPTIMIZATION)
+ONNX_OPTIMIZATION_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+
+
+@register_backend("onnx", suffixes=(".onnx",))
+class OnnxBackend(BaseClassifier):
+    """Modelo ONNX (exportado desde el checkpoint PyTorch) sobre ONNX Runtime"""
+
+    def __init__(self):
+        super().__init__()
+        self.input_name = None
+        self.preprocessor = FusedPreprocessor(self.input_shape, IMAGENET_MEAN, IMAGENET_STD, "nchw")
+
+    def load_model(self, model_path: str):
+        if not ONNX_AVAILABLE:
+            raise ImportError("onnxruntime no está instalado")
+
+        try:
+            level_name = ONNX_OPTIMIZATION_LEVELS.get(settings.ONNX_GRAPH_OPTIMIZATION.lower())
+            if level_name is None:
+                raise ValueError(
+                    f"ONNX_GRAPH_OPTIMIZATION inválido: {settings.ONNX_GRAPH_OPTIMIZATION}"
+                )
+
+            options = ort.SessionOptions()
+            intra_op = settings.ONNX_INTRA_OP_THREADS or settings.INFERENCE_THREADS
+            inter_op = settings.ONNX_INTER_OP_THREADS or settings.INFERENCE_INTEROP_THREADS
+            options.intra_op_num_threads = intra_op
+            options.inter_op_num_threads = inter_op
+            options.graph_optimization_level = getattr(ort.GraphOptimizationLevel, level_name)
+
+            # GPU si onnxruntime-gpu está instalado, sino CPU
+            providers = [
+                p for p in ('CUDAExecutionProvider', 'CPUExecutionProvider')
+                if p in ort.get_available_providers()
+            ]
+
+            session = ort.InferenceSession(model_path, sess_options=options, providers=providers)
+
+            self.model = session
+            self.input_name = session.get_inputs()[0].name
+            self.num_classes = session.get_outputs()[0].shape[-1]
+            logger.info(f"Modelo ONNX cargado: {model_path}")
+            logger.info(f"Providers: {session.get_providers()}")
+            logger.info(
+                f"Threads intra/inter-op: {intra_op}/{inter_op} | Optimización: {settings.ONNX_GRAPH_OPTIMIZATION}"
+            )
+            logger.info(f"Clases: {self.num_classes}")
+        except Exception as e:
+            error_msg = f"Error cargando modelo ONNX: {str(e)}"
+            logger.error(error_msg)
+            raise Exception(error_msg)
+
+    def preprocess(self, image: np.ndarray) -> np.ndarray:
+        """Mismo contrato que PyTorch (normalización ImageNet, NCHW float32) sin depender de torch"""
+        return self.preprocessor.batch([image]).copy()
+
+    def infer(self, batch: np.ndarray) -> np.ndarray:
+        logits = self.model.run(None, {self.input_name: batch})[0]
+
+        # El grafo exportado retorna logits, igual que el modelo PyTorch
+        return softmax(logits)
@@ -0,0 +1,249 @@
+import logging
+from typing import List
+
+import numpy as np
+
+from app.config import settings
+from app.core.preprocessing import FusedPreprocessor
+from app.models.backends import register_backend
+from app.models.base_model import IMAGENET_MEAN, IMAGENET_STD, BaseClassifier
+
+logger = logging.getLogger(__name__)
+
+try:
+    import torch
+    PYTORCH_AVAILABLE = True
+except ImportError:
+    PYTORCH_AVAILABLE = False
+
+
+@register_backend("pytorch", suffixes=(".pth", ".pt", ".safetensors"))
+class PyTorchBackend(BaseClassifier):
+    """
+    MobileNetV2 PyTorch
+
+    settings.TORCH_SERVING_MODE:
+    - eager: módulo PyTorch normal
+    - torchscript: Conv-BN folding + trace + freeze (con cache en disco)
+    - int8: backbone cuantizado estáticamente + cabezal dinámico (solo CPU),
+      validado contra el modelo float antes de activarse
+
+    Los pesos (.pth/.pt o .safetensors) se mapean desde el archivo
+    (settings.TORCH_MMAP_WEIGHTS) en vez de copiarse: en eager, todos los
+    workers comparten una sola copia física desde el page cache. Con el
+    watcher de MODEL_PATH activo se copian (ver _load_state_dict).
+    """
+
+    # El pool de threads de torch se crea en la primera operación, no al cargar
+    fork_safe = True
+
+    def __init__(self):
+        super().__init__()
+        self.device = None
+        self.channels_last = False  # Layout de entrada (modo torchscript)
+        self.serving_mode = None  # Modo activo: eager/torchscript/int8
+        self.preprocessor = FusedPreprocessor(self.input_shape, IMAGENET_MEAN, IMAGENET_STD, "nchw")
+
+    def load_model(self, model_path: str):
+        """Cargar checkpoint PyTorch en el modo de serving configurado"""
+        if not PYTORCH_AVAILABLE:
+            raise ImportError("PyTorch no está instalado")
+
+        try:
+            if settings.INFERENCE_THREADS > 0:
+                torch.set_num_threads(settings.INFERENCE_THREADS)
+            if settings.INFERENCE_INTEROP_THREADS > 0:
+                try:
+                    torch.set_num_interop_threads(settings.INFERENCE_INTEROP_THREADS)
+                except RuntimeError:
+                    pass  # Solo se puede fijar antes del primer trabajo inter-op
+            logger.info(f"Threads torch: {torch.get_num_threads()}")
+            
+            # Detectar dispositivo (GPU si disponible, sino CPU)
+            self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+            # CUDA no sobrevive un fork
+            self.fork_safe = self.device.type == "cpu"
+            logger.info(f"Usando dispositivo: {self.device}")
+
+            mode = settings.TORCH_SERVING_MODE.lower()
+            if mode == 'eager':
+                model, num_classes = self._build_eager_model(model_path)
+                self.channels_last = False
+            elif mode == 'torchscript':
+                from app.models.torch_optimization import load_or_compile_torchscript
+
+                model, num_classes = load_or_compile_torchscript(
+                    model_path,
+                    build_eager=lambda: self._build_eager_model(model_path),
+                    device=self.device,
+                    input_shape=self.input_shape,
+                    cache_dir=settings.TORCH_COMPILED_CACHE_DIR,
+                    channels_last=settings.TORCH_CHANNELS_LAST
+                )
+                self.channels_last = settings.TORCH_CHANNELS_LAST
+            elif mode == 'int8':
+                from app.models.torch_optimization import load_or_quantize_int8
+
+                # Los kernels cuantizados solo corren en CPU
+                self.device = torch.device('cpu')
+                model, num_classes, is_int8 = load_or_quantize_int8(
+                    model_path,
+                    build_eager=lambda: self._build_eager_model(model_path),
+                    preprocess=lambda images: self.preprocess_batch(images).clone(),
+                    input_shape=self.input_shape,
+                    cache_dir=settings.TORCH_COMPILED_CACHE_DIR,
+                    calibration_dir=settings.QUANT_CALIBRATION_DIR,
+                    validation_dir=settings.QUANT_VALIDATION_DIR,
+                    min_agreement=settings.QUANT_MIN_AGREEMENT,
+                    class_names=settings.CLASSES,
+                    backend=settings.QUANT_BACKEND,
+                    calibration_samples=settings.QUANT_CALIBRATION_SAMPLES
+                )
+                if not is_int8:
+                    mode = 'eager'
+                self.channels_last = False
+            else:
+                raise ValueError(f"TORCH_SERVING_MODE no soportado: {settings.TORCH_SERVING_MODE}")
+
+            if self.channels_last:
+                # NHWC en memoria == NCHW channels-last: el preprocesador escribe
+                # directo en ese layout, sin la copia de .contiguous()
+                self.preprocessor = FusedPreprocessor(
+                    self.input_shape, IMAGENET_MEAN, IMAGENET_STD, "nhwc"
+                )
+
+            self.model = model
+            self.serving_mode = mode
+            self.num_classes = num_classes
+            logger.info(f"Modelo PyTorch cargado: {model_path}")
+            logger.info(f"Modo de serving: {mode}")
+            logger.info(f"Dispositivo: {self.device}")
+            logger.info(f"Clases: {num_classes}")
+        except Exception as e:
+            error_msg = f"Error cargando modelo PyTorch: {str(e)}"
+            logger.error(error_msg)
+            raise Exception(error_msg)
+
+    def _build_eager_model(self, model_path: str):
+        """
+        Reconstruye MobileNetV2 y carga el checkpoint (modo eager)
+
+        Returns:
+            (modelo en eval, num_classes)
+        """
+        from torchvision import models
+
+        # Cargar pesos primero para detectar número de clases
+        checkpoint = self._load_state_dict(model_path)
+
+        # Detectar número de clases del checkpoint
+        # Buscar el último layer lineal de salida (classifier.4)
+        # Necesitamos el layer FINAL con shape[0] = número de clases
+        num_classes = None
+        classifier_weights = [k for k in checkpoint.keys() if 'classifier' in k and 'weight' in k]
+
+        if classifier_weights:
+            # El último layer lineal en la secuencia es el de salida con num_classes
+            # classifier.1 tiene shape [128, 1280], classifier.4 tiene shape [6, 128]
+            # Buscamos el que tiene el menor shape[1] (entrada) - ese es el final
+            final_layer = classifier_weights[-1]  # classifier.4 es el último
+            num_classes = checkpoint[final_layer].shape[0]
+
+        if num_classes is None:
+            raise ValueError("No se pudo detectar número de clases del modelo")
+
+        logger.info(f"Detectadas {num_classes} clases en el modelo")
+
+        # Crear modelo base con el número correcto de clases, en el device
+        # "meta": sin asignar ni inicializar pesos que se van a reemplazar
+        with torch.device("meta"):
+            base_model = models.mobilenet_v2(weights=None)
+
+            # Reemplazar cabezal (DEBE coincidir con el entrenamiento)
+            num_features = base_model.classifier[1].in_features
+            base_model.classifier = torch.nn.Sequential(
+                torch.nn.Dropout(p=0.5),
+                torch.nn.Linear(num_features, 128),
+                torch.nn.ReLU(inplace=True),
+                torch.nn.Dropout(p=0.5),
+                torch.nn.Linear(128, num_classes)  # Usar número de clases del modelo
+            )
+
+        # Cargar pesos: assign=True usa los tensores del checkpoint tal cual
+        # (mapeados desde el archivo) en vez de copiarlos a parámetros nuevos
+        base_model.load_state_dict(checkpoint, assign=True)
+        base_model = base_model.to(self.device)
+        base_model.eval()
+
+        return base_model, num_classes
+
+    def _load_state_dict(self, model_path: str) -> dict:
+        """
+        state_dict del checkpoint
+
+        - .safetensors: mapeado (requiere el paquete safetensors)
+        - .pth/.pt con TORCH_MMAP_WEIGHTS: torch.load(mmap=True) sobre el
+          formato zip de torch.save; si el archivo es del formato viejo o trae
+          objetos que no son tensores, se carga copiando como antes
+
+        Con MODEL_WATCH_INTERVAL > 0 (layout workers) siempre se copia: el
+        archivo se puede sobrescribir con el modelo en uso, y unos pesos
+        mapeados cambiarían (o darían SIGBUS si se trunca) antes de que el
+        watcher cargue el modelo nuevo.
+        """
+        mapped = not (settings.MODEL_WATCH_INTERVAL > 0 and settings.SERVING_LAYOUT == "workers")
+
+        if model_path.lower().endswith(".safetensors"):
+            try:
+                from safetensors.torch import load, load_file
+            except ImportError:
+                raise ImportError("Para modelos .safetensors: pip install safetensors")
+            if not mapped:
+                with open(model_path, "rb") as f:
+                    checkpoint = load(f.read())
+                logger.info("Pesos de .safetensors copiados en memoria (MODEL_WATCH_INTERVAL > 0)")
+                return checkpoint
+            checkpoint = load_file(model_path, device="cpu")
+            logger.info("Pesos mapeados desde .safetensors (zero-copy)")
+            return checkpoint
+
+        if settings.TORCH_MMAP_WEIGHTS and not mapped:
+            logger.info("Pesos copiados en memoria, sin mmap (MODEL_WATCH_INTERVAL > 0)")
+        elif settings.TORCH_MMAP_WEIGHTS:
+            try:
+                checkpoint = torch.load(model_path, map_location="cpu", mmap=True, weights_only=True)
+                logger.info("Pesos mapeados desde el checkpoint (mmap)")
+                return checkpoint
+            except Exception as e:
+                logger.warning(
+                    f"No se pudo mapear {model_path} ({e}); cargando en memoria. "
+                    f"Convertir con scripts/convert_checkpoint.py"
+                )
+
+        return torch.load(model_path, map_location="cpu", weights_only=False)
+
+    def preprocess(self, image: np.ndarray) -> np.ndarray:
+        return self.preprocess_batch([image]).cpu().numpy().copy()
+
+    def preprocess_batch(self, images: List[np.ndarray]) -> "torch.Tensor":
+        """
+        Batch NCHW normalizado (ImageNet) en self.device
+
+        En CPU el tensor comparte memoria con el buffer del preprocesador:
+        se pisa en la próxima llamada.
+        """
+        return self._to_tensor(self.prepare_batch(images))
+
+    def _to_tensor(self, batch: np.ndarray) -> "torch.Tensor":
+        """Batch del preprocesador -> tensor NCHW (vista channels-last si es NHWC) en self.device"""
+        tensor = torch.from_numpy(batch)
+        if self.preprocessor.layout == "nhwc":
+            tensor = tensor.permute(0, 3, 1, 2)
+        return tensor.to(self.device)
+
+    def infer(self, batch: np.ndarray) -> np.ndarray:
+        with torch.inference_mode():
+            output = self.model(self._to_tensor(batch))
+            predictions = torch.softmax(output, dim=1).cpu().numpy()
+
+        return predictions
@@ -0,0 +1,59 @@
+import logging
+
+import numpy as np
+
+from app.config import settings
+from app.core.preprocessing import FusedPreprocessor
+from app.models.backends import register_backend
+from app.models.base_model import BaseClassifier
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tensorflow as tf
+    TF_AVAILABLE = True
+except ImportError:
+    TF_AVAILABLE = False
+
+
+@register_backend("tensorflow", suffixes=(".h5", ".keras"))
+class KerasBackend(BaseClassifier):
+    """MobileNetV2 Keras (.h5 / .keras)"""
+
+    def __init__(self):
+        super().__init__()
+        # preprocess_input de MobileNetV2: RGB a [-1, 1], NHWC
+        self.preprocessor = FusedPreprocessor(self.input_shape, (0.5,) * 3, (0.5,) * 3, "nhwc")
+
+    def load_model(self, model_path: str):
+        """Cargar modelo TensorFlow"""
+        if not TF_AVAILABLE:
+            raise ImportError("TensorFlow no está instalado")
+
+        try:
+            try:
+                if settings.INFERENCE_THREADS > 0:
+                    tf.config.threading.set_intra_op_parallelism_threads(settings.INFERENCE_THREADS)
+                if settings.INFERENCE_INTEROP_THREADS > 0:
+                    tf.config.threading.set_inter_op_parallelism_threads(settings.INFERENCE_INTEROP_THREADS)
+            except RuntimeError:
+                pass  # El runtime de TF ya estaba inicializado
+            
+            self.model = tf.keras.models.load_model(model_path)
+            # Detectar número de clases de la última capa
+            self.num_classes = self.model.layers[-1].output_shape[-1]
+            logger.info(f"Modelo TensorFlow cargado: {model_path}")
+            logger.info(f"Forma de entrada: {self.model.input_shape}")
+            logger.info(f"Número de capas: {len(self.model.layers)}")
+            logger.info(f"Número de clases: {self.num_classes}")
+        except Exception as e:
+            error_msg = f"Error cargando modelo TensorFlow: {str(e)}"
+            logger.error(error_msg)
+            raise Exception(error_msg)
+
+    def preprocess(self, image: np.ndarray) -> np.ndarray:
+        """Preprocesamiento para TensorFlow (batch de 1)"""
+        return self.preprocessor.batch([image]).copy()
+
+    def infer(self, batch: np.ndarray) -> np.ndarray:
+        return np.asarray(self.model.predict(batch, verbose=0))
@@ -0,0 +1,90 @@
+import logging
+
+import numpy as np
+
+from app.config import settings
+from app.core.preprocessing import FusedPreprocessor
+from app.models.backends import register_backend
+from app.models.base_model import BaseClassifier
+
+logger = logging.getLogger(__name__)
+
+# Intérprete TFLite liviano: tflite_runtime / ai-edge-litert, o el de TensorFlow completo
+TFLiteInterpreter = None
+for _module in ('tflite_runtime.interpreter', 'ai_edge_litert.interpreter', 'tensorflow.lite'):
+    try:
+        TFLiteInterpreter = __import__(_module, fromlist=['Interpreter']).Interpreter
+        break
+    except ImportError:
+        continue
+
+
+@register_backend("tflite", suffixes=(".tflite",))
+class TFLiteBackend(BaseClassifier):
+    """Modelo TFLite (float32, float16 o int8) con intérprete multi-thread"""
+
+    def __init__(self):
+        super().__init__()
+        # Mismo contrato que Keras: RGB normalizado a [-1, 1], NHWC float32
+        self.preprocessor = FusedPreprocessor(self.input_shape, (0.5,) * 3, (0.5,) * 3, "nhwc")
+        self._batch_size = None
+
+    def load_model(self, model_path: str):
+        if TFLiteInterpreter is None:
+            raise ImportError("No hay intérprete TFLite (tflite-runtime, ai-edge-litert o tensorflow)")
+
+        try:
+            num_threads = settings.TFLITE_NUM_THREADS or settings.INFERENCE_THREADS or None
+            interpreter = TFLiteInterpreter(model_path=model_path, num_threads=num_threads)
+            interpreter.allocate_tensors()
+
+            self.model = interpreter
+            self._input = interpreter.get_input_details()[0]
+            self._output = interpreter.get_output_details()[0]
+            self.num_classes = int(self._output['shape'][-1])
+            self._batch_size = int(self._input['shape'][0])
+
+            logger.info(f"Modelo TFLite cargado: {model_path}")
+            logger.info(f"Intérprete: {TFLiteInterpreter.__module__}")
+            logger.info(f"Threads: {num_threads or 'automático'}")
+            logger.info(f"Entrada: {self._input['shape']} {self._input['dtype'].__name__}")
+            logger.info(f"Clases: {self.num_classes}")
+        except Exception as e:
+            error_msg = f"Error cargando modelo TFLite: {str(e)}"
+            logger.error(error_msg)
+            raise Exception(error_msg)
+
+    def preprocess(self, image: np.ndarray) -> np.ndarray:
+        return self.preprocessor.batch([image]).copy()
+
+    def infer(self, batch: np.ndarray) -> np.ndarray:
+        """Redimensiona el tensor de entrada solo si cambia N"""
+        batch_size = len(batch)
+        if self._batch_size != batch_size:
+            shape = [batch_size, *self._input['shape'][1:]]
+            self.model.resize_tensor_input(self._input['index'], shape)
+            self.model.allocate_tensors()
+            self._input = self.model.get_input_details()[0]
+            self._output = self.model.get_output_details()[0]
+            self._batch_size = batch_size
+
+        # Modelos int8: cuantizar la entrada con su escala/zero-point
+        input_dtype = self._input['dtype']
+        if input_dtype == np.float32:
+            model_input = batch
+        else:
+            scale, zero_point = self._input['quantization']
+            info = np.iinfo(input_dtype)
+            model_input = np.clip(
+                np.round(batch / scale + zero_point), info.min, info.max
+            ).astype(input_dtype)
+
+        self.model.set_tensor(self._input['index'], model_input)
+        self.model.invoke()
+        predictions = self.model.get_tensor(self._output['index'])
+
+        if self._output['dtype'] != np.float32:
+            scale, zero_point = self._output['quantization']
+            predictions = (predictions.astype(np.float32) - zero_point) * scale
+
+        return predictions.copy()
@@ -1,15 +1,78 @@
 from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+
 import numpy as np
 
+from app.config import settings
+
+# Normalización ImageNet (contrato de entrada de los modelos PyTorch/ONNX)
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+
 class BaseClassifier(ABC):
-    """Clase base para cualquier modelo de clasificación"""
-    
+    """
+    Clase base para cualquier modelo de clasificación
+
+    Cada motor (PyTorch, Keras, ONNX, TFLite, ...) implementa `load_model`,
+    `preprocess` e `infer`, y deja en `self.preprocessor` el objeto que arma
+    sus batches (`fill` / `batch` / `sample_shape`, picklable). `predict_batch`
+    es prepare_batch + infer; `predict` y `classify_batch` salen de ahí.
+
+    Separar preprocesamiento e inferencia permite hacer cada etapa en un
+    proceso distinto (ver app/serving).
+    """
+
+    framework: Optional[str] = None
+    # Se puede usar en procesos creados con fork después de load_model
+    # (el motor no arranca threads propios al cargar)
+    fork_safe: bool = False
+
+    def __init__(self):
+        self.model = None
+        self.input_shape: Tuple[int, int] = settings.IMG_SIZE
+        self.num_classes: Optional[int] = None
+        self.preprocessor = None
+
     @abstractmethod
     def load_model(self, model_path: str):
         """Cargar modelo desde archivo"""
         pass
-    
+
+    @abstractmethod
+    def preprocess(self, image: np.ndarray) -> np.ndarray:
+        """Preprocesamiento específico del modelo (batch de 1)"""
+        pass
+
     @abstractmethod
+    def infer(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Forward sobre un batch ya preprocesado
+
+        Args:
+            batch: (N, *preprocessor.sample_shape) float32, de prepare_batch
+
+        Returns:
+            Matriz de probabilidades (N, num_clases) float32
+        """
+        pass
+
+    def prepare_batch(self, images: List[np.ndarray]) -> np.ndarray:
+        """Batch listo para `infer` (vista de un buffer reutilizado del preprocesador)"""
+        return self.preprocessor.batch(images)
+
+    def predict_batch(self, images: List[np.ndarray]) -> np.ndarray:
+        """
+        Ejecutar UNA sola pasada del modelo para varias imágenes
+
+        Args:
+            images: lista de imágenes BGR uint8 (cualquier tamaño, como decode_image)
+
+        Returns:
+            Matriz de probabilidades (N, num_clases) float32
+        """
+        return self.infer(self.prepare_batch(images))
+
     def predict(self, image: np.ndarray) -> dict:
         """
         Ejecutar predicción
@@ -21,9 +84,29 @@ class BaseClassifier(ABC):
                 "all_probabilities": list
             }
         """
-        pass
-    
-    @abstractmethod
-    def preprocess(self, image: np.ndarray) -> np.ndarray:
-        """Preprocesamiento específico del modelo"""
-        pass
\ No newline at end of file
+        return self.classify_batch([image])[0]
+
+    def classify_batch(self, images: List[np.ndarray]) -> List[dict]:
+        """Igual que predict_batch pero retorna un dict por imagen (formato de predict)"""
+        probabilities = self.predict_batch(images)
+        return [self.format_prediction(row) for row in probabilities]
+
+    @staticmethod
+    def format_prediction(predictions: np.ndarray) -> dict:
+        """Convierte un vector de probabilidades en el dict de predicción"""
+        class_id = int(np.argmax(predictions))
+        confidence = float(predictions[class_id])
+
+        return {
+            "class_id": class_id,
+            "class_name": settings.CLASSES[class_id],
+            "confidence": confidence,
+            "all_probabilities": predictions.tolist()
+        }
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    """Softmax por fila, numéricamente estable"""
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
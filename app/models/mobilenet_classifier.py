@@ -1,231 +1,167 @@
 import numpy as np
 from app.models.base_model import BaseClassifier
+from app.models.backends import resolve_backend
 from app.config import settings
+from app.utils.memory import release_memory
 from pathlib import Path
 import logging
-from typing import Optional
+import threading
+from typing import List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
-# Importar frameworks de manera segura (pueden no estar instalados)
-try:
-    import tensorflow as tf
-    TF_AVAILABLE = True
-except ImportError:
-    TF_AVAILABLE = False
 
-try:
-    import torch
-    import torchvision.transforms as transforms
-    PYTORCH_AVAILABLE = True
-except ImportError:
-    PYTORCH_AVAILABLE = False
+class _LoadedModel:
+    """
+    Un motor cargado + su lock + cuántas llamadas lo están usando
+
+    Al reemplazarlo (swap) queda `retired`: las llamadas en curso terminan
+    sobre él y la última en salir libera los pesos.
+    """
+
+    def __init__(self, backend: BaseClassifier, model_id: str):
+        self.backend = backend
+        self.model_id = model_id
+        # Serializa el forward: el motor se comparte entre threads del executor
+        self.lock = threading.Lock()
+        self.refs = 0
+        self.retired = False
+
+    def release(self):
+        logger.info(f"Liberando modelo anterior: {self.model_id}")
+        self.backend = None
+        release_memory()
 
 
 class MobileNetClassifier(BaseClassifier):
+    """
+    Clasificador que usa el API
+
+    Delega en el motor registrado para MODEL_PATH (ver app/models/backends):
+    settings.MODEL_BACKEND o, con "auto", la extensión del archivo.
+
+    El motor activo se puede reemplazar en caliente (`swap`, ver
+    ModelManager): las llamadas nuevas usan el nuevo y las que estaban en
+    curso terminan sobre el anterior, que se libera al quedar sin uso.
+    """
+
+    supports_reload = True
+
     def __init__(self):
-        self.model = None
-        self.input_shape = settings.IMG_SIZE
-        self.framework = None  # 'tensorflow' o 'pytorch'
-        self.device = None  # Para PyTorch
-        
-    def load_model(self, model_path: str):
+        super().__init__()
+        self._current: Optional[_LoadedModel] = None
+        # Protege el cambio de modelo y los contadores de referencias
+        self._swap_lock = threading.Lock()
+
+    @staticmethod
+    def build_backend(model_path: str) -> Tuple[BaseClassifier, str]:
         """
-        Carga el modelo detectando automáticamente el framework
-        Soporta:
+        Carga el modelo con el motor que corresponda, sin activarlo
+        Soporta (auto-detección por extensión):
         - TensorFlow (.h5, .keras)
         - PyTorch (.pth, .pt)
-        
+        - ONNX Runtime (.onnx)
+        - TFLite (.tflite)
+        - NumPy (.npz, clasificador lineal de prueba)
+
         Args:
             model_path: ruta al archivo del modelo
-            
+
+        Returns:
+            (motor cargado, model_id: ruta + mtime)
+
         Raises:
             FileNotFoundError: Si el archivo no existe
+            ValueError: Si el formato o MODEL_BACKEND no están soportados
             Exception: Si hay error cargando el modelo
         """
         model_file = Path(model_path)
-        
+
         if not model_file.exists():
             error_msg = f"Archivo de modelo no encontrado: {model_path}"
             logger.error(error_msg)
             raise FileNotFoundError(error_msg)
-        
-        # Detectar framework por extensión
-        suffix = model_file.suffix.lower()
-        
-        if suffix in ['.pth', '.pt']:
-            self._load_pytorch_model(model_path)
-        elif suffix in ['.h5', '.keras']:
-            self._load_tensorflow_model(model_path)
-        else:
-            raise ValueError(f"Formato de modelo no soportado: {suffix}")
-    
-    def _load_tensorflow_model(self, model_path: str):
-        """Cargar modelo TensorFlow"""
-        if not TF_AVAILABLE:
-            raise ImportError("TensorFlow no está instalado")
-        
+
+        # mtime antes de cargar: si el archivo cambia durante la carga, el
+        # watcher lo vuelve a detectar
+        model_id = f"{model_file.resolve()}:{model_file.stat().st_mtime_ns}"
+        backend_cls = resolve_backend(model_path, settings.MODEL_BACKEND)
+        backend = backend_cls()
+        backend.load_model(model_path)
+        logger.info(f"Motor de inferencia: {backend.framework} ({backend_cls.__name__})")
+        return backend, model_id
+
+    def load_model(self, model_path: str):
+        """Carga el modelo y lo activa (ver build_backend)"""
+        self.swap(*self.build_backend(model_path))
+
+    def swap(self, backend: BaseClassifier, model_id: str):
+        """Activa un motor ya cargado; el anterior se libera cuando termine su último uso"""
+        loaded = _LoadedModel(backend, model_id)
+        with self._swap_lock:
+            previous, self._current = self._current, loaded
+            self.model = backend.model
+            self.num_classes = backend.num_classes
+            self.preprocessor = backend.preprocessor
+            release = previous is not None and previous.refs == 0
+            if previous is not None:
+                previous.retired = True
+        if release:
+            previous.release()
+
+    def _acquire(self) -> _LoadedModel:
+        with self._swap_lock:
+            if self._current is None:
+                raise RuntimeError("Modelo no cargado")
+            self._current.refs += 1
+            return self._current
+
+    def _release(self, loaded: _LoadedModel):
+        with self._swap_lock:
+            loaded.refs -= 1
+            release = loaded.retired and loaded.refs == 0
+        if release:
+            loaded.release()
+
+    @property
+    def backend(self) -> Optional[BaseClassifier]:
+        return self._current.backend if self._current else None
+
+    @property
+    def model_id(self) -> Optional[str]:
+        """Identifica el modelo activo (ruta + mtime), cambia en cada swap"""
+        return self._current.model_id if self._current else None
+
+    @property
+    def framework(self) -> Optional[str]:
+        return self.backend.framework if self.backend else None
+
+    def preprocess(self, image: np.ndarray) -> np.ndarray:
+        """Preprocesamiento específico del motor cargado"""
+        return self.backend.preprocess(image)
+
+    def infer(self, batch: np.ndarray) -> np.ndarray:
+        """Forward del motor activo sobre un batch ya preprocesado (ver prepare_batch del motor)"""
+        loaded = self._acquire()
         try:
-            self.model = tf.keras.models.load_model(model_path)
-            self.framework = 'tensorflow'
-            # Detectar número de clases de la última capa
-            self.num_classes = self.model.layers[-1].output_shape[-1]
-            logger.info(f"Modelo TensorFlow cargado: {model_path}")
-            logger.info(f"Forma de entrada: {self.model.input_shape}")
-            logger.info(f"Número de capas: {len(self.model.layers)}")
-            logger.info(f"Número de clases: {self.num_classes}")
-        except Exception as e:
-            error_msg = f"Error cargando modelo TensorFlow: {str(e)}"
-            logger.error(error_msg)
-            raise Exception(error_msg)
-    
-    def _load_pytorch_model(self, model_path: str):
-        """Cargar modelo PyTorch"""
-        if not PYTORCH_AVAILABLE:
-            raise ImportError("PyTorch no está instalado")
-        
+            with loaded.lock:
+                return loaded.backend.infer(batch)
+        finally:
+            self._release(loaded)
+
+    def predict_batch(self, images: List[np.ndarray]) -> np.ndarray:
+        """
+        Ejecuta UNA sola pasada del modelo para varias imágenes
+
+        Args:
+            images: lista de imágenes BGR (cualquier tamaño)
+
+        Returns:
+            Matriz de probabilidades (N, num_clases)
+        """
+        loaded = self._acquire()
         try:
-            from torchvision import models
-            
-            # Detectar dispositivo (GPU si disponible, sino CPU)
-            self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-            logger.info(f"Usando dispositivo: {self.device}")
-            
-            # Cargar pesos primero para detectar número de clases
-            checkpoint = torch.load(model_path, map_location=self.device, weights_only=False)
-            
-            # Detectar número de clases del checkpoint
-            # Buscar el último layer lineal de salida (classifier.4)
-            # Necesitamos el layer FINAL con shape[0] = número de clases
-            num_classes = None
-            classifier_weights = [k for k in checkpoint.keys() if 'classifier' in k and 'weight' in k]
-            
-            if classifier_weights:
-                # El último layer lineal en la secuencia es el de salida con num_classes
-                # classifier.1 tiene shape [128, 1280], classifier.4 tiene shape [6, 128]
-                # Buscamos el que tiene el menor shape[1] (entrada) - ese es el final
-                final_layer = classifier_weights[-1]  # classifier.4 es el último
-                num_classes = checkpoint[final_layer].shape[0]
-            
-            if num_classes is None:
-                raise ValueError("No se pudo detectar número de clases del modelo")
-            
-            logger.info(f"Detectadas {num_classes} clases en el modelo")
-            
-            # Crear modelo base con el número correcto de clases
-            base_model = models.mobilenet_v2(pretrained=False)
-            
-            # Reemplazar cabezal (DEBE coincidir con el entrenamiento)
-            num_features = base_model.classifier[1].in_features
-            base_model.classifier = torch.nn.Sequential(
-                torch.nn.Dropout(p=0.5),
-                torch.nn.Linear(num_features, 128),
-                torch.nn.ReLU(inplace=True),
-                torch.nn.Dropout(p=0.5),
-                torch.nn.Linear(128, num_classes)  # Usar número de clases del modelo
-            )
-            
-            # Cargar pesos
-            base_model.load_state_dict(checkpoint)
-            base_model = base_model.to(self.device)
-            base_model.eval()
-            
-            self.model = base_model
-            self.framework = 'pytorch'
-            self.num_classes = num_classes
-            logger.info(f"Modelo PyTorch cargado: {model_path}")
-            logger.info(f"Dispositivo: {self.device}")
-            logger.info(f"Clases: {num_classes}")
-        except Exception as e:
-            error_msg = f"Error cargando modelo PyTorch: {str(e)}"
-            logger.error(error_msg)
-            raise Exception(error_msg)
-    
-    def preprocess(self, image: np.ndarray) -> np.ndarray:
-        """Preprocesamiento específico de MobileNet"""
-        if self.framework == 'tensorflow':
-            return self._preprocess_tensorflow(image)
-        elif self.framework == 'pytorch':
-            return self._preprocess_pytorch(image)
-        else:
-            raise ValueError(f"Framework no soportado: {self.framework}")
-    
-    def _preprocess_tensorflow(self, image: np.ndarray) -> np.ndarray:
-        """Preprocesamiento para TensorFlow"""
-        import tensorflow as tf
-        
-        # Redimensionar
-        image = tf.image.resize(image, self.input_shape)
-        # Normalizar [-1, 1] (MobileNet usa esta normalización)
-        image = tf.keras.applications.mobilenet_v2.preprocess_input(image)
-        # Añadir dimensión batch
-        image = np.expand_dims(image, axis=0)
-        return image
-    
-    def _preprocess_pytorch(self, image: np.ndarray) -> torch.Tensor:
-        """Preprocesamiento para PyTorch"""
-        from PIL import Image
-        import torchvision.transforms as transforms
-        
-        # Convertir numpy a PIL
-        if image.dtype != np.uint8:
-            image = (image * 255).astype(np.uint8)
-        
-        pil_image = Image.fromarray(image.astype(np.uint8))
-        
-        # Transformaciones
-        transform = transforms.Compose([
-            transforms.Resize(self.input_shape),
-            transforms.ToTensor(),
-            transforms.Normalize(
-                mean=[0.485, 0.456, 0.406],
-                std=[0.229, 0.224, 0.225]
-            )
-        ])
-        
-        # Aplicar transformaciones y añadir batch
-        tensor = transform(pil_image).unsqueeze(0)
-        return tensor.to(self.device)
-    
-    def predict(self, image: np.ndarray) -> dict:
-        """Predecir clase - funciona con ambos frameworks"""
-        
-        if self.framework == 'tensorflow':
-            return self._predict_tensorflow(image)
-        elif self.framework == 'pytorch':
-            return self._predict_pytorch(image)
-        else:
-            raise ValueError(f"Framework no soportado: {self.framework}")
-    
-    def _predict_tensorflow(self, image: np.ndarray) -> dict:
-        """Predicción TensorFlow"""
-        preprocessed = self._preprocess_tensorflow(image)
-        predictions = self.model.predict(preprocessed)[0]
-        
-        class_id = int(np.argmax(predictions))
-        confidence = float(predictions[class_id])
-        
-        return {
-            "class_id": class_id,
-            "class_name": settings.CLASSES[class_id],
-            "confidence": confidence,
-            "all_probabilities": predictions.tolist()
-        }
-    
-    def _predict_pytorch(self, image: np.ndarray) -> dict:
-        """Predicción PyTorch"""
-        preprocessed = self._preprocess_pytorch(image)
-        
-        with torch.no_grad():
-            output = self.model(preprocessed)
-            predictions = torch.softmax(output, dim=1)[0].cpu().numpy()
-        
-        class_id = int(np.argmax(predictions))
-        confidence = float(predictions[class_id])
-        
-        return {
-            "class_id": class_id,
-            "class_name": settings.CLASSES[class_id],
-            "confidence": confidence,
-            "all_probabilities": predictions.tolist()
-        }
\ No newline at end of file
+            with loaded.lock:
+                return loaded.backend.predict_batch(images)
+        finally:
+            self._release(loaded)
@@ -0,0 +1,168 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import settings
+from app.core.warmup import ModelWarmup, warm_up
+from app.models.mobilenet_classifier import MobileNetClassifier
+from app.utils.logger import logger
+from app.utils.memory import PeakRSSSampler, get_rss_mb
+
+
+class ReloadInProgressError(RuntimeError):
+    """Ya hay una recarga en curso"""
+
+
+def _file_state(path: str) -> Optional[Tuple[int, int, int]]:
+    """(inode, tamaño, mtime): cambia al sobrescribir o al reemplazar con rename"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class ModelManager:
+    """
+    Recarga del modelo en caliente, sin reiniciar ni cortar requests
+
+    `reload()` carga el checkpoint nuevo en segundo plano, lo precalienta con
+    los mismos tamaños de batch que el arranque y recién ahí lo activa
+    (MobileNetClassifier.swap). Las requests en curso terminan con el modelo
+    anterior, que se libera cuando sale la última. Se dispara por
+    POST /admin/reload o vigilando MODEL_PATH (`watch`).
+    """
+
+    def __init__(self, classifier: MobileNetClassifier, warmup: Optional[ModelWarmup] = None):
+        self.classifier = classifier
+        self.warmup = warmup
+
+        self._reload_lock = threading.Lock()
+        self._loaded_state = _file_state(settings.MODEL_PATH)
+        self._failed_state = None
+        self._watching = False
+
+        self.reloads = 0
+        self.failures = 0
+        self.last_reload: Optional[Dict[str, Any]] = None
+
+    def reload(self, model_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Carga, precalienta y activa un modelo (síncrono, correr fuera del event loop)
+
+        Args:
+            model_path: checkpoint nuevo; None = volver a leer MODEL_PATH
+
+        Returns:
+            resumen: duración, RSS antes/pico/después, model_id
+
+        Raises:
+            ReloadInProgressError: ya hay una recarga en curso
+            ValueError: el clasificador no se puede recargar (SERVING_LAYOUT=prefork)
+            FileNotFoundError / ValueError / Exception: el modelo nuevo no cargó
+                (el anterior sigue activo)
+        """
+        if not getattr(self.classifier, "supports_reload", False):
+            raise ValueError("El modelo no se puede recargar en este layout (reiniciar el servidor)")
+        if not self._reload_lock.acquire(blocking=False):
+            raise ReloadInProgressError("Ya hay una recarga de modelo en curso")
+
+        model_path = model_path or settings.MODEL_PATH
+        state = _file_state(model_path)
+        previous_id = self.classifier.model_id
+        start = time.perf_counter()
+        logger.info(f"Recargando modelo: {model_path}")
+        try:
+            with PeakRSSSampler() as memory:
+                backend, model_id = self.classifier.build_backend(model_path)
+                if self.warmup is not None and self.warmup.enabled:
+                    warm_up(backend, self.warmup.batch_sizes, self.warmup.iterations)
+                self.classifier.swap(backend, model_id)
+                del backend
+
+            settings.MODEL_PATH = model_path
+            self._loaded_state = state
+            self._failed_state = None
+            self.reloads += 1
+            self.last_reload = {
+                "status": "ok",
+                "model_path": model_path,
+                "model_id": model_id,
+                "previous_model_id": previous_id,
+                "duration_s": round(time.perf_counter() - start, 3),
+                "rss_before_mb": round(memory.start_mb, 1),
+                "rss_peak_mb": round(memory.peak_mb, 1),
+                # Si había requests en curso, el modelo anterior se libera después
+                "rss_after_mb": round(get_rss_mb(), 1),
+            }
+            logger.info(
+                f"Modelo recargado en {self.last_reload['duration_s']}s | RSS "
+                f"{self.last_reload['rss_before_mb']} -> pico {self.last_reload['rss_peak_mb']} "
+                f"-> {self.last_reload['rss_after_mb']} MB"
+            )
+            return self.last_reload
+        except Exception as e:
+            self.failures += 1
+            self._failed_state = state
+            self.last_reload = {
+                "status": "error",
+                "model_path": model_path,
+                "error": str(e),
+                "duration_s": round(time.perf_counter() - start, 3),
+            }
+            logger.error(f"Recarga fallida, se mantiene {previous_id}: {e}", exc_info=True)
+            raise
+        finally:
+            self._reload_lock.release()
+
+    async def watch(self, executor, interval: float):
+        """
+        Recarga cuando cambia MODEL_PATH (tarea del event loop)
+
+        Detecta tanto un reemplazo con `mv` (cambia el inode) como una
+        sobrescritura en el lugar; para que esta última no toque el modelo en
+        uso, con el watcher activo los pesos PyTorch se cargan copiados, no
+        mapeados (ver PyTorchBackend._load_state_dict). Espera a que el
+        archivo deje de cambiar durante un intervalo para no leer un
+        checkpoint a medio copiar; un archivo que ya falló no se reintenta
+        hasta que vuelva a cambiar. Igual conviene `mv` (atómico).
+        """
+        if not getattr(self.classifier, "supports_reload", False):
+            logger.warning("MODEL_WATCH_INTERVAL no aplica en este layout (el modelo no se recarga)")
+            return
+        self._watching = True
+        logger.info(f"Vigilando {settings.MODEL_PATH} cada {interval}s")
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                state = _file_state(settings.MODEL_PATH)
+                if state is None or state in (self._loaded_state, self._failed_state):
+                    continue
+
+                await asyncio.sleep(interval)
+                if _file_state(settings.MODEL_PATH) != state:
+                    continue  # Se sigue escribiendo
+
+                try:
+                    await executor.run_in_thread(self.reload)
+                except ReloadInProgressError:
+                    pass
+                except Exception as e:
+                    # Errores de carga ya quedan logueados en reload(); con el
+                    # executor saturado se reintenta en la próxima vuelta
+                    logger.debug(f"Recarga por cambio de archivo no aplicada: {e}")
+        finally:
+            self._watching = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model_id": self.classifier.model_id,
+            "framework": self.classifier.framework,
+            "watching": self._watching,
+            "reloading": self._reload_lock.locked(),
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_reload": self.last_reload,
+        }
@@ -0,0 +1,375 @@
+"""
+Optimizaciones de serving para el modelo PyTorch
+
+- Conv-BN folding (torch.fx) + trace + freeze a TorchScript
+- Layout channels-last
+- INT8: cuantización estática del backbone + dinámica del cabezal
+- Cache en disco del artefacto compilado (arranques siguientes no trazan)
+"""
+import copy
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+def fold_conv_bn(model: torch.nn.Module) -> torch.nn.Module:
+    """Pliega cada BatchNorm en la convolución anterior (modelo en eval)"""
+    from torch.fx.experimental.optimization import fuse
+
+    return fuse(model.eval(), inplace=False)
+
+
+def compile_torchscript(
+    model: torch.nn.Module,
+    example: torch.Tensor,
+    channels_last: bool = True
+) -> torch.jit.ScriptModule:
+    """Conv-BN folding -> trace -> freeze"""
+    folded = fold_conv_bn(model)
+    if channels_last:
+        folded = folded.to(memory_format=torch.channels_last)
+        example = example.contiguous(memory_format=torch.channels_last)
+
+    with torch.inference_mode():
+        traced = torch.jit.trace(folded, example)
+    return torch.jit.freeze(traced.eval())
+
+
+def benchmark(model: Callable, example: torch.Tensor, iterations: int = 20, warmup: int = 3) -> float:
+    """Latencia media (ms) de model(example)"""
+    with torch.inference_mode():
+        for _ in range(warmup):
+            model(example)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            model(example)
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def compiled_cache_path(
+    checkpoint_path: str,
+    cache_dir: str,
+    device: torch.device,
+    channels_last: bool,
+    tag: str = "ts"
+) -> Path:
+    """
+    Ruta del artefacto compilado: cambia si cambia el checkpoint (mtime),
+    el dispositivo, el layout o la versión de torch
+    """
+    checkpoint = Path(checkpoint_path)
+    layout = "cl" if channels_last else "cf"
+    version = torch.__version__.split("+")[0]
+    name = (
+        f"{checkpoint.stem}.{checkpoint.stat().st_mtime_ns}."
+        f"{device.type}.{layout}.torch{version}.{tag}.pt"
+    )
+    return Path(cache_dir) / name
+
+
+def load_or_compile_torchscript(
+    checkpoint_path: str,
+    build_eager: Callable[[], Tuple[torch.nn.Module, int]],
+    device: torch.device,
+    input_shape: Tuple[int, int],
+    cache_dir: str,
+    channels_last: bool = True
+) -> Tuple[torch.jit.ScriptModule, int]:
+    """
+    Retorna (modelo TorchScript congelado, num_classes)
+
+    Si el artefacto ya está en cache se carga directo (sin construir el modelo
+    eager ni trazar). Si no, se compila, se reporta latencia eager vs
+    compilado sobre la misma entrada y se guarda en cache.
+    """
+    cache_path = compiled_cache_path(checkpoint_path, cache_dir, device, channels_last)
+
+    if cache_path.exists():
+        extra_files = {"num_classes": ""}
+        model = torch.jit.load(str(cache_path), map_location=device, _extra_files=extra_files)
+        logger.info(f"Modelo TorchScript cargado desde cache: {cache_path}")
+        return model, int(extra_files["num_classes"])
+
+    eager_model, num_classes = build_eager()
+
+    height, width = input_shape
+    example = torch.randn(1, 3, height, width, device=device)
+
+    start = time.perf_counter()
+    compiled = compile_torchscript(eager_model, example, channels_last=channels_last)
+    logger.info(f"Modelo compilado a TorchScript en {time.perf_counter() - start:.2f}s")
+
+    # Latencia antes/después sobre la MISMA entrada
+    compiled_example = (
+        example.contiguous(memory_format=torch.channels_last) if channels_last else example
+    )
+    eager_ms = benchmark(eager_model, example)
+    compiled_ms = benchmark(compiled, compiled_example)
+    logger.info(
+        f"Latencia batch=1 | eager: {eager_ms:.2f}ms | "
+        f"TorchScript: {compiled_ms:.2f}ms | speedup: {eager_ms / compiled_ms:.2f}x"
+    )
+
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        torch.jit.save(compiled, str(cache_path), _extra_files={"num_classes": str(num_classes)})
+        logger.info(f"Artefacto compilado guardado en cache: {cache_path}")
+    except OSError as e:
+        logger.warning(f"No se pudo guardar el artefacto compilado: {str(e)}")
+
+    return compiled, num_classes
+
+
+# ================== INT8 ==================
+
+class HybridQuantizedMobileNet(torch.nn.Module):
+    """
+    MobileNetV2 con backbone cuantizado estáticamente y cabezal en float
+
+    El cabezal (Linear) se cuantiza después con quantize_dynamic; por eso el
+    dequant va ANTES del classifier.
+    """
+
+    def __init__(self, features: torch.nn.Module, classifier: torch.nn.Module):
+        super().__init__()
+        self.quant = torch.ao.quantization.QuantStub()
+        self.features = features
+        self.dequant = torch.ao.quantization.DeQuantStub()
+        self.classifier = classifier
+
+    def forward(self, x):
+        x = self.quant(x)
+        x = self.features(x)
+        x = torch.nn.functional.adaptive_avg_pool2d(x, (1, 1))
+        x = torch.flatten(x, 1)
+        x = self.dequant(x)
+        return self.classifier(x)
+
+
+def load_image_folder(
+    directory: str,
+    limit: Optional[int] = None,
+    class_names: Optional[List[str]] = None
+) -> Tuple[List[np.ndarray], List[Optional[int]]]:
+    """
+    Imágenes BGR de una carpeta (como las entrega decode_image) (recursivo)
+
+    Si la carpeta padre de una imagen se llama como una clase, se usa como
+    etiqueta (estructura dataset/<clase>/img.jpg); si no, la etiqueta es None.
+    """
+    import cv2
+
+    images, labels = [], []
+    for path in sorted(Path(directory).rglob("*")):
+        if path.suffix.lower() not in IMAGE_EXTENSIONS:
+            continue
+        image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+        if image is None:
+            continue
+        images.append(image)
+        parent = path.parent.name
+        labels.append(class_names.index(parent) if class_names and parent in class_names else None)
+        if limit and len(images) >= limit:
+            break
+    return images, labels
+
+
+def int8_cache_tag(
+    backend: str,
+    calibration_dir: str,
+    validation_dir: str,
+    min_agreement: float,
+    calibration_samples: int
+) -> str:
+    """
+    Tag del artefacto INT8: cambia si cambia el umbral de coincidencia, la
+    cantidad de muestras o alguna imagen (ruta, tamaño, mtime) de las carpetas
+    de calibración/validación; así un artefacto viejo no saltea la validación
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(f"{min_agreement!r}|{calibration_samples}".encode())
+    for directory in (calibration_dir, validation_dir):
+        digest.update(b"|")
+        if not directory:
+            continue
+        for path in sorted(Path(directory).rglob("*")):
+            if path.suffix.lower() in IMAGE_EXTENSIONS:
+                stat = path.stat()
+                digest.update(f"{path.relative_to(directory)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return f"int8-{backend}-{digest.hexdigest()}"
+
+
+def _batched_probabilities(
+    model: Callable,
+    images: List[np.ndarray],
+    preprocess: Callable[[List[np.ndarray]], torch.Tensor],
+    batch_size: int
+) -> np.ndarray:
+    outputs = []
+    with torch.inference_mode():
+        for i in range(0, len(images), batch_size):
+            logits = model(preprocess(images[i:i + batch_size]))
+            outputs.append(torch.softmax(logits, dim=1).cpu().numpy())
+    return np.concatenate(outputs, axis=0)
+
+
+def quantize_int8(
+    eager_model: torch.nn.Module,
+    calibration_images: List[np.ndarray],
+    preprocess: Callable[[List[np.ndarray]], torch.Tensor],
+    backend: str = "x86",
+    batch_size: int = 16
+) -> torch.nn.Module:
+    """
+    - Backbone: cuantización estática post-entrenamiento (calibrada)
+    - Cabezal: cuantización dinámica de los Linear
+    """
+    from torchvision.models.quantization import mobilenet_v2 as quantizable_mobilenet_v2
+
+    torch.backends.quantized.engine = backend
+
+    # Misma arquitectura pero con bloques cuantizables (skip-add con FloatFunctional)
+    quantizable = quantizable_mobilenet_v2(weights=None, quantize=False)
+    quantizable.classifier = copy.deepcopy(eager_model.classifier)
+    quantizable.load_state_dict(eager_model.state_dict())
+    quantizable.eval()
+    quantizable.fuse_model(is_qat=False)
+
+    model = HybridQuantizedMobileNet(quantizable.features, quantizable.classifier).eval()
+    model.qconfig = torch.ao.quantization.get_default_qconfig(backend)
+    model.classifier.qconfig = None
+    torch.ao.quantization.prepare(model, inplace=True)
+
+    # Calibración: observar rangos de activación con imágenes reales
+    with torch.inference_mode():
+        for i in range(0, len(calibration_images), batch_size):
+            model(preprocess(calibration_images[i:i + batch_size]))
+
+    torch.ao.quantization.convert(model, inplace=True)
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def compare_models(
+    float_model: Callable,
+    quantized_model: Callable,
+    images: List[np.ndarray],
+    labels: List[Optional[int]],
+    preprocess: Callable[[List[np.ndarray]], torch.Tensor],
+    batch_size: int = 16
+) -> Dict[str, float]:
+    """Coincidencia top-1 (y accuracy si hay etiquetas) float vs INT8"""
+    float_top1 = _batched_probabilities(float_model, images, preprocess, batch_size).argmax(axis=1)
+    quant_top1 = _batched_probabilities(quantized_model, images, preprocess, batch_size).argmax(axis=1)
+
+    report = {
+        "samples": len(images),
+        "top1_agreement": float((float_top1 == quant_top1).mean()),
+    }
+
+    labeled = [i for i, label in enumerate(labels) if label is not None]
+    if labeled:
+        truth = np.array([labels[i] for i in labeled])
+        report["float_accuracy"] = float((float_top1[labeled] == truth).mean())
+        report["int8_accuracy"] = float((quant_top1[labeled] == truth).mean())
+
+    example = preprocess(images[:1])
+    report["float_latency_ms"] = benchmark(float_model, example)
+    report["int8_latency_ms"] = benchmark(quantized_model, example)
+    return report
+
+
+def load_or_quantize_int8(
+    checkpoint_path: str,
+    build_eager: Callable[[], Tuple[torch.nn.Module, int]],
+    preprocess: Callable[[List[np.ndarray]], torch.Tensor],
+    input_shape: Tuple[int, int],
+    cache_dir: str,
+    calibration_dir: str,
+    validation_dir: str,
+    min_agreement: float,
+    class_names: List[str],
+    backend: str = "x86",
+    calibration_samples: int = 200
+) -> Tuple[torch.nn.Module, int, bool]:
+    """
+    Retorna (modelo, num_classes, es_int8)
+
+    El modelo INT8 solo se activa si su top-1 coincide con el float en al
+    menos `min_agreement` de las imágenes de validación; si no, o si faltan
+    las carpetas de calibración/validación, se sirve el modelo float. El
+    artefacto en cache queda atado al umbral y a las imágenes usadas
+    (int8_cache_tag).
+    """
+    device = torch.device("cpu")
+    tag = int8_cache_tag(backend, calibration_dir, validation_dir, min_agreement, calibration_samples)
+    cache_path = compiled_cache_path(checkpoint_path, cache_dir, device, False, tag=tag)
+
+    if cache_path.exists():
+        torch.backends.quantized.engine = backend
+        extra_files = {"num_classes": "", "report": ""}
+        model = torch.jit.load(str(cache_path), map_location=device, _extra_files=extra_files)
+        logger.info(f"Modelo INT8 cargado desde cache: {cache_path}")
+        report = extra_files["report"]
+        if isinstance(report, bytes):
+            report = report.decode()
+        logger.info(f"Validación INT8 (al generarlo): {report}")
+        return model, int(extra_files["num_classes"]), True
+
+    eager_model, num_classes = build_eager()
+
+    if not calibration_dir or not validation_dir:
+        logger.warning(
+            "Modo int8 requiere QUANT_CALIBRATION_DIR y QUANT_VALIDATION_DIR - "
+            "sirviendo modelo float"
+        )
+        return eager_model, num_classes, False
+
+    calibration_images, _ = load_image_folder(calibration_dir, limit=calibration_samples)
+    validation_images, validation_labels = load_image_folder(validation_dir, class_names=class_names)
+    if not calibration_images or not validation_images:
+        logger.warning("Carpetas de calibración/validación sin imágenes - sirviendo modelo float")
+        return eager_model, num_classes, False
+
+    start = time.perf_counter()
+    quantized = quantize_int8(eager_model, calibration_images, preprocess, backend=backend)
+    logger.info(
+        f"Modelo cuantizado a INT8 en {time.perf_counter() - start:.2f}s "
+        f"({len(calibration_images)} imágenes de calibración)"
+    )
+
+    report = compare_models(eager_model, quantized, validation_images, validation_labels, preprocess)
+    logger.info(f"Validación INT8 vs float: {report}")
+
+    if report["top1_agreement"] < min_agreement:
+        logger.warning(
+            f"INT8 rechazado: coincidencia top-1 {report['top1_agreement']:.2%} "
+            f"< {min_agreement:.2%} - sirviendo modelo float"
+        )
+        return eager_model, num_classes, False
+
+    height, width = input_shape
+    with torch.inference_mode():
+        traced = torch.jit.freeze(torch.jit.trace(quantized, torch.randn(1, 3, height, width)).eval())
+
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        torch.jit.save(
+            traced,
+            str(cache_path),
+            _extra_files={"num_classes": str(num_classes), "report": json.dumps(report)}
+        )
+        logger.info(f"Modelo INT8 guardado en cache: {cache_path}")
+    except OSError as e:
+        logger.warning(f"No se pudo guardar el modelo INT8: {str(e)}")
+
+    return traced, num_classes, True
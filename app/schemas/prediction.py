@@ -21,4 +21,17 @@ class PredictionResponse(BaseModel):
 
 class ESPResponse(BaseModel):
     """Respuesta minimalista para ESP32"""
-    code: int
\ No newline at end of file
+    code: int
+
+class BatchItemResult(BaseModel):
+    """Resultado de una imagen dentro de /predict/batch"""
+    index: int
+    filename: Optional[str] = None
+    status_code: int = 200
+    prediction: Optional[PredictionResponse] = None
+    error: Optional[str] = None
+
+class BatchPredictionResponse(BaseModel):
+    """Respuesta de /predict/batch (mismo orden que los archivos enviados)"""
+    results: list[BatchItemResult]
+    processing_time: float
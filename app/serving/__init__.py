@@ -0,0 +1,40 @@
+"""
+Layouts de serving alternativos a "un modelo por worker de uvicorn"
+
+Por defecto (SERVING_LAYOUT=workers) cada worker importa el framework y
+carga su propia copia del modelo. Los módulos de este paquete separan el
+HTTP / preprocesamiento de la inferencia:
+
+- prefork: el modelo se carga una vez en el proceso padre y los workers de
+  inferencia se crean con fork después de la carga (pesos compartidos
+  copy-on-write); los front-ends HTTP les pasan los batches ya
+  preprocesados por memoria compartida (shm.SharedTensorSlots)
+- daemon: un proceso aparte carga el modelo y atiende a todos los workers de
+  uvicorn por un socket Unix; junta en un forward las requests de todos
+  ellos (los tensores también van por SharedTensorSlots)
+
+En prefork el proceso del front-end instala su cliente con
+`install_classifier` antes de importar la app; en daemon cada worker crea
+el suyo. app/api/routes.py lo usa en lugar de cargar un MobileNetClassifier
+propio.
+"""
+from typing import Any, Optional
+
+from app.config import settings
+
+_installed: Optional[Any] = None
+
+
+def install_classifier(classifier: Any):
+    """Clasificador a usar en app/api/routes.py (llamar antes de importar app.main)"""
+    global _installed
+    _installed = classifier
+
+
+def installed_classifier() -> Optional[Any]:
+    """Clasificador instalado por el layout de serving, o None (layout workers)"""
+    global _installed
+    if _installed is None and settings.SERVING_LAYOUT == "daemon":
+        from app.serving.daemon import DaemonClassifier
+        _installed = DaemonClassifier.from_settings()
+    return _installed
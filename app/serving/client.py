@@ -0,0 +1,240 @@
+import copy
+import itertools
+import os
+import threading
+import time
+from abc import abstractmethod
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.models.base_model import BaseClassifier
+from app.serving.shm import SharedTensorSlots
+from app.utils.memory import get_memory_breakdown
+
+
+class SlotClassifier(BaseClassifier):
+    """
+    Base de los clasificadores que infieren en otro proceso
+
+    Preprocesa en este proceso, directo dentro de un slot de
+    SharedTensorSlots, manda a inferir solo el número de slot y copia la
+    salida. Reemplaza a MobileNetClassifier en app/api/routes.py:
+    `predict_batch` / `classify_batch` / `predict` funcionan igual para el
+    micro-batcher, /predict/batch y el warm-up.
+
+    Cada layout implementa el transporte:
+    - `_connect()`: prepara el canal en este proceso (lazy; se vuelve a
+      llamar si el layout marca `_connected = False`)
+    - `_acquire_slot()` / `_release_slot(slot)`: lista de slots libres
+    - `_send(slot, count, seq)`: pedir la inferencia; la respuesta llega por
+      `_resolve(seq, error)` desde un thread del layout
+
+    Un slot cuya respuesta no llegó en `timeout` no se reusa (el otro proceso
+    puede seguir escribiendo en él): queda anotado por seq y vuelve a la
+    lista de libres cuando llega la respuesta tardía (o el error del worker
+    que lo reemplaza), o con `_reclaim_lost_slots()` al reconectar.
+
+    El modelo no vive en este proceso, así que no se puede recargar.
+    """
+
+    supports_reload = False
+    layout: Optional[str] = None
+
+    def __init__(self, timeout: float = 30.0):
+        super().__init__()
+        self.timeout = timeout
+        self.model_id: Optional[str] = None
+        self._slots: Optional[SharedTensorSlots] = None
+
+        # El canal se abre en el proceso que usa el cliente (los threads no sobreviven un fork)
+        self._connected = False
+        self._local = threading.local()
+        self._pending: Dict[int, Future] = {}
+        # seq -> slot de requests que se dieron por perdidas (timeout)
+        self._lost: Dict[int, int] = {}
+        self._pending_lock = threading.Lock()
+        self._connect_lock = threading.Lock()
+        self._seq = itertools.count()
+
+        self._batches = 0
+        self._items = 0
+        self._slot_wait = 0.0
+        self._roundtrip = 0.0
+        self._errors = 0
+        self._lost_slots = 0
+        self._reclaimed_slots = 0
+
+    def load_model(self, model_path: str):
+        raise RuntimeError(f"El modelo se carga en el proceso de inferencia ({self.layout})")
+
+    @abstractmethod
+    def _connect(self):
+        """Abre el canal con el proceso de inferencia (en el proceso que usa el cliente)"""
+        pass
+
+    @abstractmethod
+    def _acquire_slot(self) -> Optional[int]:
+        """Slot libre, o None si no se liberó ninguno en `timeout` segundos"""
+        pass
+
+    @abstractmethod
+    def _release_slot(self, slot: int):
+        """Devuelve el slot a la lista de libres"""
+        pass
+
+    @abstractmethod
+    def _send(self, slot: int, count: int, seq: int):
+        """Pide la inferencia de `count` imágenes del slot; la respuesta llega por `_resolve`"""
+        pass
+
+    def _ensure_connected(self):
+        if not self._connected:
+            with self._connect_lock:
+                if not self._connected:
+                    self._connect()
+                    self._connected = True
+
+    def preprocess(self, image: np.ndarray) -> np.ndarray:
+        return self._preprocessor().batch([image]).copy()
+
+    def infer(self, batch: np.ndarray) -> np.ndarray:
+        """Batch ya preprocesado: se copia a un slot e infiere en el otro proceso"""
+        self._ensure_connected()
+        results = []
+        for start in range(0, len(batch), self._slots.capacity):
+            chunk = batch[start:start + self._slots.capacity]
+
+            def fill(inputs, chunk=chunk):
+                np.copyto(inputs[:len(chunk)], chunk)
+
+            results.append(self._run(len(chunk), fill))
+        return np.concatenate(results) if results else np.empty((0, self.num_classes), np.float32)
+
+    def predict_batch(self, images: List[np.ndarray]) -> np.ndarray:
+        """Preprocesa directo dentro del slot de memoria compartida (sin copia intermedia)"""
+        preprocessor = self._preprocessor()
+        results = []
+        for start in range(0, len(images), self._slots.capacity):
+            chunk = images[start:start + self._slots.capacity]
+
+            def fill(inputs, chunk=chunk):
+                for i, image in enumerate(chunk):
+                    preprocessor.fill(image, inputs[i])
+
+            results.append(self._run(len(chunk), fill))
+        return np.concatenate(results) if results else np.empty((0, self.num_classes), np.float32)
+
+    def _preprocessor(self):
+        """Una copia del preprocesador por thread: sus buffers no son thread-safe"""
+        self._ensure_connected()
+        if not hasattr(self._local, "preprocessor"):
+            self._local.preprocessor = copy.deepcopy(self.preprocessor)
+        return self._local.preprocessor
+
+    def _next_seq(self) -> int:
+        return next(self._seq) % 2**31
+
+    def _run(self, count: int, fill) -> np.ndarray:
+        """Toma un slot libre, lo llena, lo manda a inferir y copia la salida"""
+        start = time.perf_counter()
+        slot = self._acquire_slot()
+        if slot is None:
+            self._errors += 1
+            raise TimeoutError(f"Sin slots libres después de {self.timeout}s")
+        acquired = time.perf_counter()
+
+        try:
+            fill(self._slots.inputs(slot))
+            seq = self._next_seq()
+            future = self._register(seq)
+            self._send(slot, count, seq)
+            try:
+                error = future.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                with self._pending_lock:
+                    timed_out = self._pending.pop(seq, None) is not None
+                    if timed_out:
+                        # El proceso de inferencia puede seguir escribiendo en el
+                        # slot: vuelve a la lista cuando llegue su respuesta
+                        self._lost[seq] = slot
+                if timed_out:
+                    self._errors += 1
+                    self._lost_slots += 1
+                    slot = None
+                    raise TimeoutError(f"El proceso de inferencia no respondió en {self.timeout}s")
+                error = future.result()  # La respuesta llegó justo después del timeout
+            if error is not None:
+                self._errors += 1
+                raise RuntimeError(f"Error en el proceso de inferencia: {error}")
+
+            probabilities = self._slots.outputs(slot)[:count].copy()
+        finally:
+            if slot is not None:
+                self._release_slot(slot)
+
+        self._batches += 1
+        self._items += count
+        self._slot_wait += acquired - start
+        self._roundtrip += time.perf_counter() - acquired
+        return probabilities
+
+    def _register(self, seq: int) -> Future:
+        future = Future()
+        with self._pending_lock:
+            self._pending[seq] = future
+        return future
+
+    def _resolve(self, seq: int, result: Any):
+        """
+        Respuesta del proceso de inferencia (la llama el thread del layout)
+
+        Para inferencias `result` es None (salida escrita en el slot) o el
+        mensaje de error.
+        """
+        with self._pending_lock:
+            future = self._pending.pop(seq, None)
+            lost_slot = self._lost.pop(seq, None) if future is None else None
+        if future is not None:
+            future.set_result(result)
+        elif lost_slot is not None:
+            # Respuesta tardía de una request que ya falló: el slot ya no se usa
+            self._reclaimed_slots += 1
+            self._release_slot(lost_slot)
+
+    def _reclaim_lost_slots(self):
+        """
+        Devuelve los slots perdidos cuando ya nadie puede escribir en ellos
+        (ej: se reconectó a un daemon nuevo; el anterior no responde más)
+        """
+        with self._pending_lock:
+            lost, self._lost = self._lost, {}
+        for slot in lost.values():
+            self._reclaimed_slots += 1
+            self._release_slot(slot)
+
+    def _fail_pending(self, error: str):
+        """Corta todas las requests en espera (ej: se cayó la conexión)"""
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_result(error)
+
+    def stats(self) -> Dict[str, Any]:
+        slots = self._slots
+        return {
+            "layout": self.layout,
+            "memory": {"pid": os.getpid(), **get_memory_breakdown()},
+            "slots": slots.num_slots if slots else 0,
+            "slot_capacity": slots.capacity if slots else 0,
+            "shm_mb": round(slots.nbytes / 1024 / 1024, 1) if slots else 0.0,
+            "batches": self._batches,
+            "items": self._items,
+            "avg_slot_wait_ms": round(self._slot_wait / self._batches * 1000, 3) if self._batches else 0.0,
+            "avg_roundtrip_ms": round(self._roundtrip / self._batches * 1000, 3) if self._batches else 0.0,
+            "errors": self._errors,
+            "lost_slots": self._lost_slots,
+            "reclaimed_slots": self._reclaimed_slots,
+            "slots_awaiting_reply": len(self._lost),
+        }
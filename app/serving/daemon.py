@@ -0,0 +1,496 @@
+"""
+Layout daemon: un proceso de inferencia para todos los workers de la API
+
+    python -m app.serving.daemon      # o run.py --layout daemon, que lo arranca solo
+
+    daemon ── MobileNetClassifier, escucha en INFERENCE_SOCKET (socket Unix)
+      ▲ │
+      │ └── (seq, error): la salida ya quedó escrita en el slot
+      └──── ("infer", seq, slot, n) desde cada worker de uvicorn (DaemonClassifier)
+
+Cada worker crea sus propios SharedTensorSlots y le pasa el spec al daemon
+en el handshake; por el socket solo viajan números de slot. El daemon junta
+en UN forward las requests de todos los workers que llegan dentro de
+DAEMON_BATCH_WAIT_MS (hasta DAEMON_MAX_BATCH_SIZE imágenes): el batching ya
+no queda limitado a lo que ve un worker, y el forward no compite por el GIL
+con el HTTP. A diferencia de prefork sirve con cualquier motor (no hay fork
+después de cargar).
+
+El micro-batcher de cada worker sigue activo: arma batches locales y el
+daemon los vuelve a juntar entre workers.
+"""
+import argparse
+import logging
+import os
+import queue
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, deque
+from multiprocessing.connection import Client, Listener
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.config import settings
+from app.serving.client import SlotClassifier
+from app.serving.shm import SharedTensorSlots
+from app.utils.memory import get_memory_breakdown
+
+logger = logging.getLogger(__name__)
+
+
+class _Connection:
+    """Un worker de la API conectado al daemon"""
+
+    def __init__(self, conn, slots: SharedTensorSlots, pid: int):
+        self.conn = conn
+        self.slots = slots
+        self.pid = pid
+        self._send_lock = threading.Lock()
+
+    def reply(self, message):
+        with self._send_lock:
+            try:
+                self.conn.send(message)
+            except (OSError, EOFError):
+                pass  # Se desconectó: lo limpia su thread lector
+
+
+class _Request:
+    __slots__ = ("connection", "seq", "slot", "count", "arrived")
+
+    def __init__(self, connection: _Connection, seq: int, slot: int, count: int):
+        self.connection = connection
+        self.seq = seq
+        self.slot = slot
+        self.count = count
+        self.arrived = time.perf_counter()
+
+
+class InferenceDaemon:
+    """
+    Servidor del layout daemon
+
+    Un thread por conexión lee pedidos y los encola; un solo thread arma los
+    batches y ejecuta el modelo, así que es el único que toca los slots.
+    """
+
+    def __init__(self, classifier, socket_path: str, max_batch_size: int = 32, max_wait_ms: float = 2.0):
+        self.classifier = classifier
+        self.socket_path = socket_path
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._connections: Dict[int, _Connection] = {}
+        self._connections_lock = threading.Lock()
+        self._listener: Optional[Listener] = None
+        self._buffer = np.empty((0,), np.float32)
+
+        self._batches = 0
+        self._items = 0
+        self._requests = 0
+        self._multi_worker_batches = 0
+        self._queue_wait = 0.0
+        self._infer_time = 0.0
+        self._errors = 0
+        self._histogram: Counter = Counter()
+
+    def serve_forever(self):
+        """Escucha hasta que se cierra el listener (ver stop)"""
+        _remove_stale_socket(self.socket_path)
+        self._listener = Listener(self.socket_path, family="AF_UNIX")
+        os.chmod(self.socket_path, 0o600)  # Solo el usuario del servidor
+        threading.Thread(target=self._batch_loop, name="daemon-batcher", daemon=True).start()
+        logger.info(
+            f"Daemon de inferencia escuchando en {self.socket_path} "
+            f"(batch hasta {self.max_batch_size}, ventana {self.max_wait * 1000:.1f} ms)"
+        )
+        while True:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                break  # Listener cerrado
+            threading.Thread(target=self._handle, args=(conn,), name="daemon-conn", daemon=True).start()
+
+    def stop(self):
+        if self._listener is not None:
+            self._listener.close()
+
+    def _handle(self, conn):
+        """Handshake y lectura de pedidos de un worker"""
+        backend = self.classifier.backend
+        try:
+            conn.send({
+                "pid": os.getpid(),
+                "model_id": self.classifier.model_id,
+                "framework": backend.framework,
+                "num_classes": backend.num_classes,
+                "preprocessor": backend.preprocessor,
+            })
+            hello = conn.recv()
+        except (EOFError, OSError):
+            conn.close()  # Ej: run.py comprobando si el socket responde
+            return
+
+        slots = SharedTensorSlots.attach(hello["slots"])
+        connection = _Connection(conn, slots, hello["pid"])
+        with self._connections_lock:
+            self._connections[id(connection)] = connection
+        logger.info(f"Worker conectado: pid {connection.pid} ({slots.num_slots} slots x {slots.capacity})")
+
+        try:
+            while True:
+                message = conn.recv()
+                if message[0] == "infer":
+                    _, seq, slot, count = message
+                    self._queue.put(_Request(connection, seq, slot, count))
+                elif message[0] == "stats":
+                    connection.reply((message[1], None, self.stats()))
+        except (EOFError, OSError):
+            pass
+        finally:
+            with self._connections_lock:
+                self._connections.pop(id(connection), None)
+            conn.close()
+            # Los slots se cierran en el thread de batches, después de sus pedidos pendientes
+            self._queue.put(connection)
+            logger.info(f"Worker desconectado: pid {connection.pid}")
+
+    def _batch_loop(self):
+        """Junta pedidos de todos los workers dentro de la ventana y ejecuta un forward"""
+        pending: deque = deque()
+        while True:
+            first = pending.popleft() if pending else self._queue.get()
+            if isinstance(first, _Connection):
+                first.slots.close()
+                continue
+
+            batch: List[_Request] = [first]
+            total = first.count
+            closed: List[_Connection] = []
+            # La ventana corre desde que llegó el primero: si esperó a otro batch no espera más
+            deadline = first.arrived + self.max_wait
+            while total < self.max_batch_size:
+                if pending:
+                    item = pending.popleft()
+                else:
+                    try:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.perf_counter()))
+                    except queue.Empty:
+                        break
+                if isinstance(item, _Connection):
+                    closed.append(item)
+                    continue
+                if total + item.count > self.max_batch_size:
+                    pending.appendleft(item)  # Va primero en el próximo batch
+                    break
+                batch.append(item)
+                total += item.count
+
+            self._run_batch(batch, total)
+            # Si quedó un pedido suyo para el próximo batch, se cierra después de ese
+            pending.extend(closed)
+
+    def _run_batch(self, batch: List[_Request], total: int):
+        started = time.perf_counter()
+        if len(batch) == 1:
+            # Un solo pedido: se infiere directo desde su slot
+            request = batch[0]
+            inputs = request.connection.slots.inputs(request.slot)[:request.count]
+        else:
+            inputs = self._gather(batch, total)
+
+        error = None
+        try:
+            probabilities = self.classifier.infer(inputs)
+        except Exception as e:
+            logger.error(f"Error infiriendo en el daemon: {e}", exc_info=True)
+            error = str(e)
+            self._errors += 1
+
+        offset = 0
+        for request in batch:
+            if error is None:
+                outputs = request.connection.slots.outputs(request.slot)
+                outputs[:request.count] = probabilities[offset:offset + request.count]
+            offset += request.count
+            request.connection.reply((request.seq, error, None))
+
+        self._batches += 1
+        self._items += total
+        self._requests += len(batch)
+        self._histogram[total] += 1
+        if len({id(request.connection) for request in batch}) > 1:
+            self._multi_worker_batches += 1
+        self._queue_wait += sum(started - request.arrived for request in batch)
+        self._infer_time += time.perf_counter() - started
+
+    def _gather(self, batch: List[_Request], total: int) -> np.ndarray:
+        """Copia los slots de varios pedidos a un buffer contiguo (se reusa entre batches)"""
+        sample_shape = batch[0].connection.slots.sample_shape
+        if self._buffer.shape[1:] != sample_shape or len(self._buffer) < total:
+            self._buffer = np.empty((max(total, self.max_batch_size), *sample_shape), np.float32)
+        offset = 0
+        for request in batch:
+            inputs = request.connection.slots.inputs(request.slot)
+            np.copyto(self._buffer[offset:offset + request.count], inputs[:request.count])
+            offset += request.count
+        return self._buffer[:total]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connections_lock:
+            workers = [connection.pid for connection in self._connections.values()]
+        return {
+            "pid": os.getpid(),
+            "memory": get_memory_breakdown(),
+            "model_id": self.classifier.model_id,
+            "workers": workers,
+            "max_batch_size": self.max_batch_size,
+            "batch_wait_ms": self.max_wait * 1000,
+            "batches": self._batches,
+            "requests": self._requests,
+            "items": self._items,
+            "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+            "multi_worker_batches": self._multi_worker_batches,
+            "avg_queue_wait_ms": round(self._queue_wait / self._requests * 1000, 3) if self._requests else 0.0,
+            "avg_batch_time_ms": round(self._infer_time / self._batches * 1000, 3) if self._batches else 0.0,
+            "batch_size_histogram": {str(size): count for size, count in sorted(self._histogram.items())},
+            "errors": self._errors,
+        }
+
+
+class DaemonClassifier(SlotClassifier):
+    """
+    Cliente del daemon en cada worker de la API
+
+    Se conecta en el primer uso (el daemon puede estar todavía cargando el
+    modelo) y se vuelve a conectar si el daemon se reinicia; las requests
+    en espera cuando se corta la conexión fallan.
+    """
+
+    layout = "daemon"
+
+    def __init__(self, socket_path: str, num_slots: int, capacity: int, timeout: float = 30.0):
+        super().__init__(timeout)
+        self.socket_path = socket_path
+        self.num_slots = num_slots
+        self.capacity = capacity
+        self.daemon_pid: Optional[int] = None
+        self._conn = None
+        self._send_lock = threading.Lock()
+        self._free_slots: "queue.Queue" = queue.Queue()
+
+    @classmethod
+    def from_settings(cls) -> "DaemonClassifier":
+        return cls(
+            settings.INFERENCE_SOCKET,
+            # Cada thread del executor usa un slot a la vez, +1 para el warm-up/batch
+            num_slots=settings.SHM_SLOTS or settings.EXECUTOR_POOL_SIZE + 1,
+            capacity=max(settings.MAX_BATCH_SIZE, settings.MAX_BATCH_FILES),
+            timeout=settings.INFERENCE_TIMEOUT,
+        )
+
+    def _connect(self):
+        conn = _dial(self.socket_path, self.timeout)
+        hello = conn.recv()
+        sample_shape = tuple(hello["preprocessor"].sample_shape)
+
+        if self._slots is None:
+            self._slots = SharedTensorSlots(self.num_slots, self.capacity, sample_shape, hello["num_classes"])
+            for slot in range(self.num_slots):
+                self._free_slots.put(slot)
+        elif (self._slots.sample_shape, self._slots.num_classes) != (sample_shape, hello["num_classes"]):
+            conn.close()
+            raise RuntimeError("El daemon cambió a un modelo con otra entrada/salida: reiniciar la API")
+        else:
+            # Las respuestas tardías de la conexión anterior ya no llegan
+            self._reclaim_lost_slots()
+
+        self.preprocessor = hello["preprocessor"]
+        self._local = threading.local()  # Las copias por thread son del preprocesador anterior
+        self.framework = hello["framework"]
+        self.num_classes = hello["num_classes"]
+        self.model_id = hello["model_id"]
+        # El modelo está en el daemon; model_id alcanza para /health
+        self.model = self.model_id
+        self.daemon_pid = hello["pid"]
+
+        conn.send({"slots": self._slots.spec(), "pid": os.getpid()})
+        self._conn = conn
+        threading.Thread(target=self._read, args=(conn,), name="daemon-reader", daemon=True).start()
+        logger.info(f"Conectado al daemon de inferencia (pid {self.daemon_pid}, {self.framework})")
+
+    def _acquire_slot(self) -> Optional[int]:
+        try:
+            return self._free_slots.get(timeout=self.timeout)
+        except queue.Empty:
+            return None
+
+    def _release_slot(self, slot: int):
+        self._free_slots.put(slot)
+
+    def _send(self, slot: int, count: int, seq: int):
+        self._request(("infer", seq, slot, count))
+
+    def _request(self, message):
+        try:
+            with self._send_lock:
+                self._conn.send(message)
+        except (OSError, EOFError, AttributeError) as e:
+            self._disconnected(f"sin conexión con el daemon: {e}")
+
+    def _read(self, conn):
+        """Respuestas del daemon (thread propio)"""
+        try:
+            while True:
+                seq, error, payload = conn.recv()
+                self._resolve(seq, error if payload is None else payload)
+        except (EOFError, OSError):
+            pass
+        if conn is self._conn:
+            self._disconnected("el daemon cerró la conexión")
+
+    def _disconnected(self, error: str):
+        with self._connect_lock:
+            if self._connected:
+                logger.error(f"Daemon de inferencia: {error}")
+            self._connected = False
+            self._conn = None
+        self._fail_pending(error)
+
+    def close(self):
+        """Corta la conexión y borra los slots (al apagar el worker)"""
+        with self._connect_lock:
+            conn, self._conn = self._conn, None
+            self._connected = False
+        if conn is not None:
+            conn.close()
+        if self._slots is not None:
+            try:
+                self._slots.close()
+            except BufferError:
+                pass  # Queda una vista viva: el mapeo se libera al salir el proceso
+            self._slots.unlink()
+            self._slots = None
+
+    def daemon_stats(self) -> Dict[str, Any]:
+        """Stats del daemon (batches entre workers); {} si no responde"""
+        if not self._connected:
+            return {}
+        seq = self._next_seq()
+        future = self._register(seq)
+        self._request(("stats", seq))
+        try:
+            result = future.result(timeout=2)
+        except Exception:
+            with self._pending_lock:
+                self._pending.pop(seq, None)
+            return {}
+        return result if isinstance(result, dict) else {}
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "socket": self.socket_path, "daemon": self.daemon_stats()}
+
+
+def _dial(socket_path: str, timeout: float):
+    """Conexión al daemon, reintentando mientras arranca"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return Client(socket_path, family="AF_UNIX")
+        except (FileNotFoundError, ConnectionRefusedError):
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"No hay un daemon de inferencia escuchando en {socket_path}")
+            time.sleep(0.2)
+
+
+def socket_in_use(socket_path: str) -> bool:
+    """True si hay un daemon aceptando conexiones en el socket"""
+    with socket.socket(socket.AF_UNIX) as sock:
+        try:
+            sock.connect(socket_path)
+            return True
+        except (FileNotFoundError, ConnectionRefusedError):
+            return False
+
+
+def _remove_stale_socket(socket_path: str):
+    """Borra el archivo de un daemon anterior que murió sin limpiarlo"""
+    if not os.path.exists(socket_path):
+        return
+    if socket_in_use(socket_path):
+        raise RuntimeError(f"Ya hay un daemon de inferencia escuchando en {socket_path}")
+    os.unlink(socket_path)
+
+
+def start_daemon(socket_path: str, timeout: float = 300) -> Optional[subprocess.Popen]:
+    """
+    Arranca el daemon como subproceso y espera a que escuche
+
+    Returns:
+        el proceso, o None si ya había un daemon escuchando (ej: otro servicio)
+    """
+    if socket_in_use(socket_path):
+        logger.info(f"Usando el daemon de inferencia que ya escucha en {socket_path}")
+        return None
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.serving.daemon", "--socket", socket_path],
+        # Ctrl+C en la terminal: el daemon lo apaga quien lo arrancó, después de los workers
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + timeout
+    while not socket_in_use(socket_path):
+        if process.poll() is not None:
+            raise RuntimeError(f"El daemon de inferencia terminó con código {process.returncode}")
+        if time.monotonic() > deadline:
+            process.kill()
+            raise TimeoutError("El daemon de inferencia no empezó a escuchar")
+        time.sleep(0.2)
+    return process
+
+
+def main():
+    from app.core.autotune import configure_threads
+    from app.core.warmup import warm_up, warmup_batch_sizes
+    from app.models.mobilenet_classifier import MobileNetClassifier
+
+    parser = argparse.ArgumentParser(description="Daemon de inferencia compartido por los workers de la API")
+    parser.add_argument("--socket", default=settings.INFERENCE_SOCKET)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=settings.LOG_LEVEL,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+    # Un solo proceso ejecuta el modelo: todos los cores para él
+    configure_threads(workers=1)
+    classifier = MobileNetClassifier()
+    classifier.load_model(settings.MODEL_PATH)
+
+    if settings.WARMUP_ENABLED:
+        # Los batches del daemon son sumas de los de cada worker: hasta DAEMON_MAX_BATCH_SIZE
+        batch_sizes = warmup_batch_sizes(
+            settings.MAX_BATCH_SIZE,
+            max(settings.DAEMON_MAX_BATCH_SIZE, settings.MAX_BATCH_FILES),
+            settings.WARMUP_BATCH_SIZES
+        )
+        timings = warm_up(classifier, batch_sizes, settings.WARMUP_ITERATIONS)
+        logger.info(f"Daemon precalentado: {timings}")
+
+    daemon = InferenceDaemon(
+        classifier, args.socket, settings.DAEMON_MAX_BATCH_SIZE, settings.DAEMON_BATCH_WAIT_MS
+    )
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda signum, frame: daemon.stop())
+    daemon.serve_forever()
+    logger.info("Daemon de inferencia apagado")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+Layout prefork: modelo cargado una vez, workers de inferencia con fork
+
+    padre ── carga el modelo (build_backend) y reserva los slots de shm
+      ├── workers de inferencia (fork después de cargar: pesos compartidos
+      │   copy-on-write, sin volver a importar ni cargar nada)
+      └── front-ends HTTP (fork, uvicorn sobre el socket del padre): decode
+          + preprocesamiento, escriben el batch en un slot y esperan la salida
+
+Con `run.py --workers N` cada worker de uvicorn importa el framework y carga
+su copia del modelo; acá hay una sola carga y cada worker de inferencia solo
+suma su memoria privada (buffers, allocator). Solo motores con
+`fork_safe = True` (PyTorch en CPU, NumPy): ONNX Runtime, TFLite y Keras
+arrancan threads al cargar y no sobreviven un fork.
+
+Por las colas viaja (slot, n, front-end, seq); los tensores van por
+SharedTensorSlots. Un worker de inferencia que muere se reemplaza y el
+batch que tenía vuelve como error a su front-end (si ese request ya había
+dado timeout, el error devuelve el slot a la lista de libres).
+"""
+import gc
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.models.base_model import BaseClassifier
+from app.serving.client import SlotClassifier
+from app.serving.shm import SharedTensorSlots
+from app.utils.memory import get_memory_breakdown, release_memory
+
+logger = logging.getLogger(__name__)
+
+
+class PreforkClassifier(SlotClassifier):
+    """
+    Clasificador de un front-end prefork: los slots y las colas se crean en
+    el padre antes del fork; las respuestas llegan por la cola de este
+    front-end y las reparte un thread propio
+    """
+
+    layout = "prefork"
+
+    def __init__(
+        self,
+        index: int,
+        backend: BaseClassifier,
+        model_id: str,
+        slots: SharedTensorSlots,
+        free_slots,
+        requests,
+        responses,
+        worker_pids,
+        worker_restarts,
+        timeout: float = 30.0
+    ):
+        super().__init__(timeout)
+        self.index = index
+        self.framework = backend.framework
+        self.num_classes = backend.num_classes
+        self.model_id = model_id
+        # El modelo está en los workers de inferencia; model_id alcanza para /health
+        self.model = model_id
+        self.preprocessor = backend.preprocessor
+
+        self._slots = slots
+        self._free_slots = free_slots
+        self._requests = requests
+        self._responses = responses
+        self._worker_pids = worker_pids
+        self._worker_restarts = worker_restarts
+        # Se fija si el thread de dispatch terminó: los requests nuevos fallan en el acto
+        self._closed: Optional[str] = None
+
+    def _connect(self):
+        threading.Thread(
+            target=self._dispatch, name=f"prefork-dispatch-{self.index}", daemon=True
+        ).start()
+
+    def _acquire_slot(self) -> Optional[int]:
+        try:
+            return self._free_slots.get(timeout=self.timeout)
+        except queue.Empty:
+            return None
+
+    def _release_slot(self, slot: int):
+        self._free_slots.put(slot)
+
+    def _send(self, slot: int, count: int, seq: int):
+        if self._closed is not None:
+            self._resolve(seq, self._closed)
+            return
+        self._requests.put((slot, count, self.index, seq))
+
+    def _dispatch(self):
+        """Reparte las respuestas de los workers a cada request (thread del front-end)"""
+        try:
+            while True:
+                self._resolve(*self._responses.get())
+        except (EOFError, OSError):
+            # Cola cerrada (apagado o murió el proceso padre): nadie más va a responder
+            self._closed = "se cerró la cola de respuestas de los workers de inferencia"
+            self._fail_pending(self._closed)
+
+    def stats(self) -> Dict[str, Any]:
+        workers = []
+        for pid in self._worker_pids:
+            if pid > 0:
+                workers.append({"pid": pid, **get_memory_breakdown(pid)})
+        return {
+            **super().stats(),
+            "frontend": self.index,
+            "parent_memory": {"pid": os.getppid(), **get_memory_breakdown(os.getppid())},
+            "inference_workers": workers,
+            "worker_restarts": self._worker_restarts.value,
+        }
+
+
+def _set_worker_threads(threads: int):
+    """Threads de inferencia del worker (el padre carga con 1, ver serve)"""
+    settings.INFERENCE_THREADS = threads
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(threads)
+
+
+def _exit_with_parent():
+    """SIGTERM a este proceso si el padre muere sin apagarlo (ej: SIGKILL u OOM)"""
+    parent = os.getppid()
+
+    def watch():
+        while os.getppid() == parent:
+            time.sleep(1)
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    threading.Thread(target=watch, name="parent-watch", daemon=True).start()
+
+
+def _inference_worker(index, backend, slots, requests, response_queues, busy, threads, batch_sizes):
+    """Loop de un worker de inferencia: slot -> backend.infer -> slot"""
+    # Ctrl+C llega a todo el grupo: el padre coordina el apagado
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    _exit_with_parent()
+    _set_worker_threads(threads)
+
+    if batch_sizes:
+        from app.core.warmup import warm_up
+        timings = warm_up(backend, batch_sizes, settings.WARMUP_ITERATIONS)
+        logger.info(f"Worker de inferencia {index} (pid {os.getpid()}) listo: {timings}")
+
+    while True:
+        message = requests.get()
+        if message is None:
+            break
+        slot, count, frontend, seq = message
+        busy[3 * index:3 * index + 3] = [slot, frontend, seq]
+        error = None
+        try:
+            slots.outputs(slot)[:count] = backend.infer(slots.inputs(slot)[:count])
+        except Exception as e:
+            logger.error(f"Error infiriendo en el worker {index}: {e}", exc_info=True)
+            error = str(e)
+        response_queues[frontend].put((seq, error))
+        busy[3 * index] = -1
+
+
+def _frontend(client: PreforkClassifier, sock: socket.socket, frontends: int, threads: int, log_level: str):
+    """Proceso front-end: uvicorn sobre el socket compartido con el cliente instalado"""
+    import uvicorn
+
+    from app.serving import install_classifier
+
+    # configure_threads (app/api/routes.py) fija OpenCV con estos valores, no
+    # con los de inferencia que dejó el padre
+    settings.WORKERS = frontends
+    settings.INFERENCE_THREADS = threads
+    # Los workers de inferencia ya se precalentaron con todos los tamaños:
+    # el warm-up del front-end solo recorre el camino completo una vez
+    settings.WARMUP_BATCH_SIZES = str(client._slots.capacity)
+    settings.WARMUP_ITERATIONS = 1
+    install_classifier(client)
+    _exit_with_parent()
+    config = uvicorn.Config("app.main:app", log_level=log_level)
+    try:
+        uvicorn.Server(config).run(sockets=[sock])
+    except KeyboardInterrupt:
+        pass  # uvicorn vuelve a levantar el SIGINT después del apagado ordenado
+
+
+def serve(
+    host: str,
+    port: int,
+    frontends: int,
+    inference_workers: int,
+    log_level: str = "info"
+):
+    """
+    Arranca el layout prefork y supervisa los procesos hasta SIGINT/SIGTERM
+
+    Args:
+        frontends: procesos HTTP (uvicorn) que decodifican y preprocesan
+        inference_workers: procesos que ejecutan el modelo
+    """
+    from app.core.autotune import configure_threads
+    from app.core.warmup import warmup_batch_sizes
+    from app.models.mobilenet_classifier import MobileNetClassifier
+
+    stopping = threading.Event()
+    signal.signal(signal.SIGINT, lambda signum, frame: stopping.set())
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+
+    # Puerto ocupado: fallar antes de cargar el modelo
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+
+    # Front-ends: solo decode/resize con OpenCV, los cores repartidos entre ellos
+    frontend_threads = settings.INFERENCE_THREADS or max(1, (os.cpu_count() or 1) // frontends)
+    thread_config = configure_threads(workers=inference_workers)
+    # El padre no ejecuta inferencia, pero torchscript/int8 corren el modelo al
+    # cargar: con 1 thread no se crea el pool de OpenMP, que no sobrevive el fork
+    settings.INFERENCE_THREADS = 1
+    backend, model_id = MobileNetClassifier.build_backend(settings.MODEL_PATH)
+    if not backend.fork_safe:
+        raise ValueError(
+            f"El motor {backend.framework} no se puede usar con SERVING_LAYOUT=prefork "
+            f"(no es fork-safe); usar SERVING_LAYOUT=workers"
+        )
+
+    batch_sizes = warmup_batch_sizes(
+        settings.MAX_BATCH_SIZE, settings.MAX_BATCH_FILES, settings.WARMUP_BATCH_SIZES
+    )
+    capacity = max(batch_sizes)
+    num_slots = settings.SHM_SLOTS or 2 * inference_workers + frontends
+    slots = SharedTensorSlots(
+        num_slots, capacity, backend.preprocessor.sample_shape, backend.num_classes
+    )
+    logger.info(
+        f"Prefork: {frontends} front-ends, {inference_workers} workers de inferencia, "
+        f"{num_slots} slots x {capacity} ({slots.nbytes / 1024 / 1024:.1f} MB de shm)"
+    )
+
+    context = multiprocessing.get_context("fork")
+    free_slots = context.Queue()
+    for slot in range(num_slots):
+        free_slots.put(slot)
+    requests = context.Queue()
+    response_queues = [context.Queue() for _ in range(frontends)]
+    worker_pids = context.Array("i", inference_workers, lock=False)
+    # Por worker: (slot, front-end, seq) en curso, slot -1 = libre
+    busy = context.Array("i", [-1] * 3 * inference_workers, lock=False)
+    worker_restarts = context.Value("i", 0, lock=False)
+
+    def start_worker(index: int) -> multiprocessing.Process:
+        busy[3 * index] = -1
+        process = context.Process(
+            target=_inference_worker,
+            args=(
+                index, backend, slots, requests, response_queues, busy,
+                thread_config["intra_op_threads"],
+                batch_sizes if settings.WARMUP_ENABLED else [],
+            ),
+            name=f"inference-{index}",
+            daemon=True,
+        )
+        process.start()
+        worker_pids[index] = process.pid
+        return process
+
+    # Heap libre devuelto al sistema (si no, el malloc de los hijos lo reusa y
+    # cada página se copia) y objetos del padre en la generación permanente (el
+    # gc de los hijos no escribe en sus headers): las páginas siguen compartidas
+    release_memory()
+    gc.freeze()
+
+    workers = []
+    web = []
+    crashed = False
+    try:
+        workers = [start_worker(index) for index in range(inference_workers)]
+        for index in range(frontends):
+            client = PreforkClassifier(
+                index, backend, model_id, slots, free_slots, requests, response_queues[index],
+                worker_pids, worker_restarts, timeout=settings.INFERENCE_TIMEOUT
+            )
+            process = context.Process(
+                target=_frontend,
+                args=(client, sock, frontends, frontend_threads, log_level),
+                name=f"frontend-{index}",
+            )
+            process.start()
+            web.append(process)
+
+        while not stopping.wait(0.5):
+            for index, process in enumerate(workers):
+                if process.is_alive():
+                    continue
+                slot, frontend, seq = busy[3 * index:3 * index + 3]
+                logger.error(
+                    f"Worker de inferencia {index} terminó (exit {process.exitcode}), se reemplaza"
+                )
+                if slot >= 0:
+                    response_queues[frontend].put((seq, f"worker terminó (exit {process.exitcode})"))
+                worker_restarts.value += 1
+                workers[index] = start_worker(index)
+
+            if any(not process.is_alive() for process in web):
+                # Un front-end caído puede haberse llevado slots: reiniciar todo
+                logger.error("Un front-end terminó, apagando el servidor")
+                crashed = True
+                break
+    finally:
+        logger.info("Apagando layout prefork")
+        for process in web:
+            if process.is_alive():
+                process.terminate()  # SIGTERM: uvicorn termina las requests en curso
+        for process in web:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.kill()
+        for _ in workers:
+            requests.put(None)
+        for process in workers:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        sock.close()
+        slots.close()
+        slots.unlink()
+    if crashed:
+        sys.exit(1)
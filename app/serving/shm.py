@@ -0,0 +1,103 @@
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+
+class SharedTensorSlots:
+    """
+    Slots de batches float32 en un solo bloque de memoria compartida
+
+    Cada slot tiene lugar para `capacity` muestras de entrada
+    (`sample_shape`, lo que arma el preprocesador del motor) y sus
+    `num_classes` probabilidades de salida. Quien prepara el batch escribe
+    en `inputs(slot)`, quien infiere lee de ahí y escribe en
+    `outputs(slot)`: por la cola solo viaja el número de slot, los
+    tensores nunca se serializan.
+
+    Los procesos creados con fork heredan el mapeo; los demás se conectan
+    con `SharedTensorSlots.attach(spec)`. Qué slot está libre lo decide
+    quien los reparte (ej: una cola de slots libres).
+    """
+
+    def __init__(
+        self,
+        num_slots: int,
+        capacity: int,
+        sample_shape: Tuple[int, ...],
+        num_classes: int,
+        name: Optional[str] = None,
+        create: bool = True,
+        untrack: bool = True
+    ):
+        self.num_slots = num_slots
+        self.capacity = capacity
+        self.sample_shape = tuple(sample_shape)
+        self.num_classes = num_classes
+
+        input_shape = (num_slots, capacity, *self.sample_shape)
+        output_shape = (num_slots, capacity, num_classes)
+        input_bytes = int(np.prod(input_shape)) * 4
+        output_bytes = int(np.prod(output_shape)) * 4
+
+        if create:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=input_bytes + output_bytes)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            if untrack:
+                # Antes de 3.13 el resource tracker borra el bloque cuando termina
+                # cualquier proceso que se conectó: solo lo borra quien lo creó
+                resource_tracker.unregister(self._shm._name, "shared_memory")
+        self.owner = create
+
+        self._inputs = np.ndarray(input_shape, dtype=np.float32, buffer=self._shm.buf)
+        self._outputs = np.ndarray(
+            output_shape, dtype=np.float32, buffer=self._shm.buf, offset=input_bytes
+        )
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def nbytes(self) -> int:
+        return self._shm.size
+
+    def inputs(self, slot: int) -> np.ndarray:
+        """(capacity, *sample_shape) float32 del slot"""
+        return self._inputs[slot]
+
+    def outputs(self, slot: int) -> np.ndarray:
+        """(capacity, num_classes) float32 del slot"""
+        return self._outputs[slot]
+
+    def spec(self) -> Dict[str, Any]:
+        """Lo que necesita otro proceso para conectarse (picklable)"""
+        return {
+            "name": self.name,
+            "num_slots": self.num_slots,
+            "capacity": self.capacity,
+            "sample_shape": self.sample_shape,
+            "num_classes": self.num_classes,
+        }
+
+    @classmethod
+    def attach(cls, spec: Dict[str, Any], untrack: bool = True) -> "SharedTensorSlots":
+        """
+        Conecta otro proceso al bloque
+
+        Con `untrack=False` para procesos creados con spawn por el dueño:
+        comparten su resource tracker y desregistrar el bloque le quitaría
+        al dueño la limpieza si muere.
+        """
+        return cls(create=False, untrack=untrack, **spec)
+
+    def close(self):
+        # Las vistas numpy tienen que soltarse antes de cerrar el mapeo
+        self._inputs = self._outputs = None
+        self._shm.close()
+
+    def unlink(self):
+        """Borra el bloque (solo el proceso que lo creó, al apagar)"""
+        if self.owner:
+            self._shm.unlink()
@@ -1,5 +1,6 @@
 import logging
 import sys
+import threading
 from pathlib import Path
 from logging.handlers import RotatingFileHandler, TimedRotatingFileHandler
 from datetime import datetime
@@ -207,6 +208,8 @@ class PredictionLogger:
         log_dir.mkdir(exist_ok=True)
         
         self.predictions_log = log_dir / "predictions.jsonl"
+        # Las predicciones se escriben desde threads del executor
+        self._lock = threading.Lock()
         
     def log_prediction(
         self,
@@ -241,8 +244,10 @@ class PredictionLogger:
             }
         }
         
-        with open(self.predictions_log, 'a', encoding='utf-8') as f:
-            f.write(json.dumps(log_entry) + '\n')
+        line = json.dumps(log_entry) + '\n'
+        with self._lock:
+            with open(self.predictions_log, 'a', encoding='utf-8') as f:
+                f.write(line)
 
 
 # ================== INSTANCIA GLOBAL ==================
@@ -0,0 +1,116 @@
+import ctypes
+import gc
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+
+def get_rss_mb() -> float:
+    """
+    Memoria residente (RSS) actual del proceso en MB
+
+    Linux: /proc/self/status (valor actual). En otros sistemas se usa el pico
+    de resource.getrusage como aproximación.
+    """
+    status = Path("/proc/self/status")
+    if status.exists():
+        for line in status.read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024  # kB -> MB
+    return get_peak_rss_mb()
+
+
+def get_peak_rss_mb() -> float:
+    """Pico de RSS del proceso en MB"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta kB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def get_memory_breakdown(pid: Optional[int] = None) -> Dict[str, float]:
+    """
+    RSS / PSS / USS del proceso en MB (Linux: /proc/<pid>/smaps_rollup)
+
+    Con varios workers el RSS cuenta varias veces las páginas compartidas
+    (pesos mapeados desde el page cache, copy-on-write del fork):
+    - pss: cada página compartida dividida entre los procesos que la usan
+      (sumar el PSS de todos los workers da la memoria física real)
+    - uss: solo páginas privadas (lo que se libera al matar el worker)
+    En otros sistemas solo se reporta rss (y nada para otros procesos).
+
+    Args:
+        pid: otro proceso del mismo usuario (ej: un worker); None = este
+    """
+    rollup = Path(f"/proc/{pid or 'self'}/smaps_rollup")
+    try:
+        lines = rollup.read_text().splitlines()
+    except OSError:  # Sin /proc o el proceso ya terminó
+        return {"rss_mb": round(get_rss_mb(), 1)} if pid is None else {}
+
+    fields = {}
+    for line in lines[1:]:
+        parts = line.split()
+        if len(parts) >= 2 and parts[1].isdigit():
+            fields[parts[0].rstrip(":")] = int(parts[1]) / 1024  # kB -> MB
+    return {
+        "rss_mb": round(fields.get("Rss", 0.0), 1),
+        "pss_mb": round(fields.get("Pss", 0.0), 1),
+        "uss_mb": round(fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0), 1),
+        "shared_mb": round(fields.get("Shared_Clean", 0.0) + fields.get("Shared_Dirty", 0.0), 1),
+    }
+
+
+def release_memory():
+    """
+    Devuelve al sistema la memoria de objetos ya liberados (ej: pesos de un
+    modelo reemplazado): gc + cache CUDA de torch + malloc_trim de glibc
+    """
+    gc.collect()
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    if sys.platform.startswith("linux"):
+        try:
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+        except (OSError, AttributeError):  # musl u otra libc
+            pass
+
+
+class PeakRSSSampler:
+    """
+    Pico de RSS durante un bloque, muestreado en un thread
+
+    ru_maxrss es el pico de toda la vida del proceso; esto mide solo el bloque:
+
+        with PeakRSSSampler() as sampler:
+            ...
+        sampler.peak_mb
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.start_mb = 0.0
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, get_rss_mb())
+
+    def __enter__(self) -> "PeakRSSSampler":
+        self.start_mb = self.peak_mb = get_rss_mb()
+        self._thread = threading.Thread(target=self._sample, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, get_rss_mb())
@@ -0,0 +1,95 @@
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.utils.memory import get_peak_rss_mb, get_rss_mb
+
+
+def process_uptime() -> Optional[float]:
+    """
+    Segundos desde que arrancó el proceso (incluye el intérprete y los
+    imports previos a este módulo). Solo Linux: None en otros sistemas.
+    """
+    try:
+        # El nombre del ejecutable puede tener espacios: los campos van después del ")"
+        fields = Path("/proc/self/stat").read_text().rsplit(")", 1)[1].split()
+        start_ticks = int(fields[19])
+        uptime = float(Path("/proc/uptime").read_text().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupProfiler:
+    """
+    Tiempo y RSS por fase del arranque (imports, threads, carga del modelo, warm-up)
+
+    Las fases se pueden anidar (`import_app` contiene la carga del modelo);
+    `depth` indica el nivel. Medir es barato (perf_counter + /proc), así que
+    siempre está activo; settings.STARTUP_PROFILE solo decide si se loguea
+    la tabla completa.
+    """
+
+    def __init__(self):
+        self.phases: List[Dict[str, Any]] = []
+        self._depth = 0
+        self.ready_after: Optional[float] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        rss_before = get_rss_mb()
+        start = time.perf_counter()
+        entry = {"phase": name, "depth": self._depth}
+        self.phases.append(entry)
+        self._depth += 1
+        try:
+            yield entry
+        finally:
+            self._depth -= 1
+            rss = get_rss_mb()
+            entry.update({
+                "seconds": round(time.perf_counter() - start, 3),
+                "rss_mb": round(rss, 1),
+                "rss_delta_mb": round(rss - rss_before, 1),
+            })
+
+    def record(self, name: str, seconds: float):
+        """Fase medida por otro lado (ej: el warm-up, que corre en segundo plano)"""
+        self.phases.append({
+            "phase": name,
+            "depth": self._depth,
+            "seconds": round(seconds, 3),
+            "rss_mb": round(get_rss_mb(), 1),
+            "rss_delta_mb": None,
+        })
+
+    def mark_ready(self):
+        """Registra el cold start total: del arranque del proceso hasta quedar listo"""
+        self.ready_after = process_uptime()
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "ready_after_s": round(self.ready_after, 3) if self.ready_after is not None else None,
+            "rss_mb": round(get_rss_mb(), 1),
+            "peak_rss_mb": round(get_peak_rss_mb(), 1),
+            "phases": self.phases,
+        }
+
+    def format_table(self) -> str:
+        lines = [f"{'Fase':<32}{'s':>9}{'RSS MB':>10}{'+MB':>9}"]
+        for entry in self.phases:
+            name = "  " * entry["depth"] + entry["phase"]
+            delta = entry.get("rss_delta_mb")
+            lines.append(
+                f"{name:<32}{entry.get('seconds', 0):>9.3f}{entry.get('rss_mb', 0):>10.1f}"
+                f"{'' if delta is None else f'{delta:+.1f}':>9}"
+            )
+        if self.ready_after is not None:
+            lines.append(f"{'listo desde el arranque':<32}{self.ready_after:>9.3f}")
+        return "\n".join(lines)
+
+
+# Un profiler por proceso (cada worker de uvicorn mide su propio arranque)
+startup_profiler = StartupProfiler()
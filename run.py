@@ -1,11 +1,18 @@
 #!/usr/bin/env python3
 """
 Script para ejecutar la aplicación Waste Classifier localmente
-Uso: python run.py [--host HOST] [--port PORT] [--reload] [--workers WORKERS]
+Uso: python run.py [--host HOST] [--port PORT] [--reload] [--workers WORKERS] [--autotune]
+                  [--layout workers|prefork|daemon] [--inference-workers N]
 
-Si no especificas --host o --port, se usan los valores de .env o defaults
+Si no especificas --host o --port, se usan los valores de .env o defaults.
+Sin --workers se usa el tuning guardado (ver scripts/autotune.py) o WORKERS.
+Con --layout prefork, WORKERS son los front-ends HTTP y el modelo se carga una
+sola vez para INFERENCE_WORKERS procesos de inferencia (ver app/serving).
+Con --layout daemon los workers le piden la inferencia a un daemon aparte
+(se arranca solo si no hay uno escuchando en INFERENCE_SOCKET).
 """
 
+import os
 import uvicorn
 import argparse
 import logging
@@ -39,8 +46,25 @@ def main():
     parser.add_argument(
         "--workers",
         type=int,
-        default=1,
-        help="Número de workers (default: 1 para desarrollo)"
+        default=None,  # None = tuning guardado o WORKERS de .env
+        help=f"Número de workers (default: tuning guardado o {settings.WORKERS} desde .env)"
+    )
+    parser.add_argument(
+        "--autotune",
+        action="store_true",
+        help="Medir workers/threads/batch antes de arrancar y guardar el resultado"
+    )
+    parser.add_argument(
+        "--layout",
+        choices=("workers", "prefork", "daemon"),
+        default=None,
+        help=f"Layout de serving (default: {settings.SERVING_LAYOUT} desde .env)"
+    )
+    parser.add_argument(
+        "--inference-workers",
+        type=int,
+        default=None,
+        help=f"Procesos de inferencia con --layout prefork (default: {settings.INFERENCE_WORKERS})"
     )
     
     args = parser.parse_args()
@@ -49,7 +73,20 @@ def main():
     host = args.host if args.host is not None else settings.HOST
     port = args.port if args.port is not None else settings.PORT
     reload = args.reload
-    workers = args.workers
+    layout = args.layout or settings.SERVING_LAYOUT
+    if layout not in ("workers", "prefork", "daemon"):
+        parser.error(f"SERVING_LAYOUT no soportado: {layout}")
+    if layout == "prefork" and reload:
+        parser.error("--reload no se puede usar con el layout prefork")
+    
+    # Auto-tuning: con --autotune siempre, con AUTOTUNE_ON_STARTUP solo si no hay uno válido
+    from app.core.autotune import load_tuning, run_autotune, save_tuning, select_workers
+    if args.autotune or (settings.AUTOTUNE_ON_STARTUP and load_tuning() is None):
+        path = save_tuning(run_autotune())
+        logger.info(f"Tuning guardado en {path}")
+    
+    # Cada worker reparte los cores según cuántos workers hay (configure_threads)
+    workers = select_workers(args.workers)
     
     logger.info("=" * 60)
     logger.info("Iniciando Waste Classifier API")
@@ -58,20 +95,44 @@ def main():
     logger.info(f"Port: {port}")
     logger.info(f"Reload: {reload}")
     logger.info(f"Workers: {workers}")
+    logger.info(f"Layout: {layout}")
     logger.info("=" * 60)
     logger.info(f"Accede a: http://{host}:{port}")
     logger.info(f"Docs: http://{host}:{port}/docs")
     logger.info("=" * 60)
     
+    if layout == "prefork":
+        from app.serving.prefork import serve
+        serve(
+            host, port,
+            frontends=workers,
+            inference_workers=args.inference_workers or settings.INFERENCE_WORKERS,
+            log_level="info"
+        )
+        return
+    
+    daemon = None
+    if layout == "daemon":
+        from app.serving.daemon import start_daemon
+        daemon = start_daemon(settings.INFERENCE_SOCKET)
+        # Los workers (y este proceso con --workers 1) crean un DaemonClassifier
+        os.environ["SERVING_LAYOUT"] = layout
+        settings.SERVING_LAYOUT = layout
+    
     # Ejecutar servidor
-    uvicorn.run(
-        "app.main:app",
-        host=host,
-        port=port,
-        reload=reload,
-        workers=workers,
-        log_level="info"
-    )
+    try:
+        uvicorn.run(
+            "app.main:app",
+            host=host,
+            port=port,
+            reload=reload,
+            workers=workers,
+            log_level="info"
+        )
+    finally:
+        if daemon is not None:
+            daemon.terminate()
+            daemon.wait(timeout=30)
 
 
 if __name__ == "__main__":
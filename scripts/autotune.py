@@ -0,0 +1,55 @@
+# scripts/autotune.py
+"""
+Auto-tuning de workers / threads por worker / batch para el modelo de .env
+
+Mide cada combinación con entradas sintéticas (cada worker en su propio
+proceso, todos en paralelo), imprime la tabla y guarda la mejor en
+AUTOTUNE_FILE. Los workers de la API la aplican al arrancar
+(configure_threads) y run.py la usa como --workers por defecto.
+
+Uso:
+    python scripts/autotune.py
+    python scripts/autotune.py --duration 5 --p99-budget-ms 150 --batch-sizes 1 8 16
+"""
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings  # noqa: E402
+from app.core.autotune import run_autotune, save_tuning  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auto-tuning de threads/workers/batch")
+    parser.add_argument("--duration", type=float, default=settings.AUTOTUNE_DURATION,
+                        help="Segundos de medición por combinación")
+    parser.add_argument("--p99-budget-ms", type=float, default=settings.AUTOTUNE_P99_BUDGET_MS)
+    parser.add_argument("--workers", nargs="+", type=int, default=None,
+                        help="Workers a probar (default: potencias de 2 hasta los cores)")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=None)
+    parser.add_argument("--output", default=settings.AUTOTUNE_FILE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    result = run_autotune(args.duration, args.p99_budget_ms, args.workers, args.batch_sizes)
+
+    best = result["best"]
+    print("=" * 72)
+    print(f"{settings.MODEL_PATH} | p99 máximo {result['p99_budget_ms']}ms")
+    print(f"{'workers':>8}{'threads':>9}{'batch':>7}{'img/s':>11}{'p50 ms':>10}{'p99 ms':>10}")
+    print("-" * 72)
+    for m in result["measurements"]:
+        marker = "  <- mejor" if m is best else ""
+        print(
+            f"{m['workers']:>8}{m['intra_op_threads']:>9}{m['batch_size']:>7}"
+            f"{m['throughput']:>11.1f}{m['p50_ms']:>10.2f}{m['p99_ms']:>10.2f}{marker}"
+        )
+    print("=" * 72)
+    print(f"Guardado en {save_tuning(result, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
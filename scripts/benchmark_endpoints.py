@@ -0,0 +1,93 @@
+# scripts/benchmark_endpoints.py
+"""
+Compara latencia y tamaño de respuesta de /predict vs /predict/esp
+
+Uso (con el servidor corriendo):
+    python scripts/benchmark_endpoints.py --url http://localhost:8000 --requests 200
+    python scripts/benchmark_endpoints.py --image waste.jpg
+"""
+import argparse
+import statistics
+import time
+
+import cv2
+import numpy as np
+import requests
+
+
+def make_test_image() -> bytes:
+    """JPEG 300x300 con ruido aleatorio (igual que create_test_image.py)"""
+    img_array = np.random.randint(0, 255, (300, 300, 3), dtype=np.uint8)
+    ok, encoded = cv2.imencode(".jpg", img_array)
+    return encoded.tobytes()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def bench(session, url, image_bytes, n, warmup):
+    """Hace n requests secuenciales y retorna latencias (ms) y tamaño del body"""
+    latencies = []
+    body_size = 0
+    header_size = 0
+
+    for i in range(warmup + n):
+        start = time.perf_counter()
+        response = session.post(url, files={"file": ("image.jpg", image_bytes, "image/jpeg")})
+        elapsed = (time.perf_counter() - start) * 1000
+        response.raise_for_status()
+
+        if i >= warmup:
+            latencies.append(elapsed)
+            body_size = len(response.content)
+            header_size = sum(len(k) + len(v) + 4 for k, v in response.headers.items())
+
+    return latencies, body_size, header_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /predict vs /predict/esp")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--image", default=None, help="Imagen a enviar (default: ruido)")
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, "rb") as f:
+            image_bytes = f.read()
+    else:
+        image_bytes = make_test_image()
+
+    endpoints = {
+        "/predict": f"{args.url}/predict",
+        "/predict/esp": f"{args.url}/predict/esp",
+        "/predict/esp?raw=true": f"{args.url}/predict/esp?raw=true",
+    }
+
+    print("=" * 78)
+    print(f"{'Endpoint':<24}{'p50 (ms)':>10}{'p95 (ms)':>10}{'mean (ms)':>11}{'body (B)':>10}{'headers (B)':>13}")
+    print("=" * 78)
+
+    with requests.Session() as session:
+        for name, url in endpoints.items():
+            latencies, body_size, header_size = bench(
+                session, url, image_bytes, args.requests, args.warmup
+            )
+            print(
+                f"{name:<24}"
+                f"{percentile(latencies, 50):>10.2f}"
+                f"{percentile(latencies, 95):>10.2f}"
+                f"{statistics.mean(latencies):>11.2f}"
+                f"{body_size:>10}"
+                f"{header_size:>13}"
+            )
+
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    main()
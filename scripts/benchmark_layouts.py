@@ -0,0 +1,239 @@
+# scripts/benchmark_layouts.py
+"""
+Layouts de serving: workers (un modelo por worker de uvicorn), prefork
+(modelo cargado una vez, workers de inferencia con fork) y daemon (un
+proceso de inferencia para todos los workers, por socket Unix)
+
+Arranca run.py en cada layout, espera /ready, manda /predict concurrentes
+con imágenes distintas durante unos segundos (cache y dedup apagados: todo
+pasa por el modelo) y mide con el servidor todavía cargado:
+- throughput agregado y latencia p50/p99
+- RSS / PSS / USS de cada proceso del árbol (ver get_memory_breakdown);
+  la suma de PSS es la memoria física real del servidor completo
+- en daemon, el tamaño medio de los batches del daemon y cuántos juntaron
+  requests de más de un worker
+- con --decode-workers N (pipeline de decode), la utilización de cada etapa
+
+Uso:
+    python scripts/benchmark_layouts.py --workers 4 --inference-workers 2
+    python scripts/benchmark_layouts.py --duration 20 --concurrency 32 --layouts prefork
+    python scripts/benchmark_layouts.py --layouts workers daemon
+    python scripts/benchmark_layouts.py --layouts workers --decode-workers 2
+"""
+import argparse
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import requests
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.utils.memory import get_memory_breakdown  # noqa: E402
+
+ROOT = Path(__file__).parent.parent
+
+
+def make_images(count: int):
+    """JPEGs 480x640 distintos (ruido suavizado, para que no caigan en el cache)"""
+    rng = np.random.default_rng(0)
+    images = []
+    for _ in range(count):
+        noise = rng.integers(0, 256, (480, 640, 3), dtype=np.uint8)
+        ok, encoded = cv2.imencode(".jpg", cv2.GaussianBlur(noise, (9, 9), 0))
+        images.append(encoded.tobytes())
+    return images
+
+
+def process_tree(pid: int):
+    """pid y todos sus descendientes (Linux: /proc/<pid>/task/*/children)"""
+    pids = [pid]
+    for current in pids:
+        for task in Path(f"/proc/{current}/task").glob("*"):
+            try:
+                pids.extend(int(child) for child in (task / "children").read_text().split())
+            except OSError:
+                continue
+    return pids
+
+
+def port_in_use(port: int) -> bool:
+    with socket.socket() as sock:
+        return sock.connect_ex(("127.0.0.1", port)) == 0
+
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 300):
+    """/ready en 200 varias veces seguidas (cada front-end responde el suyo)"""
+    deadline = time.time() + timeout
+    streak = 0
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"El servidor terminó con código {process.returncode}")
+        try:
+            streak = streak + 1 if requests.get(f"{url}/ready", timeout=2).status_code == 200 else 0
+        except requests.RequestException:
+            streak = 0
+        if streak >= 10 and process.poll() is None:
+            return
+        time.sleep(0.2)
+    raise TimeoutError("El servidor no quedó listo")
+
+
+def drive(url: str, images, concurrency: int, duration: float):
+    """`concurrency` clientes mandando /predict/raw sin pausa; retorna latencias (ms) y errores"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(offset: int):
+        session = requests.Session()
+        i = offset
+        while time.perf_counter() < stop_at:
+            body = images[i % len(images)]
+            i += concurrency
+            start = time.perf_counter()
+            try:
+                response = session.post(
+                    f"{url}/predict/raw", data=body,
+                    headers={"Content-Type": "image/jpeg"}, timeout=60
+                )
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0]
+
+
+def run_layout(layout: str, args, images):
+    url = f"http://127.0.0.1:{args.port}"
+    if port_in_use(args.port):
+        raise RuntimeError(f"El puerto {args.port} está ocupado (¿un servidor anterior sigue vivo?)")
+    env = {
+        **os.environ,
+        "RESULT_CACHE_ENABLED": "false",
+        "DEDUP_ENABLED": "false",
+        "LOG_PREDICTIONS": "false",
+        "ENABLE_FILE_LOGGING": "false",
+        "LOG_LEVEL": "WARNING",
+        # Daemon propio de esta corrida (no uno que ya esté escuchando)
+        "INFERENCE_SOCKET": f"/tmp/benchmark-layouts-{args.port}.sock",
+        "DECODE_WORKERS": str(args.decode_workers),
+    }
+    command = [
+        sys.executable, "run.py", "--host", "127.0.0.1", "--port", str(args.port),
+        "--workers", str(args.workers), "--layout", layout,
+        "--inference-workers", str(args.inference_workers),
+    ]
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+    try:
+        started = time.perf_counter()
+        wait_ready(url, server)
+        ready_s = time.perf_counter() - started
+
+        drive(url, images, args.concurrency, min(2.0, args.duration))  # calentar
+        latencies, errors = drive(url, images, args.concurrency, args.duration)
+        stats = requests.get(f"{url}/stats", timeout=10).json()
+        daemon = stats["serving"].get("daemon", {})
+        memory = [
+            {"pid": pid, **get_memory_breakdown(pid)}
+            for pid in process_tree(server.pid)
+        ]
+    finally:
+        tree = process_tree(server.pid)
+        server.terminate()
+        try:
+            server.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        for pid in tree[1:]:  # Workers que hayan quedado huérfanos
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        while port_in_use(args.port):  # Que el próximo layout no le hable a este
+            time.sleep(0.5)
+
+    return {
+        "ready_s": ready_s,
+        "throughput": len(latencies) / args.duration,
+        "p50_ms": statistics.median(latencies) if latencies else 0.0,
+        "p99_ms": float(np.percentile(latencies, 99)) if latencies else 0.0,
+        "errors": errors,
+        "memory": memory,
+        "daemon": daemon,
+        "pipeline": stats["pipeline"],
+        "avg_batch": stats["batching"]["avg_batch_size"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de layouts de serving (workers / prefork / daemon)")
+    parser.add_argument("--layouts", nargs="+", default=["workers", "prefork", "daemon"])
+    parser.add_argument("--workers", type=int, default=2, help="Workers de uvicorn / front-ends prefork")
+    parser.add_argument("--inference-workers", type=int, default=2)
+    parser.add_argument("--decode-workers", type=int, default=0, help="Procesos de decode por worker (0 = sin pipeline)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--images", type=int, default=64)
+    parser.add_argument("--port", type=int, default=8950)
+    args = parser.parse_args()
+
+    images = make_images(args.images)
+    results = {layout: run_layout(layout, args, images) for layout in args.layouts}
+
+    width = 84
+    print("=" * width)
+    print(f"{args.concurrency} clientes x {args.duration:.0f}s | workers={args.workers} "
+          f"inference_workers={args.inference_workers} decode_workers={args.decode_workers}")
+    print(f"{'Layout':<12}{'listo s':>9}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'errores':>9}"
+          f"{'PSS total':>11}{'USS total':>11}")
+    print("-" * width)
+    for layout, result in results.items():
+        total_pss = sum(row.get("pss_mb", 0.0) for row in result["memory"])
+        total_uss = sum(row.get("uss_mb", 0.0) for row in result["memory"])
+        print(
+            f"{layout:<12}{result['ready_s']:>9.1f}{result['throughput']:>9.1f}{result['p50_ms']:>9.1f}"
+            f"{result['p99_ms']:>9.1f}{result['errors']:>9}{total_pss:>11.1f}{total_uss:>11.1f}"
+        )
+    print("=" * width)
+    for layout, result in results.items():
+        daemon = result["daemon"]
+        if daemon:
+            print(f"{layout}: {daemon['batches']} batches en el daemon, {daemon['avg_batch_size']} imágenes "
+                  f"de media, {daemon['multi_worker_batches']} con requests de más de un worker")
+        pipeline = result["pipeline"]
+        if "decode" in pipeline:
+            print(f"{layout}: pipeline (un worker) decode {pipeline['decode']['utilization']:.0%} ocupado "
+                  f"x{len(pipeline['decode']['workers'])}, {pipeline['decode']['avg_decode_ms']} ms/imagen, "
+                  f"cola {pipeline['decode']['avg_queue_ms']} ms | inferencia "
+                  f"{pipeline['inference']['utilization']:.0%} ocupada")
+        print(f"{layout}: batch medio del micro-batcher (un worker) {result['avg_batch']}")
+    for layout, result in results.items():
+        print(f"{layout}: memoria por proceso (MB)")
+        for row in result["memory"]:
+            print(f"  pid {row['pid']:>8}  RSS {row.get('rss_mb', 0):>7.1f}  "
+                  f"PSS {row.get('pss_mb', 0):>7.1f}  USS {row.get('uss_mb', 0):>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
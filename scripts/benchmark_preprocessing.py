@@ -0,0 +1,123 @@
+# scripts/benchmark_preprocessing.py
+"""
+Microbenchmark del preprocesamiento: camino anterior vs FusedPreprocessor
+
+- anterior: imdecode + cvtColor BGR->RGB + PIL + transforms.Compose (creado en
+  cada llamada) + torch.cat
+- fused: imdecode (BGR, JPEG reducido 1/2-1/8 según el header) + resize OpenCV
+  al buffer + swap/normalización en una pasada dentro del batch float32 preasignado
+
+Reporta tiempo por imagen y memoria asignada por imagen (tracemalloc: ve las
+allocations de NumPy/OpenCV/Python; los buffers internos de PIL y torch no se
+cuentan, así que la cifra del camino anterior es un piso).
+
+Uso:
+    python scripts/benchmark_preprocessing.py
+    python scripts/benchmark_preprocessing.py --size 4000x3000 --batch-sizes 1 --iterations 20
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings  # noqa: E402
+from app.core.preprocessing import FusedPreprocessor, decode_image  # noqa: E402
+from app.models.base_model import IMAGENET_MEAN, IMAGENET_STD  # noqa: E402
+
+
+def legacy_preprocess(images, input_shape):
+    """Camino anterior (cvtColor a RGB + PIL + Compose por imagen)"""
+    import torch
+    import torchvision.transforms as transforms
+    from PIL import Image
+
+    tensors = []
+    for image in images:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        transform = transforms.Compose([
+            transforms.Resize(input_shape),
+            transforms.ToTensor(),
+            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+        ])
+        tensors.append(transform(Image.fromarray(image)).unsqueeze(0))
+    return torch.cat(tensors, dim=0)
+
+
+def legacy_decode_and_preprocess(jpegs, input_shape):
+    images = [cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR) for data in jpegs]
+    return legacy_preprocess(images, input_shape)
+
+
+def fused_decode_and_preprocess(jpegs, preprocessor):
+    return preprocessor.batch([decode_image(data, settings.IMG_SIZE) for data in jpegs])
+
+
+def measure(fn, iterations, batch_size):
+    """(µs por imagen, KB asignados por imagen)"""
+    for _ in range(3):
+        fn()
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed / iterations / batch_size * 1e6, peak / batch_size / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de preprocesamiento")
+    parser.add_argument("--size", default="640x480", help="Tamaño de la imagen de entrada (ANCHOxALTO)")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8])
+    parser.add_argument("--iterations", type=int, default=100)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    rng = np.random.default_rng(0)
+    # Imagen suave (no ruido puro) para que el JPEG tenga un tamaño realista
+    base = rng.integers(0, 256, (height // 16, width // 16, 3), dtype=np.uint8)
+    image = cv2.resize(base, (width, height), interpolation=cv2.INTER_CUBIC)
+    jpeg = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+    decoded = decode_image(jpeg)
+    preprocessor = FusedPreprocessor(settings.IMG_SIZE, IMAGENET_MEAN, IMAGENET_STD, "nchw")
+
+    stages = {
+        "solo preprocesamiento (imagen ya decodificada)": (
+            lambda batch: legacy_preprocess([decoded] * batch, settings.IMG_SIZE),
+            lambda batch: preprocessor.batch([decoded] * batch),
+        ),
+        "decode + preprocesamiento (JPEG)": (
+            lambda batch: legacy_decode_and_preprocess([jpeg] * batch, settings.IMG_SIZE),
+            lambda batch: fused_decode_and_preprocess([jpeg] * batch, preprocessor),
+        ),
+    }
+
+    print("=" * 66)
+    print(f"{width}x{height} JPEG ({len(jpeg) / 1024:.0f} KB) -> {settings.IMG_SIZE} NCHW float32")
+    for title, (legacy_fn, fused_fn) in stages.items():
+        print("=" * 66)
+        print(title)
+        print(f"{'Camino':<12}{'batch':>8}{'µs/imagen':>14}{'KB/imagen':>14}{'speedup':>12}")
+        print("-" * 66)
+        for batch_size in args.batch_sizes:
+            legacy = measure(lambda: legacy_fn(batch_size), args.iterations, batch_size)
+            fused = measure(lambda: fused_fn(batch_size), args.iterations, batch_size)
+            print(f"{'anterior':<12}{batch_size:>8}{legacy[0]:>14.1f}{legacy[1]:>14.1f}{'':>12}")
+            print(f"{'fused':<12}{batch_size:>8}{fused[0]:>14.1f}{fused[1]:>14.1f}{legacy[0] / fused[0]:>11.2f}x")
+    print("=" * 66)
+
+
+if __name__ == "__main__":
+    main()
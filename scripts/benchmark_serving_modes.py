@@ -0,0 +1,111 @@
+# scripts/benchmark_serving_modes.py
+"""
+Compara los modos de serving PyTorch (TORCH_SERVING_MODE) sobre la misma entrada:
+latencia, RSS y coincidencia top-1 contra el primer modo
+
+Cada modo corre en su propio proceso para que el RSS no se mezcle.
+
+Uso:
+    python scripts/benchmark_serving_modes.py
+    python scripts/benchmark_serving_modes.py --checkpoint models/mobilenetv2_waste_pytorch_best.pth \\
+        --modes eager torchscript int8 --batch-sizes 1 8 --iterations 50 --images dataset/test
+"""
+import argparse
+import logging
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings  # noqa: E402
+from app.models.mobilenet_classifier import MobileNetClassifier  # noqa: E402
+from app.utils.memory import get_rss_mb  # noqa: E402
+
+
+def load(checkpoint, mode):
+    settings.TORCH_SERVING_MODE = mode
+    classifier = MobileNetClassifier()
+    start = time.perf_counter()
+    classifier.load_model(checkpoint)
+    return classifier, time.perf_counter() - start
+
+
+def measure(classifier, images, iterations, warmup=3):
+    """Latencia media (ms) de predict_batch con preprocesamiento incluido"""
+    for _ in range(warmup):
+        classifier.predict_batch(images)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        probabilities = classifier.predict_batch(images)
+    return (time.perf_counter() - start) / iterations * 1000, probabilities
+
+
+def run_mode(checkpoint, mode, batch_sizes, iterations, images_dir):
+    """Carga y mide un modo (corre en un proceso aparte)"""
+    logging.basicConfig(level=logging.INFO)
+
+    if images_dir:
+        from app.models.torch_optimization import load_image_folder
+        images, _ = load_image_folder(images_dir, limit=max(64, max(batch_sizes)))
+    else:
+        rng = np.random.default_rng(0)
+        images = [rng.integers(0, 256, (300, 300, 3), dtype=np.uint8) for _ in range(64)]
+
+    rss_before = get_rss_mb()
+    classifier, load_time = load(checkpoint, mode)
+    row = {
+        "active_mode": classifier.backend.serving_mode,
+        "load_s": load_time,
+        "model_rss_mb": get_rss_mb() - rss_before,
+    }
+    for batch_size in batch_sizes:
+        row[batch_size], _ = measure(classifier, images[:batch_size], iterations)
+
+    row["top1"] = classifier.predict_batch(images).argmax(axis=1)
+    row["rss_mb"] = get_rss_mb()
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de modos de serving PyTorch")
+    parser.add_argument("--checkpoint", default=settings.MODEL_PATH)
+    parser.add_argument("--modes", nargs="+", default=["eager", "torchscript", "int8"])
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8])
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--images", default=None, help="Imágenes reales para top-1 (default: ruido)")
+    args = parser.parse_args()
+
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for mode in args.modes:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results[mode] = pool.submit(
+                run_mode, args.checkpoint, mode, args.batch_sizes, args.iterations, args.images
+            ).result()
+
+    reference = results[args.modes[0]]["top1"]
+
+    width = 14 + 10 + 12 * len(args.batch_sizes) + 11 + 11 + 22
+    print("=" * width)
+    header = f"{'Modo':<14}{'carga (s)':>10}"
+    header += "".join(f"{f'b={b} (ms)':>12}" for b in args.batch_sizes)
+    header += f"{'RSS (MB)':>11}{'modelo MB':>11}{'top-1 vs ' + args.modes[0]:>22}"
+    print(header)
+    print("=" * width)
+    for mode, row in results.items():
+        label = mode if row["active_mode"] == mode else f"{mode}->{row['active_mode']}"
+        line = f"{label:<14}{row['load_s']:>10.2f}"
+        line += "".join(f"{row[b]:>12.2f}" for b in args.batch_sizes)
+        line += f"{row['rss_mb']:>11.0f}{row['model_rss_mb']:>11.0f}"
+        line += f"{float((row['top1'] == reference).mean()):>22.2%}"
+        print(line)
+    print("=" * width)
+
+
+if __name__ == "__main__":
+    main()
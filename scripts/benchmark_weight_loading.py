@@ -0,0 +1,105 @@
+# scripts/benchmark_weight_loading.py
+"""
+Carga de pesos copiada vs mapeada (TORCH_MMAP_WEIGHTS) con varios workers
+
+Arranca N procesos a la vez (como uvicorn --workers N), cada uno carga el
+modelo y hace una predicción; con todos vivos mide en cada uno:
+- tiempo de carga (load_model) y hasta la primera predicción
+- RSS, PSS y USS (ver app/utils/memory.get_memory_breakdown)
+
+Con pesos copiados cada worker tiene su copia privada (USS alto); mapeados,
+las páginas de los pesos vienen del page cache y se comparten: baja el PSS
+y la suma de PSS (memoria física real de todos los workers).
+
+Uso:
+    python scripts/benchmark_weight_loading.py --workers 4
+    python scripts/benchmark_weight_loading.py --variants copy:models/a.pth mmap:models/a.pth mmap:models/a.safetensors
+"""
+import argparse
+import logging
+import multiprocessing
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings  # noqa: E402
+
+
+def run_worker(checkpoint, mmap, barrier, results):
+    """Un worker: carga, predice, espera a los demás y mide memoria"""
+    logging.basicConfig(level=logging.WARNING)
+    settings.TORCH_MMAP_WEIGHTS = mmap
+    settings.TORCH_SERVING_MODE = "eager"
+
+    import torchvision.models  # noqa: F401
+    from app.models.backends import resolve_backend
+    from app.models.mobilenet_classifier import MobileNetClassifier
+    from app.utils.memory import get_memory_breakdown
+
+    resolve_backend(checkpoint, settings.MODEL_BACKEND)
+    barrier.wait()  # Imports listos: medir solo la carga
+    start = time.perf_counter()
+    classifier = MobileNetClassifier()
+    classifier.load_model(checkpoint)
+    load_s = time.perf_counter() - start
+
+    image = np.random.default_rng(0).integers(0, 256, (300, 300, 3), dtype=np.uint8)
+    classifier.predict_batch([image])
+    first_prediction_s = time.perf_counter() - start
+
+    barrier.wait()  # Todos cargados: el PSS refleja lo que se comparte
+    results.put({"load_s": load_s, "first_prediction_s": first_prediction_s, **get_memory_breakdown()})
+    barrier.wait()
+
+
+def run_variant(checkpoint, mmap, workers):
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=run_worker, args=(checkpoint, mmap, barrier, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    rows = [results.get(timeout=600) for _ in processes]
+    for process in processes:
+        process.join()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga de pesos copiada vs mapeada")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--variants", nargs="+", default=None,
+                        help="modo:checkpoint con modo copy o mmap (default: MODEL_PATH copiado y mapeado)")
+    args = parser.parse_args()
+
+    variants = args.variants or [f"copy:{settings.MODEL_PATH}", f"mmap:{settings.MODEL_PATH}"]
+
+    width = 96
+    print("=" * width)
+    print(f"{args.workers} workers (promedio por worker; PSS total = memoria física de todos)")
+    print(f"{'Variante':<34}{'carga s':>9}{'1ra pred s':>11}{'RSS MB':>9}{'PSS MB':>9}"
+          f"{'USS MB':>9}{'PSS total':>11}")
+    print("-" * width)
+    for variant in variants:
+        mode, checkpoint = variant.split(":", 1)
+        rows = run_variant(checkpoint, mode == "mmap", args.workers)
+        mean = {key: float(np.mean([row[key] for row in rows])) for key in rows[0]}
+        total_pss = sum(row.get("pss_mb", 0.0) for row in rows)
+        label = f"{mode}:{Path(checkpoint).name}"
+        print(
+            f"{label:<34}{mean['load_s']:>9.3f}{mean['first_prediction_s']:>11.3f}"
+            f"{mean['rss_mb']:>9.1f}{mean.get('pss_mb', 0.0):>9.1f}{mean.get('uss_mb', 0.0):>9.1f}"
+            f"{total_pss:>11.1f}"
+        )
+    print("=" * width)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# scripts/convert_checkpoint.py
+"""
+Convierte un checkpoint PyTorch a un formato que se puede mapear (mmap)
+
+- .safetensors (requiere `pip install safetensors`): formato plano, siempre
+  se carga zero-copy
+- .pth: state_dict de solo tensores en el formato zip de torch.save, que
+  torch.load(mmap=True, weights_only=True) puede mapear
+
+Con cualquiera de los dos, los workers comparten una sola copia física de
+los pesos (ver TORCH_MMAP_WEIGHTS y scripts/benchmark_weight_loading.py).
+
+Uso:
+    python scripts/convert_checkpoint.py models/mobilenetv2_waste_pytorch_best.pth
+    python scripts/convert_checkpoint.py models/mobilenetv2_waste_pytorch_best.pth --output models/mobilenetv2_waste.pth
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import torch
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def load_state_dict(path: str) -> dict:
+    checkpoint = torch.load(path, map_location="cpu", weights_only=False)
+    if hasattr(checkpoint, "state_dict"):  # módulo completo
+        checkpoint = checkpoint.state_dict()
+    elif "model_state_dict" in checkpoint:  # checkpoint de entrenamiento
+        checkpoint = checkpoint["model_state_dict"]
+
+    tensors = {key: value for key, value in checkpoint.items() if isinstance(value, torch.Tensor)}
+    skipped = sorted(set(checkpoint) - set(tensors))
+    if skipped:
+        print(f"Se omiten {len(skipped)} entradas que no son tensores: {skipped[:5]}")
+    # Tensores contiguos y sin memoria compartida (requisito de safetensors)
+    return {key: value.detach().contiguous().clone() for key, value in tensors.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convertir checkpoint PyTorch a formato mapeable")
+    parser.add_argument("checkpoint", help="Checkpoint .pth/.pt de origen")
+    parser.add_argument("--output", default=None,
+                        help="Destino .safetensors o .pth (default: mismo nombre con .safetensors)")
+    args = parser.parse_args()
+
+    output = Path(args.output or Path(args.checkpoint).with_suffix(".safetensors"))
+    if output.resolve() == Path(args.checkpoint).resolve():
+        parser.error("El destino no puede ser el mismo archivo (los workers podrían tenerlo mapeado)")
+
+    state_dict = load_state_dict(args.checkpoint)
+    if output.suffix == ".safetensors":
+        try:
+            from safetensors.torch import save_file
+        except ImportError:
+            sys.exit("Falta safetensors: pip install safetensors (o usar --output con .pth)")
+        save_file(state_dict, str(output))
+    else:
+        torch.save(state_dict, output)
+
+    # Verificar que se puede mapear
+    if output.suffix == ".safetensors":
+        from safetensors.torch import load_file
+        loaded = load_file(str(output))
+    else:
+        loaded = torch.load(output, map_location="cpu", mmap=True, weights_only=True)
+    assert loaded.keys() == state_dict.keys()
+
+    size_mb = output.stat().st_size / 1024 / 1024
+    print(f"✅ {len(state_dict)} tensores -> {output} ({size_mb:.1f} MB)")
+    print(f"   MODEL_PATH={output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# scripts/export_onnx.py
+"""
+Convierte el checkpoint PyTorch entrenado a ONNX y verifica que las salidas coincidan
+
+Uso:
+    python scripts/export_onnx.py
+    python scripts/export_onnx.py --checkpoint models/mobilenetv2_waste_pytorch_best.pth \\
+        --output models/mobilenetv2_waste.onnx --images dataset/test
+
+Luego en .env:
+    MODEL_PATH=models/mobilenetv2_waste.onnx
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.models.mobilenet_classifier import MobileNetClassifier  # noqa: E402
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+def load_sample_images(images_dir, limit):
+    """Imágenes reales para comparar salidas (si no hay, se usa ruido)"""
+    import cv2
+
+    images = []
+    if images_dir:
+        for path in sorted(Path(images_dir).rglob("*")):
+            if path.suffix.lower() not in IMAGE_EXTENSIONS:
+                continue
+            image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+            if image is not None:
+                images.append(image)
+            if len(images) >= limit:
+                break
+
+    if not images:
+        rng = np.random.default_rng(0)
+        images = [rng.integers(0, 256, (300, 300, 3), dtype=np.uint8) for _ in range(limit)]
+    return images
+
+
+def export(torch_classifier, output_path, opset):
+    import torch
+
+    height, width = torch_classifier.input_shape
+    dummy = torch.randn(1, 3, height, width, device=torch_classifier.backend.device)
+
+    torch.onnx.export(
+        torch_classifier.model,
+        dummy,
+        str(output_path),
+        input_names=["input"],
+        output_names=["logits"],
+        dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=opset,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportar checkpoint PyTorch a ONNX")
+    parser.add_argument("--checkpoint", default="models/mobilenetv2_waste_pytorch_best.pth")
+    parser.add_argument("--output", default=None, help="Default: mismo nombre con .onnx")
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--images", default=None, help="Carpeta con imágenes para comparar salidas")
+    parser.add_argument("--samples", type=int, default=16)
+    parser.add_argument("--atol", type=float, default=1e-4, help="Tolerancia en probabilidades")
+    args = parser.parse_args()
+
+    output_path = Path(args.output) if args.output else Path(args.checkpoint).with_suffix(".onnx")
+
+    print("=" * 60)
+    print("EXPORTAR A ONNX")
+    print("=" * 60)
+
+    # 1. Modelo PyTorch (misma arquitectura que usa el servidor)
+    torch_classifier = MobileNetClassifier()
+    torch_classifier.load_model(args.checkpoint)
+    print(f"✅ Checkpoint cargado: {args.checkpoint}")
+
+    # 2. Exportar con batch dinámico
+    export(torch_classifier, output_path, args.opset)
+    print(f"✅ Exportado: {output_path} (opset {args.opset})")
+
+    # 3. Cargar con ONNX Runtime y comparar salidas sobre el MISMO tensor de entrada
+    import torch
+
+    onnx_classifier = MobileNetClassifier()
+    onnx_classifier.load_model(str(output_path))
+
+    images = load_sample_images(args.images, args.samples)
+    batch = torch_classifier.backend.preprocess_batch(images).clone()
+
+    with torch.no_grad():
+        torch_probs = torch.softmax(torch_classifier.model(batch), dim=1).cpu().numpy()
+    logits = onnx_classifier.model.run(None, {onnx_classifier.backend.input_name: batch.cpu().numpy()})[0]
+    onnx_probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+    onnx_probs /= onnx_probs.sum(axis=1, keepdims=True)
+
+    max_diff = float(np.abs(torch_probs - onnx_probs).max())
+    agreement = float((torch_probs.argmax(axis=1) == onnx_probs.argmax(axis=1)).mean())
+
+    # Extremo a extremo (cada backend con su propio preprocesamiento)
+    end_to_end = float(
+        (torch_classifier.predict_batch(images).argmax(axis=1)
+         == onnx_classifier.predict_batch(images).argmax(axis=1)).mean()
+    )
+
+    print(f"\n   Imágenes comparadas: {len(images)}")
+    print(f"   Diferencia máxima en probabilidades: {max_diff:.2e}")
+    print(f"   Coincidencia top-1 (mismo tensor): {agreement:.2%}")
+    print(f"   Coincidencia top-1 (preprocesamiento de cada backend): {end_to_end:.2%}")
+
+    if max_diff > args.atol or agreement < 1.0:
+        print(f"\n❌ Las salidas NO coinciden (tolerancia {args.atol})")
+        return False
+
+    print("\n✅ Las salidas coinciden")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
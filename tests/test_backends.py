@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+Test the backend registry with the NumPy stub backend
+No deep learning framework or trained model required
+"""
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.models.backends import available_backends, resolve_backend
+from app.models.backends.numpy_stub import NumpyStubBackend
+from app.models.mobilenet_classifier import MobileNetClassifier
+
+
+def test_resolve_backend_by_suffix():
+    """Extension -> backend, and MODEL_BACKEND override"""
+    for name in ("pytorch", "tensorflow", "onnx", "tflite", "numpy"):
+        assert name in available_backends()
+
+    assert resolve_backend("model.npz").framework == "numpy"
+    assert resolve_backend("model.PTH").framework == "pytorch"
+    assert resolve_backend("model.bin", "numpy") is NumpyStubBackend
+
+    for path, name in (("model.bin", "auto"), ("model.npz", "caffe")):
+        try:
+            resolve_backend(path, name)
+        except ValueError:
+            continue
+        raise AssertionError(f"{path} / {name} should be rejected")
+
+
+def test_predict_batch_with_stub():
+    """predict_batch returns an (N, C) probability matrix consistent with predict"""
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = str(Path(tmp) / "stub.npz")
+        NumpyStubBackend.create(model_path, num_classes=len(settings.CLASSES))
+
+        classifier = MobileNetClassifier()
+        classifier.load_model(model_path)
+
+    assert classifier.framework == "numpy"
+
+    rng = np.random.default_rng(0)
+    images = [rng.integers(0, 256, (120 + i, 160, 3), dtype=np.uint8) for i in range(5)]
+
+    probabilities = classifier.predict_batch(images)
+    assert probabilities.shape == (5, len(settings.CLASSES))
+    assert np.allclose(probabilities.sum(axis=1), 1.0, atol=1e-5)
+
+    single = classifier.predict(images[2])
+    assert single["class_id"] == int(probabilities[2].argmax())
+    assert np.allclose(single["all_probabilities"], probabilities[2], atol=1e-6)
+
+
+def test_swap_releases_previous_after_in_flight():
+    """swap() activates the new model at once; the old one is freed after its last call"""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [str(Path(tmp) / f"stub{i}.npz") for i in range(2)]
+        for seed, path in enumerate(paths):
+            NumpyStubBackend.create(path, num_classes=len(settings.CLASSES), seed=seed)
+
+        classifier = MobileNetClassifier()
+        classifier.load_model(paths[0])
+        old_backend, old_id = classifier.backend, classifier.model_id
+
+        in_flight = classifier._acquire()
+        classifier.swap(*classifier.build_backend(paths[1]))
+
+    assert classifier.model_id != old_id
+    assert in_flight.backend is old_backend  # still usable by the in-flight call
+    classifier._release(in_flight)
+    assert in_flight.backend is None
+
+
+def test_frameworks_imported_lazily():
+    """Loading a .npz model imports no deep learning framework (fresh interpreter)"""
+    code = (
+        "import sys, tempfile\n"
+        "from app.models.backends.numpy_stub import NumpyStubBackend\n"
+        "from app.models.mobilenet_classifier import MobileNetClassifier\n"
+        "path = tempfile.mkdtemp() + '/stub.npz'\n"
+        "NumpyStubBackend.create(path, num_classes=6)\n"
+        "MobileNetClassifier().load_model(path)\n"
+        "print(','.join(m for m in ('torch', 'tensorflow', 'onnxruntime') if m in sys.modules))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).parent.parent, capture_output=True, text=True, check=True
+    ).stdout.strip()
+    assert output == "", f"frameworks imported: {output}"
+
+
+def test_prefork_worker_matches_in_process():
+    """A forked inference worker fed through shared-memory slots gives the same probabilities"""
+    import multiprocessing
+    from app.serving.prefork import PreforkClassifier, _inference_worker
+    from app.serving.shm import SharedTensorSlots
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = str(Path(tmp) / "stub.npz")
+        NumpyStubBackend.create(model_path, num_classes=len(settings.CLASSES))
+        backend = NumpyStubBackend()
+        backend.load_model(model_path)
+
+    slots = SharedTensorSlots(2, 4, backend.preprocessor.sample_shape, backend.num_classes)
+    context = multiprocessing.get_context("fork")
+    free_slots, requests, responses = context.Queue(), context.Queue(), context.Queue()
+    for slot in range(slots.num_slots):
+        free_slots.put(slot)
+    busy = context.Array("i", [-1] * 3, lock=False)
+    worker = context.Process(
+        target=_inference_worker,
+        args=(0, backend, slots, requests, [responses], busy, 1, []),
+        daemon=True
+    )
+    worker.start()
+    try:
+        client = PreforkClassifier(
+            0, backend, "stub", slots, free_slots, requests, responses,
+            context.Array("i", [worker.pid], lock=False), context.Value("i", 0, lock=False),
+            timeout=10
+        )
+        rng = np.random.default_rng(0)
+        images = [rng.integers(0, 256, (120, 160 + i, 3), dtype=np.uint8) for i in range(6)]
+
+        # 6 images > 4 per slot: two round trips
+        assert np.allclose(client.predict_batch(images), backend.predict_batch(images), atol=1e-6)
+        assert client.stats()["batches"] == 2
+    finally:
+        requests.put(None)
+        worker.join(timeout=5)
+        slots.close()
+        slots.unlink()
+
+
+def test_timed_out_slot_returns_on_late_reply():
+    """A slot whose reply came after the timeout goes back to the free list when the reply arrives"""
+    import multiprocessing
+    import time
+    from app.serving.prefork import PreforkClassifier
+    from app.serving.shm import SharedTensorSlots
+
+    backend = NumpyStubBackend()
+    slots = SharedTensorSlots(1, 2, backend.preprocessor.sample_shape, len(settings.CLASSES))
+    context = multiprocessing.get_context("fork")
+    free_slots, requests, responses = context.Queue(), context.Queue(), context.Queue()
+    free_slots.put(0)
+    try:
+        client = PreforkClassifier(
+            0, backend, "stub", slots, free_slots, requests, responses,
+            context.Array("i", [0], lock=False), context.Value("i", 0, lock=False),
+            timeout=0.3
+        )
+        batch = np.zeros((1, *backend.preprocessor.sample_shape), np.float32)
+
+        # Nobody answers: the request times out and the only slot is held back
+        try:
+            client.infer(batch)
+            raise AssertionError("expected TimeoutError")
+        except TimeoutError:
+            pass
+        slot, count, frontend, seq = requests.get(timeout=1)
+        assert client.stats()["slots_awaiting_reply"] == 1
+
+        # The late reply (a slow batch or the error of a dead worker) frees it
+        responses.put((seq, None))
+        deadline = time.monotonic() + 5
+        while client.stats()["slots_awaiting_reply"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stats = client.stats()
+        assert stats["slots_awaiting_reply"] == 0 and stats["reclaimed_slots"] == 1
+
+        # The next request gets the slot back instead of waiting for the timeout
+        slots.outputs(0)[:1] = 0.5
+        worker = context.Process(target=_reply_next, args=(requests, responses), daemon=True)
+        worker.start()
+        assert np.allclose(client.infer(batch), 0.5)
+        worker.join(timeout=5)
+    finally:
+        slots.close()
+        slots.unlink()
+
+
+def _reply_next(requests, responses):
+    """Inference worker stand-in: answers the next request without touching the slot"""
+    slot, count, frontend, seq = requests.get(timeout=5)
+    responses.put((seq, None))
+
+
+class _ClosingResponses:
+    """Response queue stand-in that closes (EOFError) once a request was sent"""
+
+    def __init__(self, requests):
+        self.requests = requests
+
+    def get(self):
+        self.requests.get(timeout=5)
+        raise EOFError
+
+
+def test_prefork_fails_requests_when_responses_close():
+    """A closed response queue fails waiting and new requests right away instead of after the timeout"""
+    import multiprocessing
+    import time
+    from app.serving.prefork import PreforkClassifier
+    from app.serving.shm import SharedTensorSlots
+
+    backend = NumpyStubBackend()
+    slots = SharedTensorSlots(1, 2, backend.preprocessor.sample_shape, len(settings.CLASSES))
+    context = multiprocessing.get_context("fork")
+    free_slots, requests = context.Queue(), context.Queue()
+    free_slots.put(0)
+    try:
+        client = PreforkClassifier(
+            0, backend, "stub", slots, free_slots, requests, _ClosingResponses(requests),
+            context.Array("i", [0], lock=False), context.Value("i", 0, lock=False),
+            timeout=30
+        )
+        batch = np.zeros((1, *backend.preprocessor.sample_shape), np.float32)
+
+        for _ in range(2):
+            start = time.monotonic()
+            try:
+                client.infer(batch)
+                raise AssertionError("expected RuntimeError")
+            except RuntimeError as e:
+                assert "cola de respuestas" in str(e)
+            assert time.monotonic() - start < 5
+        assert client.stats()["slots_awaiting_reply"] == 0
+    finally:
+        slots.close()
+        slots.unlink()
+
+
+def test_daemon_batches_across_clients():
+    """Two API workers' requests end up in one daemon forward, with in-process results"""
+    import os
+    import threading
+    from app.serving.daemon import DaemonClassifier, socket_in_use
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = str(Path(tmp) / "stub.npz")
+        NumpyStubBackend.create(model_path, num_classes=len(settings.CLASSES))
+        backend = NumpyStubBackend()
+        backend.load_model(model_path)
+        socket_path = str(Path(tmp) / "inference.sock")
+
+        env = {
+            **os.environ, "MODEL_PATH": model_path, "WARMUP_ENABLED": "false",
+            "DAEMON_BATCH_WAIT_MS": "500", "LOG_LEVEL": "WARNING",
+        }
+        daemon = subprocess.Popen(
+            [sys.executable, "-m", "app.serving.daemon", "--socket", socket_path],
+            cwd=Path(__file__).parent.parent, env=env
+        )
+        clients = [DaemonClassifier(socket_path, num_slots=2, capacity=4, timeout=20) for _ in range(2)]
+        try:
+            rng = np.random.default_rng(0)
+            images = [rng.integers(0, 256, (120, 160 + i, 3), dtype=np.uint8) for i in range(3)]
+            for client in clients:
+                client._ensure_connected()
+
+            results = [None, None]
+
+            def predict(index):
+                results[index] = clients[index].predict_batch(images)
+
+            threads = [threading.Thread(target=predict, args=(i,)) for i in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            expected = backend.predict_batch(images)
+            assert all(np.allclose(result, expected, atol=1e-6) for result in results)
+            stats = clients[0].stats()["daemon"]
+            assert stats["batches"] == 1 and stats["items"] == 6
+            assert stats["multi_worker_batches"] == 1
+        finally:
+            for client in clients:
+                client.close()
+            daemon.terminate()
+            daemon.wait(timeout=10)
+        assert not socket_in_use(socket_path)
+
+
+def test_decode_pipeline_matches_in_process():
+    """Frames decoded by the process pool into the ring classify like in-process images"""
+    import asyncio
+    import cv2
+    from fastapi import HTTPException
+    from app.core.pipeline import DecodePipeline
+    from app.core.preprocessing import decode_and_validate
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = str(Path(tmp) / "stub.npz")
+        NumpyStubBackend.create(model_path, num_classes=len(settings.CLASSES))
+        classifier = MobileNetClassifier()
+        classifier.load_model(model_path)
+
+    rng = np.random.default_rng(0)
+    contents = [
+        cv2.imencode(".jpg", rng.integers(0, 256, (240, 320 + i, 3), dtype=np.uint8))[1].tobytes()
+        for i in range(5)
+    ]
+    expected = classifier.classify_batch([decode_and_validate(data)[0] for data in contents])
+
+    async def run():
+        pipeline = DecodePipeline(classifier, workers=2, ring_size=4)
+        pipeline.start()
+        try:
+            # Ring of 4 entries: the fifth frame reuses a released one
+            frames = await asyncio.gather(*(pipeline.submit(data, with_hash=True) for data in contents[:4]))
+            assert [frame.shape for frame in frames] == [(240, 320 + i) for i in range(4)]
+            assert all(frame.image_hash is not None and frame.hash_time > 0 for frame in frames)
+            results = pipeline.classify_batch(frames)
+            for frame in frames:
+                pipeline.release(frame)
+            last = await pipeline.submit(contents[4])
+            results += pipeline.classify_batch([last])
+            pipeline.release(last)
+
+            try:
+                await pipeline.submit(b"not an image" * 100)
+                raise AssertionError("corrupt image accepted")
+            except HTTPException as e:
+                assert e.status_code == 400
+            stats = pipeline.stats()
+            assert stats["ring"]["free"] == 4 and stats["decode"]["decoded"] == 5
+            return results
+        finally:
+            pipeline.shutdown()
+
+    results = asyncio.run(run())
+    for result, reference in zip(results, expected):
+        assert result["class_id"] == reference["class_id"]
+        assert np.allclose(result["all_probabilities"], reference["all_probabilities"], atol=1e-6)
+
+
+def test_decode_pipeline_keeps_entry_until_batch_finishes():
+    """A request cancelled mid-forward gets its ring entry back only after the batch ends"""
+    import asyncio
+    import threading
+    import cv2
+    from app.core.pipeline import DecodePipeline
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = str(Path(tmp) / "stub.npz")
+        NumpyStubBackend.create(model_path, num_classes=len(settings.CLASSES))
+        classifier = MobileNetClassifier()
+        classifier.load_model(model_path)
+
+    infer = classifier.infer
+    started, finish = threading.Event(), threading.Event()
+
+    def slow_infer(batch):
+        started.set()
+        finish.wait(timeout=5)
+        return infer(batch)
+
+    classifier.infer = slow_infer
+    contents = cv2.imencode(".jpg", np.zeros((240, 320, 3), dtype=np.uint8))[1].tobytes()
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        pipeline = DecodePipeline(classifier, workers=1, ring_size=2)
+        pipeline.start()
+        try:
+            frame = await pipeline.submit(contents)
+            batch = loop.run_in_executor(None, pipeline.classify_batch, [frame])
+            await loop.run_in_executor(None, started.wait)
+
+            pipeline.release(frame)  # The request went away, the forward did not
+            assert pipeline.stats()["ring"]["free"] == 1
+
+            finish.set()
+            await batch
+            await asyncio.sleep(0)
+            pipeline.release(frame)  # A second release is a no-op
+            return pipeline.stats()["ring"]
+        finally:
+            pipeline.shutdown()
+
+    ring = asyncio.run(run())
+    assert ring["free"] == 2 and ring["deferred_releases"] == 1
+
+
+def _mobilenet_checkpoint(torch, num_classes: int) -> dict:
+    """Randomly initialised state_dict with the serving architecture (MobileNetV2 + 2-layer head)"""
+    from torchvision import models
+
+    torch.manual_seed(20)
+    model = models.mobilenet_v2(weights=None)
+    model.classifier = torch.nn.Sequential(
+        torch.nn.Dropout(p=0.5),
+        torch.nn.Linear(model.classifier[1].in_features, 128),
+        torch.nn.ReLU(inplace=True),
+        torch.nn.Dropout(p=0.5),
+        torch.nn.Linear(128, num_classes)
+    )
+    return {key: value.detach().clone() for key, value in model.state_dict().items()}
+
+
+def test_mapped_weights_match_eager_load():
+    """mmap .pth, .safetensors and the copying path (watcher on) build the same model as torch.load"""
+    from app.models.backends.pytorch import PYTORCH_AVAILABLE, PyTorchBackend
+    if not PYTORCH_AVAILABLE:
+        print("torch not installed: skipping test_mapped_weights_match_eager_load")
+        return
+    import torch
+    from safetensors.torch import save_file
+
+    names = ("TORCH_MMAP_WEIGHTS", "MODEL_WATCH_INTERVAL", "SERVING_LAYOUT")
+    saved = {name: getattr(settings, name) for name in names}
+    explicit = set(settings.model_fields_set)
+    with tempfile.TemporaryDirectory() as tmp:
+        state_dict = _mobilenet_checkpoint(torch, num_classes=len(settings.CLASSES))
+        pth, safetensors = str(Path(tmp) / "model.pth"), str(Path(tmp) / "model.safetensors")
+        torch.save(state_dict, pth)
+        save_file(state_dict, safetensors)
+        reference = torch.load(pth, map_location="cpu", weights_only=False)
+
+        backend = PyTorchBackend()
+        backend.device = torch.device("cpu")
+        loaded = {}
+        try:
+            settings.SERVING_LAYOUT, settings.MODEL_WATCH_INTERVAL = "workers", 0
+            for mmap in (True, False):
+                settings.TORCH_MMAP_WEIGHTS = mmap
+                for path in (pth, safetensors):
+                    loaded[(path, mmap, "mapped")] = backend._build_eager_model(path)
+            settings.TORCH_MMAP_WEIGHTS, settings.MODEL_WATCH_INTERVAL = True, 5
+            for path in (pth, safetensors):
+                loaded[(path, True, "copied")] = backend._build_eager_model(path)
+        finally:
+            for name, value in saved.items():
+                setattr(settings, name, value)
+            settings.model_fields_set.intersection_update(explicit)
+
+        image = torch.rand(2, 3, *backend.input_shape[:2])
+        expected = None
+        for key, (model, num_classes) in loaded.items():
+            assert num_classes == len(settings.CLASSES), key
+            weights = model.state_dict()
+            assert weights.keys() == reference.keys(), key
+            for name, tensor in reference.items():
+                assert torch.equal(weights[name], tensor), (key, name)
+            with torch.no_grad():
+                output = model(image)
+            if expected is None:
+                expected = output
+            assert torch.equal(output, expected), key
+        del loaded, model, weights  # Release the mappings before the directory goes
+
+
+if __name__ == "__main__":
+    test_resolve_backend_by_suffix()
+    test_predict_batch_with_stub()
+    test_swap_releases_previous_after_in_flight()
+    test_frameworks_imported_lazily()
+    test_prefork_worker_matches_in_process()
+    test_timed_out_slot_returns_on_late_reply()
+    test_prefork_fails_requests_when_responses_close()
+    test_daemon_batches_across_clients()
+    test_decode_pipeline_matches_in_process()
+    test_decode_pipeline_keeps_entry_until_batch_finishes()
+    test_mapped_weights_match_eager_load()
+    print("✅ Backend registry tests passed")
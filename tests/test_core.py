@@ -0,0 +1,630 @@
+#!/usr/bin/env python3
+"""
+Test the request-path building blocks in app/core (no model required)
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.config import settings
+from app.core.admission import AdmissionController, AdmissionMiddleware, OverloadedError
+from app.core.autotune import configure_threads, save_tuning, select_workers
+from app.core.batching import MicroBatcher
+from app.core.cache import ResultCache
+from app.core.deadline import DeadlineExceeded, DeadlineMiddleware, DeadlineTracker
+from app.core.dedup import NearDuplicateDetector, dhash
+from app.core.executor import InferenceExecutor
+from app.core.upload import BodySizeLimitMiddleware, UploadLimiter, read_body_limited
+
+
+def _scene(seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return cv2.GaussianBlur(rng.integers(0, 256, (240, 320, 3), dtype=np.uint8), (15, 15), 0)
+
+
+def test_dhash_close_for_near_duplicates():
+    """A slightly noisy copy of a frame hashes a few bits away; another scene does not"""
+    frame = _scene(0)
+    noisy = np.clip(frame.astype(np.int16) + np.random.default_rng(1).integers(-3, 4, frame.shape), 0, 255)
+
+    assert (dhash(frame) ^ dhash(noisy.astype(np.uint8))).bit_count() <= 4
+    assert (dhash(frame) ^ dhash(_scene(2))).bit_count() > 10
+
+
+def test_dedup_distance_threshold():
+    """Hashes within max_distance bits reuse the stored prediction, one bit more does not"""
+    detector = NearDuplicateDetector(max_distance=4)
+    detector.remember("cam", 0, "metal", "model-1")
+
+    assert detector.lookup("cam", 0b1111, "model-1") == "metal"
+    assert detector.lookup("cam", 0b11111, "model-1") is None
+    assert detector.stats()["skips"] == 1
+
+
+def test_dedup_entries_expire():
+    """Predictions older than max_age are not reused"""
+    detector = NearDuplicateDetector(max_age_seconds=0.05)
+    detector.remember("cam", 0, "metal", "model-1")
+    assert detector.lookup("cam", 0, "model-1") == "metal"
+
+    time.sleep(0.1)
+    assert detector.lookup("cam", 0, "model-1") is None
+
+
+def test_dedup_devices_are_isolated():
+    """A frame from one device never reuses another device's prediction"""
+    detector = NearDuplicateDetector()
+    detector.remember("cam-a", 0, "metal", "model-1")
+
+    assert detector.lookup("cam-b", 0, "model-1") is None
+    assert detector.lookup("cam-a", 0, "model-1") == "metal"
+
+
+def test_dedup_cleared_when_model_changes():
+    """A new model_id drops every stored prediction (also when the old id comes back)"""
+    detector = NearDuplicateDetector()
+    detector.remember("cam", 0, "metal", "model-1")
+
+    assert detector.lookup("cam", 0, "model-2") is None
+    assert detector.lookup("cam", 0, "model-1") is None
+    assert detector.stats()["devices"] == 0
+
+
+def test_dedup_reports_hash_cost():
+    """Hashes computed here and in the decode processes both count in avg_hash_us"""
+    detector = NearDuplicateDetector()
+    detector.compute_hash(_scene(0))
+    detector.record_hash_time(0.002)
+
+    stats = detector.stats()
+    assert stats["total_hash_ms"] >= 2.0
+    assert stats["avg_hash_us"] >= 1000.0
+
+
+async def _call_asgi(app, path: str, headers=(), body_chunks=(b"",)):
+    """Runs one HTTP request through an ASGI app; returns (status, headers, body)"""
+    chunks = list(body_chunks)
+    sent = []
+
+    async def receive():
+        if chunks:
+            chunk = chunks.pop(0)
+            return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": path,
+        "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+    }
+    await app(scope, receive, send)
+    start = next(m for m in sent if m["type"] == "http.response.start")
+    body = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+    return start["status"], dict(start.get("headers", [])), body
+
+
+def _header(value: str):
+    return [(b"x-deadline-ms", value.encode())]
+
+
+def test_deadline_header_overrides_route_default():
+    """The header budget wins over the route default; 0 means no deadline"""
+    tracker = DeadlineTracker("X-Deadline-Ms", default_ms=1000, path_defaults={"/predict/esp": 200})
+
+    assert tracker.deadline_for("/predict/esp", [], 10.0).expires_at == 10.2
+    assert tracker.deadline_for("/predict", [], 10.0).expires_at == 11.0
+    assert tracker.deadline_for("/predict", _header("50"), 10.0).expires_at == 10.05
+    assert tracker.deadline_for("/predict", _header("0"), 10.0) is None
+    assert tracker.stats()["from_header"] == 2
+
+
+def test_deadline_invalid_header_uses_route_default():
+    """Unparseable or non-finite budgets (nan, inf) fall back to the route default"""
+    tracker = DeadlineTracker("X-Deadline-Ms", default_ms=1000)
+
+    for value in ("soon", "nan", "inf", "-inf"):
+        deadline = tracker.deadline_for("/predict", _header(value), 10.0)
+        assert deadline.expires_at == 11.0, value
+    assert tracker.stats()["from_header"] == 0
+
+
+def test_deadline_expired_raises_504_per_stage():
+    """check() raises a 504 once expired and counts the stage that dropped the request"""
+    tracker = DeadlineTracker("X-Deadline-Ms")
+    live = tracker.deadline_for("/predict", _header("60000"), time.monotonic())
+    live.check("decode")
+
+    expired = tracker.deadline_for("/predict", _header("1"), time.monotonic() - 1)
+    for stage in ("decode", "inference", "logging"):
+        try:
+            expired.check(stage)
+        except DeadlineExceeded as e:
+            assert e.status_code == 504
+            continue
+        raise AssertionError(f"{stage} should raise DeadlineExceeded")
+
+    stats = tracker.stats(inference_ms_per_item=10.0)
+    assert stats["expired"] == {"decode": 1, "inference": 1, "logging": 1}
+    assert stats["skipped_inferences"] == 2
+    assert stats["estimated_saved_ms"] == 20.0
+
+
+def test_deadline_middleware_sets_request_state():
+    """Prediction routes get request.state.deadline; other routes are left alone"""
+    tracker = DeadlineTracker("X-Deadline-Ms", default_ms=500)
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen[scope["path"]] = scope.get("state", {}).get("deadline", "unset")
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    middleware = DeadlineMiddleware(app, tracker)
+    asyncio.run(_call_asgi(middleware, "/predict"))
+    asyncio.run(_call_asgi(middleware, "/predict", headers=[("X-Deadline-Ms", "0")]))
+    assert seen["/predict"] is None
+    asyncio.run(_call_asgi(middleware, "/predict/esp"))
+    asyncio.run(_call_asgi(middleware, "/stats"))
+
+    assert seen["/predict/esp"].remaining() > 0
+    assert seen["/stats"] == "unset"
+
+
+class _EchoClassifier:
+    """classify_batch stand-in that records every batch it runs"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.batches = []
+
+    def classify_batch(self, images):
+        time.sleep(self.delay)
+        self.batches.append(list(images))
+        return [{"image": image} for image in images]
+
+
+def test_batcher_drops_frames_that_cannot_make_their_deadline():
+    """Frames whose deadline is shorter than an average batch never reach the model"""
+    classifier = _EchoClassifier(delay=0.05)
+    batcher = MicroBatcher(classifier, max_batch_size=4, max_wait_ms=1)
+    tracker = DeadlineTracker("X-Deadline-Ms")
+
+    async def run():
+        await batcher.submit("warmup")  # Sets the average batch time (~50ms)
+        tight = tracker.deadline_for("/predict", _header("10"), time.monotonic())
+        roomy = tracker.deadline_for("/predict", _header("5000"), time.monotonic())
+        results = await asyncio.gather(
+            batcher.submit("tight", tight), batcher.submit("roomy", roomy), return_exceptions=True
+        )
+        await batcher.stop()
+        return results
+
+    tight, roomy = asyncio.run(run())
+    assert isinstance(tight, DeadlineExceeded)
+    assert roomy == {"image": "roomy"}
+    assert classifier.batches == [["warmup"], ["roomy"]]
+    assert batcher.stats()["expired"] == 1
+    assert tracker.stats()["expired"]["inference"] == 1
+
+
+async def _shed(controller: AdmissionController) -> OverloadedError:
+    try:
+        await controller.acquire()
+    except OverloadedError as e:
+        return e
+    raise AssertionError("acquire() should have been rejected")
+
+
+def test_admission_hands_slot_to_oldest_waiter():
+    """Past max_in_flight requests queue FIFO; release() hands the slot over directly"""
+    async def run():
+        controller = AdmissionController(max_in_flight=1, queue_budget_ms=1000)
+        await controller.acquire()
+        first = asyncio.create_task(controller.acquire())
+        second = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        assert controller.stats()["queued"] == 2
+
+        controller.release(0.001)
+        await first
+        assert not second.done()
+        assert controller.stats()["in_flight"] == 1
+
+        controller.release(0.001)
+        await second
+        controller.release(0.001)
+        return controller.stats()
+
+    stats = asyncio.run(run())
+    assert stats["in_flight"] == 0 and stats["queued"] == 0
+    assert stats["admitted"] == 3 and stats["shed"] == 0
+
+
+def test_admission_sheds_when_estimated_wait_exceeds_budget():
+    """With a measured service time, an arrival whose estimated wait is over budget gets 503 + Retry-After"""
+    async def run():
+        controller = AdmissionController(max_in_flight=1, queue_budget_ms=500)
+        await controller.acquire()
+        controller.release(2.0)  # One request took 2s
+        await controller.acquire()
+        return controller, await _shed(controller)
+
+    controller, error = asyncio.run(run())
+    assert error.status_code == 503
+    assert error.headers["Retry-After"] == "2"
+    assert controller.stats()["shed_by_reason"] == {"over_budget": 1, "queue_full": 0, "timeout": 0}
+
+
+def test_admission_sheds_when_queue_is_full():
+    """max_queue waiters at most, even before any service time is known"""
+    async def run():
+        controller = AdmissionController(max_in_flight=1, queue_budget_ms=1000, max_queue=1)
+        await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        error = await _shed(controller)
+        waiter.cancel()
+        return controller, error
+
+    controller, error = asyncio.run(run())
+    assert error.status_code == 503
+    assert controller.stats()["shed_by_reason"]["queue_full"] == 1
+
+
+def test_admission_times_out_waiters_over_budget():
+    """A waiter still queued when the budget runs out gets 503 and leaves the queue"""
+    async def run():
+        controller = AdmissionController(max_in_flight=1, queue_budget_ms=50)
+        await controller.acquire()
+        error = await _shed(controller)
+        return controller, error
+
+    controller, error = asyncio.run(run())
+    assert error.status_code == 503
+    stats = controller.stats()
+    assert stats["shed_by_reason"]["timeout"] == 1
+    assert stats["queued"] == 0 and stats["in_flight"] == 1
+
+
+def test_admission_cancelled_waiters_do_not_leak_slots():
+    """A client that disconnects while queued (or right after the handoff) gives its slot back"""
+    async def run():
+        controller = AdmissionController(max_in_flight=1, queue_budget_ms=1000)
+        await controller.acquire()
+
+        # Cancelled while still waiting: release() skips it
+        gone = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        gone.cancel()
+        await asyncio.gather(gone, return_exceptions=True)
+        assert controller.stats()["queued"] == 0
+
+        # Cancelled after release() handed it the slot, before it resumed
+        handed = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        controller.release(0.001)
+        handed.cancel()
+        outcome, = await asyncio.gather(handed, return_exceptions=True)
+        if not isinstance(outcome, asyncio.CancelledError):
+            # wait_for (3.11) can swallow the cancel once the slot arrived: the request owns it
+            controller.release(0.001)
+        return controller.stats()
+
+    stats = asyncio.run(run())
+    assert stats["in_flight"] == 0 and stats["queued"] == 0
+
+
+def test_admission_middleware_answers_503_before_reading_the_body():
+    """Rejected /predict requests get a JSON 503 with Retry-After; other routes bypass admission"""
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def run():
+        controller = AdmissionController(max_in_flight=1, queue_budget_ms=0)
+        middleware = AdmissionMiddleware(app, controller)
+        await controller.acquire()  # Server busy
+        rejected = await _call_asgi(middleware, "/predict")
+        other = await _call_asgi(middleware, "/stats")
+        controller.release(0.001)
+        accepted = await _call_asgi(middleware, "/predict")
+        return rejected, other, accepted, controller.stats()
+
+    rejected, other, accepted, stats = asyncio.run(run())
+    status, headers, body = rejected
+    assert status == 503 and headers[b"retry-after"] == b"1"
+    assert b"saturado" in body
+    assert other[0] == 200 and accepted[0] == 200
+    assert calls == ["/stats", "/predict"]
+    assert stats["in_flight"] == 0
+
+
+def test_cache_evicts_least_recently_used():
+    """Past max_entries the least recently used entry goes, not the oldest insert"""
+    cache = ResultCache(max_entries=2, ttl_seconds=60)
+    a, b, c = (ResultCache.key_for(data) for data in (b"a", b"b", b"c"))
+    cache.put(a, "A", "v1")
+    cache.put(b, "B", "v1")
+    assert cache.get(a, "v1") == "A"  # b is now the LRU entry
+
+    cache.put(c, "C", "v1")
+    assert cache.get(b, "v1") is None
+    assert cache.get(a, "v1") == "A" and cache.get(c, "v1") == "C"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_entries_expire():
+    """Entries older than the TTL are a miss and are dropped"""
+    cache = ResultCache(ttl_seconds=0.05)
+    key = ResultCache.key_for(b"frame")
+    cache.put(key, "A", "v1")
+    assert cache.get(key, "v1") == "A"
+
+    time.sleep(0.1)
+    assert cache.get(key, "v1") is None
+    stats = cache.stats()
+    assert stats["expirations"] == 1 and stats["size"] == 0
+
+
+def test_cache_invalidated_by_fingerprint():
+    """A new fingerprint (model or threshold change) clears every entry"""
+    cache = ResultCache()
+    key = ResultCache.key_for(b"frame")
+    cache.put(key, "A", ("model-1", 0.5))
+
+    assert cache.get(key, ("model-1", 0.6)) is None
+    assert cache.get(key, ("model-1", 0.5)) is None
+    stats = cache.stats()
+    assert stats["invalidations"] == 1 and stats["hits"] == 0
+
+
+def test_cache_key_variants_do_not_collide():
+    """The same bytes under another variant (e.g. endpoint) get another key"""
+    assert ResultCache.key_for(b"frame") == ResultCache.key_for(bytearray(b"frame"))
+    assert ResultCache.key_for(b"frame") != ResultCache.key_for(b"frame", "esp")
+
+
+def _body_app(calls):
+    """ASGI app that reads the whole body and answers with its size"""
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+        size = 0
+        while True:
+            message = await receive()
+            size += len(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": str(size).encode()})
+    return app
+
+
+def test_upload_rejects_large_content_length_without_reading():
+    """A declared Content-Length over the limit is a 413 before the app or the body are touched"""
+    calls = []
+    limiter = UploadLimiter(default_limit=1000)
+    middleware = BodySizeLimitMiddleware(_body_app(calls), limiter)
+
+    status, _, body = asyncio.run(_call_asgi(middleware, "/predict", headers=[("Content-Length", "1001")]))
+    assert status == 413 and b"muy grande" in body
+    assert calls == []
+    assert limiter.stats()["rejected_content_length"] == 1
+
+    status, _, body = asyncio.run(
+        _call_asgi(middleware, "/predict", headers=[("Content-Length", "1000")], body_chunks=[b"x" * 1000])
+    )
+    assert status == 200 and body == b"1000"
+
+
+def test_upload_rejects_streamed_body_over_limit():
+    """Without Content-Length (or with a lying one) the body is cut as soon as it crosses the limit"""
+    calls = []
+    limiter = UploadLimiter(default_limit=1000)
+    middleware = BodySizeLimitMiddleware(_body_app(calls), limiter)
+
+    chunks = [b"x" * 600] * 3
+    status, _, _ = asyncio.run(_call_asgi(middleware, "/predict", body_chunks=list(chunks)))
+    assert status == 413
+    status, _, _ = asyncio.run(
+        _call_asgi(middleware, "/predict", headers=[("Content-Length", "10")], body_chunks=list(chunks))
+    )
+    assert status == 413
+
+    stats = limiter.stats()
+    assert stats["rejected_streaming"] == 2
+    assert stats["in_flight_requests"] == 0 and stats["in_flight_bytes"] == 0
+    assert stats["max_request_bytes"] == 1200  # Stopped at the second chunk, the third is never read
+
+
+def test_upload_limits_per_route():
+    """A route with its own limit uses it; the rest keep the default"""
+    calls = []
+    limiter = UploadLimiter(default_limit=1000, path_limits={"/predict/esp": 100})
+    middleware = BodySizeLimitMiddleware(_body_app(calls), limiter)
+    body = [b"x" * 500]
+
+    assert asyncio.run(_call_asgi(middleware, "/predict/esp", body_chunks=list(body)))[0] == 413
+    assert asyncio.run(_call_asgi(middleware, "/predict", body_chunks=list(body)))[0] == 200
+    assert limiter.limit_for("/predict/esp") == 100 and limiter.limit_for("/stats") == 1000
+
+
+def _unset_thread_settings():
+    """As at startup without thread values in .env (assigning a setting marks it as explicit)"""
+    settings.INFERENCE_THREADS = settings.INFERENCE_INTEROP_THREADS = 0
+    settings.model_fields_set.difference_update({"INFERENCE_THREADS", "INFERENCE_INTEROP_THREADS", "MAX_BATCH_SIZE"})
+
+
+def test_executor_rejects_past_its_queue():
+    """Past max_workers + queue_depth pending tasks a new one gets 503 instead of queueing"""
+    gate = threading.Event()
+
+    async def run():
+        executor = InferenceExecutor(max_workers=1, queue_depth=1)
+        running = [asyncio.ensure_future(executor.run_in_thread(gate.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0)
+        try:
+            await executor.run_in_thread(gate.wait, 5)
+            raise AssertionError("third task should be rejected")
+        except HTTPException as e:
+            assert e.status_code == 503
+        busy = executor.stats()
+        gate.set()
+        await asyncio.gather(*running)
+        executor.shutdown()
+        return busy, executor.stats()
+
+    busy, done = asyncio.run(run())
+    assert busy["pending"] == 2 and busy["rejected"] == 1
+    assert done["pending"] == 0 and done["completed"] == 2
+
+
+def test_executor_shutdown_cancels_queued_work():
+    """shutdown() drops queued tasks without waiting; the executor can be used again afterwards"""
+    gate = threading.Event()
+
+    async def run():
+        executor = InferenceExecutor(max_workers=1, queue_depth=4)
+        running = asyncio.ensure_future(executor.run_in_thread(gate.wait, 5))
+        queued = asyncio.ensure_future(executor.run_in_thread(time.sleep, 0))
+        await asyncio.sleep(0.05)
+        executor.shutdown()
+        gate.set()
+        outcomes = await asyncio.gather(running, queued, return_exceptions=True)
+        again = await executor.run_in_thread(sum, [1, 2])
+        executor.shutdown()
+        return outcomes, again
+
+    (running, queued), again = asyncio.run(run())
+    assert running is True
+    assert isinstance(queued, asyncio.CancelledError)
+    assert again == 3
+
+
+def test_executor_rejects_unknown_kind():
+    """Only thread and process pools exist"""
+    try:
+        InferenceExecutor(kind="fiber")
+    except ValueError:
+        return
+    raise AssertionError("kind=fiber should be rejected")
+
+
+def _read_body(chunks, max_size: int, content_length=None):
+    """read_body_limited over a request streaming `chunks`; returns the body or the HTTP status"""
+    headers = [] if content_length is None else [(b"content-length", str(content_length).encode())]
+    pending = list(chunks)
+
+    async def receive():
+        chunk = pending.pop(0) if pending else b""
+        return {"type": "http.request", "body": chunk, "more_body": bool(pending)}
+
+    async def run():
+        request = Request({"type": "http", "method": "POST", "path": "/predict/esp", "headers": headers}, receive)
+        try:
+            return await read_body_limited(request, max_size)
+        except HTTPException as e:
+            return e.status_code
+
+    return asyncio.run(run())
+
+
+def test_read_body_limited_streamed_body():
+    """Without Content-Length chunks are appended until the body crosses max_size (413)"""
+    assert _read_body([b"a" * 400, b"b" * 400], max_size=1000) == bytearray(b"a" * 400 + b"b" * 400)
+    assert _read_body([b"a" * 600, b"b" * 600, b"c" * 600], max_size=1000) == 413
+    assert _read_body([b""], max_size=1000) == 400
+
+
+def test_read_body_limited_with_content_length():
+    """A declared size is checked up front and must match what arrives"""
+    assert _read_body([b"a" * 300, b"b" * 200], max_size=1000, content_length=500) == bytearray(b"a" * 300 + b"b" * 200)
+    assert _read_body([b"a" * 10], max_size=1000, content_length=2000) == 413
+    assert _read_body([b"a" * 300, b"b" * 300], max_size=1000, content_length=500) == 400
+    assert _read_body([b"a" * 300], max_size=1000, content_length=500) == 400
+
+
+def test_saved_tuning_applies_when_env_workers_differ():
+    """run.py picks the tuned worker count over .env WORKERS, and configure_threads then applies the tuning"""
+    names = ("WORKERS", "AUTOTUNE_FILE", "INFERENCE_THREADS", "INFERENCE_INTEROP_THREADS", "MAX_BATCH_SIZE")
+    saved = {name: getattr(settings, name) for name in names}
+    saved_fields = set(settings.model_fields_set)
+    saved_env = os.environ.get("WORKERS")
+    best = {"workers": 1, "intra_op_threads": 3, "inter_op_threads": 2, "batch_size": 6}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            settings.AUTOTUNE_FILE = str(Path(tmp) / "tuning.json")
+            save_tuning({"best": best, "measurements": [best]})
+            settings.WORKERS = 4  # Stale value from .env
+            _unset_thread_settings()
+
+            assert select_workers(None) == 1
+            assert settings.WORKERS == 1 and os.environ["WORKERS"] == "1"
+            applied = configure_threads()
+            assert applied["source"] == "tuning"
+            assert (applied["intra_op_threads"], applied["inter_op_threads"], applied["max_batch_size"]) == (3, 2, 6)
+
+            # Another --workers than the tuned one: cores / workers instead
+            _unset_thread_settings()
+            assert configure_threads(select_workers(2))["source"] == "default"
+    finally:
+        for name, value in saved.items():
+            setattr(settings, name, value)
+        settings.model_fields_set.intersection_update(saved_fields)
+        if saved_env is None:
+            os.environ.pop("WORKERS", None)
+        else:
+            os.environ["WORKERS"] = saved_env
+
+
+if __name__ == "__main__":
+    test_dhash_close_for_near_duplicates()
+    test_dedup_distance_threshold()
+    test_dedup_entries_expire()
+    test_dedup_devices_are_isolated()
+    test_dedup_cleared_when_model_changes()
+    test_dedup_reports_hash_cost()
+    test_deadline_header_overrides_route_default()
+    test_deadline_invalid_header_uses_route_default()
+    test_deadline_expired_raises_504_per_stage()
+    test_deadline_middleware_sets_request_state()
+    test_batcher_drops_frames_that_cannot_make_their_deadline()
+    test_admission_hands_slot_to_oldest_waiter()
+    test_admission_sheds_when_estimated_wait_exceeds_budget()
+    test_admission_sheds_when_queue_is_full()
+    test_admission_times_out_waiters_over_budget()
+    test_admission_cancelled_waiters_do_not_leak_slots()
+    test_admission_middleware_answers_503_before_reading_the_body()
+    test_cache_evicts_least_recently_used()
+    test_cache_entries_expire()
+    test_cache_invalidated_by_fingerprint()
+    test_cache_key_variants_do_not_collide()
+    test_upload_rejects_large_content_length_without_reading()
+    test_upload_rejects_streamed_body_over_limit()
+    test_upload_limits_per_route()
+    test_executor_rejects_past_its_queue()
+    test_executor_shutdown_cancels_queued_work()
+    test_executor_rejects_unknown_kind()
+    test_read_body_limited_streamed_body()
+    test_read_body_limited_with_content_length()
+    test_saved_tuning_applies_when_env_workers_differ()
+    print("✅ Core tests passed")
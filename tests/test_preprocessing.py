@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test header parsing, reduced-resolution decoding and the fused preprocessor
+No model required
+"""
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+from fastapi import HTTPException
+from PIL import Image
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.preprocessing import (
+    FusedPreprocessor,
+    decode_and_validate,
+    read_image_size,
+    reduced_decode_flag,
+)
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+
+def _image(width, height):
+    rng = np.random.default_rng(0)
+    small = rng.integers(0, 256, (max(1, height // 16), max(1, width // 16), 3), dtype=np.uint8)
+    return cv2.resize(small, (width, height), interpolation=cv2.INTER_LINEAR)
+
+
+def test_read_image_size():
+    """JPEG (baseline/progressive) and PNG sizes come from the header"""
+    image = _image(1600, 1200)
+    baseline = cv2.imencode(".jpg", image)[1].tobytes()
+    progressive = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_PROGRESSIVE, 1])[1].tobytes()
+    png = cv2.imencode(".png", image)[1].tobytes()
+
+    assert read_image_size(baseline) == ("jpeg", 1600, 1200)
+    assert read_image_size(bytearray(progressive)) == ("jpeg", 1600, 1200)
+    assert read_image_size(memoryview(png)) == ("png", 1600, 1200)
+    assert read_image_size(cv2.imencode(".bmp", image)[1].tobytes()) is None
+
+
+def test_reduced_decode_covers_target():
+    """Largest 1/2-1/8 scale that still covers the model input"""
+    assert reduced_decode_flag(4000, 3000, (224, 224)) == (cv2.IMREAD_REDUCED_COLOR_8, 8)
+    assert reduced_decode_flag(640, 480, (224, 224)) == (cv2.IMREAD_REDUCED_COLOR_2, 2)
+    assert reduced_decode_flag(300, 300, (224, 224)) == (cv2.IMREAD_COLOR, 1)
+
+    image, size = decode_and_validate(cv2.imencode(".jpg", _image(4000, 3000))[1].tobytes())
+    assert image.shape == (375, 500, 3)
+    assert size == (3000, 4000)  # The uploaded size, not the decoded one
+
+
+def test_undersized_rejected():
+    """Tiny JPEG/PNG are rejected from the header; other formats after decode"""
+    for ext in (".jpg", ".png", ".bmp"):
+        data = cv2.imencode(ext, _image(40, 300))[1].tobytes()
+        try:
+            decode_and_validate(data)
+        except HTTPException as e:
+            assert e.status_code == 400
+            continue
+        raise AssertionError(f"{ext} 40x300 should be rejected")
+
+
+def _reference(image: np.ndarray, size, mean, std) -> np.ndarray:
+    """Previous input pipeline: BGR->RGB, PIL bilinear resize, ToTensor + Normalize (HWC)"""
+    rgb = Image.fromarray(np.ascontiguousarray(image[..., ::-1]))
+    resized = np.asarray(rgb.resize((size[1], size[0]), Image.BILINEAR), dtype=np.float32) / 255.0
+    return (resized - np.float32(mean)) / np.float32(std)
+
+
+def test_fused_preprocessor_matches_reference():
+    """NCHW and NHWC outputs match the PIL + Normalize pipeline (shrinking, enlarging, same size)"""
+    for layout, mean, std in (("nchw", IMAGENET_MEAN, IMAGENET_STD), ("nhwc", (0.5,) * 3, (0.5,) * 3)):
+        preprocessor = FusedPreprocessor((224, 224), mean, std, layout=layout)
+        for width, height in ((1000, 700), (640, 480), (160, 120), (224, 224)):
+            image = _image(width, height)
+            output = preprocessor.batch([image])[0]
+            assert output.shape == preprocessor.sample_shape
+            if layout == "nchw":
+                output = output.transpose(1, 2, 0)
+
+            difference = np.abs(output - _reference(image, (224, 224), mean, std))
+            if (width, height) == (224, 224):
+                assert difference.max() < 1e-5, layout  # No resize: only the normalization
+            else:
+                # INTER_AREA / INTER_LINEAR vs PIL's antialiased bilinear
+                assert difference.mean() < 0.02, (layout, width, height)
+                assert difference.max() < 0.25, (layout, width, height)
+
+
+def test_fused_preprocessor_reuses_buffers():
+    """batch() hands out views of one buffer, which only grows for a larger batch"""
+    preprocessor = FusedPreprocessor((224, 224), IMAGENET_MEAN, IMAGENET_STD)
+    images = [_image(640, 480), _image(320, 240), _image(800, 600)]
+
+    first = preprocessor.batch(images)
+    buffer = preprocessor._batch
+    smaller = preprocessor.batch(images[:2])
+    assert preprocessor._batch is buffer
+    assert np.shares_memory(first, smaller) and smaller.shape[0] == 2
+
+    preprocessor.batch(images * 2)
+    assert preprocessor._batch is not buffer and preprocessor._batch.shape[0] == 6
+
+    # fill() writes straight into the caller's buffer
+    out = np.empty(preprocessor.sample_shape, dtype=np.float32)
+    assert preprocessor.fill(images[0], out) is out
+    assert np.array_equal(out, preprocessor.batch(images[:1])[0])
+
+
+if __name__ == "__main__":
+    test_read_image_size()
+    test_reduced_decode_covers_target()
+    test_undersized_rejected()
+    test_fused_preprocessor_matches_reference()
+    test_fused_preprocessor_reuses_buffers()
+    print("✅ Preprocessing tests passed")
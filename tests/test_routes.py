@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Test the API routes in-process (FastAPI TestClient) with the NumPy stub backend
+No server, deep learning framework or trained model required
+"""
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.models.backends.numpy_stub import NumpyStubBackend
+
+# The routes load the model on import: point them at a stub first
+_MODEL_DIR = tempfile.TemporaryDirectory()
+settings.MODEL_PATH = str(Path(_MODEL_DIR.name) / "stub.npz")
+NumpyStubBackend.create(settings.MODEL_PATH, num_classes=len(settings.CLASSES))
+
+from fastapi.testclient import TestClient
+
+from app.api import routes
+from app.core.warmup import ModelWarmup
+from app.main import app
+
+
+class _PredictionRecorder:
+    """prediction_logger stand-in that keeps what would go to predictions.jsonl"""
+
+    def __init__(self):
+        self.records = []
+
+    def log_prediction(self, **record):
+        self.records.append(record)
+
+
+def _jpeg(width: int, height: int, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, (max(1, height // 16), max(1, width // 16), 3), dtype=np.uint8)
+    return cv2.imencode(".jpg", cv2.resize(small, (width, height)))[1].tobytes()
+
+
+def _with_recorder():
+    recorder = _PredictionRecorder()
+    original = routes.prediction_logger
+    routes.prediction_logger = recorder
+    return recorder, original
+
+
+def test_logged_size_is_the_uploaded_size():
+    """A large JPEG decoded at 1/4 still logs (and caches) its original height x width"""
+    recorder, original = _with_recorder()
+    log_predictions, cache_enabled = settings.LOG_PREDICTIONS, settings.RESULT_CACHE_ENABLED
+    settings.LOG_PREDICTIONS = settings.RESULT_CACHE_ENABLED = True
+    try:
+        data = _jpeg(1600, 1200, seed=14)
+        with TestClient(app) as client:
+            for _ in range(2):  # The second one is a cache hit
+                response = client.post("/predict", files={"file": ("big.jpg", data, "image/jpeg")})
+                assert response.status_code == 200
+    finally:
+        routes.prediction_logger = original
+        settings.LOG_PREDICTIONS, settings.RESULT_CACHE_ENABLED = log_predictions, cache_enabled
+
+    assert [tuple(record["image_size"]) for record in recorder.records] == [(1200, 1600)] * 2
+
+
+class _BatchSpy:
+    """Wraps classifier.classify_batch to count forwards and their sizes"""
+
+    def __init__(self):
+        self.sizes = []
+
+    def __enter__(self):
+        classify_batch = routes.classifier.classify_batch
+
+        def spy(images):
+            self.sizes.append(len(images))
+            return classify_batch(images)
+
+        routes.classifier.classify_batch = spy
+        return self
+
+    def __exit__(self, *exc):
+        del routes.classifier.classify_batch
+
+
+def test_batch_isolates_item_errors():
+    """Corrupt, too small and too large items get their own error; the rest share one forward, in order"""
+    cache_enabled, max_file_size = settings.RESULT_CACHE_ENABLED, settings.MAX_FILE_SIZE
+    settings.RESULT_CACHE_ENABLED = False
+    valid = [_jpeg(320, 240, seed=30 + i) for i in range(3)]
+    items = [
+        ("a.jpg", valid[0]),
+        ("small.jpg", _jpeg(40, 40)),
+        ("b.jpg", valid[1]),
+        ("corrupt.jpg", b"\xff\xd8 not really a jpeg" * 10),
+        ("c.jpg", valid[2]),
+        ("huge.jpg", _jpeg(320, 240) + b"\0" * 200_000),
+    ]
+    try:
+        with TestClient(app) as client:
+            single = [
+                client.post("/predict", files={"file": ("x.jpg", data, "image/jpeg")}).json()
+                for data in valid
+            ]
+            settings.MAX_FILE_SIZE = 100_000
+            with _BatchSpy() as spy:
+                response = client.post(
+                    "/predict/batch",
+                    files=[("files", (name, data, "image/jpeg")) for name, data in items]
+                )
+    finally:
+        settings.RESULT_CACHE_ENABLED, settings.MAX_FILE_SIZE = cache_enabled, max_file_size
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [item["index"] for item in results] == list(range(len(items)))
+    assert [item["filename"] for item in results] == [name for name, _ in items]
+    assert [item["status_code"] for item in results] == [200, 400, 200, 400, 200, 413]
+    assert all(item["error"] for item in results if item["status_code"] != 200)
+    assert [item["prediction"] for item in results if item["status_code"] == 200] == single
+    assert spy.sizes == [3]
+
+
+def test_batch_uses_result_cache():
+    """Files already classified (by /predict or an earlier batch) skip the forward"""
+    cache_enabled = settings.RESULT_CACHE_ENABLED
+    settings.RESULT_CACHE_ENABLED = True
+    first, second = _jpeg(320, 240, seed=40), _jpeg(320, 240, seed=41)
+    files = [("files", ("a.jpg", first, "image/jpeg")), ("files", ("b.jpg", second, "image/jpeg"))]
+    try:
+        with TestClient(app) as client:
+            routes.result_cache.clear()
+            single = client.post("/predict", files={"file": ("a.jpg", first, "image/jpeg")}).json()
+            hits = routes.result_cache.hits
+            with _BatchSpy() as spy:
+                cold = client.post("/predict/batch", files=files).json()["results"]
+                warm = client.post("/predict/batch", files=files).json()["results"]
+    finally:
+        settings.RESULT_CACHE_ENABLED = cache_enabled
+
+    assert spy.sizes == [1]  # Only `second`, and only the first time
+    assert routes.result_cache.hits - hits == 3
+    assert cold[0]["prediction"] == single
+    assert [item["prediction"] for item in warm] == [item["prediction"] for item in cold]
+
+
+class _GatedClassifier:
+    """Warm-up target that blocks until `gate` opens (or fails with `error`)"""
+
+    model = "stub"
+
+    def __init__(self, error: str = ""):
+        self.gate = threading.Event()
+        self.error = error
+
+    def predict_batch(self, images):
+        self.gate.wait(timeout=5)
+        if self.error:
+            raise RuntimeError(self.error)
+        return np.zeros((len(images), len(settings.CLASSES)), np.float32)
+
+
+def _ready_while_warming(classifier: _GatedClassifier):
+    """(/ready during the warm-up, /ready after it) for a warm-up over `classifier`"""
+    warmup = ModelWarmup(classifier, batch_sizes=[1, 2], iterations=1)
+    original = routes.model_warmup
+    routes.model_warmup = warmup
+    try:
+        with TestClient(app) as client:
+            task = client.portal.start_task_soon(warmup.run, routes.executor)
+            deadline = time.monotonic() + 5
+            while not warmup.stats()["running"] and time.monotonic() < deadline:
+                time.sleep(0.01)
+            during = client.get("/ready")
+            classifier.gate.set()
+            task.result(timeout=5)
+            after = client.get("/ready")
+    finally:
+        routes.model_warmup = original
+    return during, after
+
+
+def test_ready_only_after_warmup():
+    """/ready is 503 while the warm-up runs and 200 once every batch size is warm"""
+    during, after = _ready_while_warming(_GatedClassifier())
+
+    assert during.status_code == 503
+    assert during.json()["running"] and not during.json()["ready"]
+    assert after.status_code == 200
+    body = after.json()
+    assert body["ready"] and body["error"] is None
+    assert set(body["last_batch_ms"]) == {"1", "2"}
+
+
+def test_ready_reports_warmup_failure():
+    """A failed warm-up keeps /ready at 503 and shows the error"""
+    during, after = _ready_while_warming(_GatedClassifier(error="kernel missing"))
+
+    assert during.status_code == 503
+    assert after.status_code == 503
+    body = after.json()
+    assert not body["ready"] and not body["running"]
+    assert body["error"] == "kernel missing"
+
+
+if __name__ == "__main__":
+    test_logged_size_is_the_uploaded_size()
+    test_batch_isolates_item_errors()
+    test_batch_uses_result_cache()
+    test_ready_only_after_warmup()
+    test_ready_reports_warmup_failure()
+    print("✅ Route tests passed")
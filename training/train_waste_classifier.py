@@ -290,6 +290,62 @@ class WasteClassifierTrainer:
         if self.verbose:
             print(f"✓ Modelo guardado: {path}")
     
+    def export_tflite(self, h5_path, representative_generator=None, num_samples=100):
+        """
+        Exportar a TFLite junto al .h5
+        
+        - <nombre>_fp16.tflite: pesos float16 (mitad de tamaño)
+        - <nombre>_int8.tflite: cuantización entera completa, calibrada con
+          imágenes del generador (ya preprocesadas a [-1, 1])
+        
+        Returns:
+            lista de rutas generadas
+        """
+        h5_path = Path(h5_path)
+        exported = []
+        
+        # Float16
+        converter = tf.lite.TFLiteConverter.from_keras_model(self.model)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+        fp16_path = h5_path.with_name(f"{h5_path.stem}_fp16.tflite")
+        fp16_path.write_bytes(converter.convert())
+        exported.append(fp16_path)
+        
+        if self.verbose:
+            print(f"✓ TFLite float16: {fp16_path} ({fp16_path.stat().st_size / 1e6:.1f} MB)")
+        
+        # Int8 (requiere datos representativos)
+        if representative_generator is None:
+            if self.verbose:
+                print("⚠️  Sin datos representativos: se omite TFLite int8")
+            return exported
+        
+        def representative_dataset():
+            count = 0
+            for i in range(len(representative_generator)):
+                images, _ = representative_generator[i]
+                for image in images:
+                    yield [image[None].astype('float32')]
+                    count += 1
+                    if count >= num_samples:
+                        return
+        
+        converter = tf.lite.TFLiteConverter.from_keras_model(self.model)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+        int8_path = h5_path.with_name(f"{h5_path.stem}_int8.tflite")
+        int8_path.write_bytes(converter.convert())
+        exported.append(int8_path)
+        
+        if self.verbose:
+            print(f"✓ TFLite int8: {int8_path} ({int8_path.stat().st_size / 1e6:.1f} MB)")
+        
+        return exported
+    
     def evaluate(self, val_generator):
         """Evaluar modelo en datos de validación"""
         
@@ -357,6 +413,12 @@ def main():
         help='Capas a descongelar del modelo base'
     )
     
+    parser.add_argument(
+        '--skip-tflite',
+        action='store_true',
+        help='No exportar artefactos TFLite (float16 / int8) junto al .h5'
+    )
+    
     args = parser.parse_args()
     
     # Verificar que existan los datos
@@ -432,8 +494,15 @@ def main():
     # Evaluar
     trainer.evaluate(val_gen)
     
+    # Exportar TFLite (para servidores sin TensorFlow completo)
+    tflite_paths = []
+    if not args.skip_tflite:
+        tflite_paths = trainer.export_tflite(output_path, representative_generator=val_gen)
+    
     print("\n✅ Entrenamiento completado exitosamente")
     print(f"📁 Modelo guardado: {output_path}")
+    for tflite_path in tflite_paths:
+        print(f"📁 TFLite: {tflite_path}")
     print("\nPróximos pasos:")
     print(f"1. Actualizar app/config.py: MODEL_PATH = '{output_path}'")
     print("2. Ejecutar: python run.py")